@@ -1,5 +1,6 @@
 import strategy
 import load_data
+import indicator_engine
 import numpy as np
 
 #compute simple return from price series
@@ -50,7 +51,100 @@ def compute_positions(signals):
 
     return positions
 
-def plot_positions_over_time(positions, title="Positions Over Time"):
+# NumPy-backed versions of the functions above; the list/loop versions are kept as
+# the reference implementation
+
+def compute_simple_returns_array(prices):
+    prices = np.asarray(prices, dtype=float)
+    return np.diff(prices) / prices[:-1]
+
+def compute_log_returns_array(prices):
+    prices = np.asarray(prices, dtype=float)
+    return np.log(prices[1:] / prices[:-1])
+
+def compute_positions_array(signals, carry=True):
+    """
+    Positions from int8 signals (strategy.crossover_signals).
+
+    With carry=True the last BUY/SELL is forward-filled, so the position is held
+    (1 long, -1 short, 0 flat before the first signal) until the next crossover.
+    carry=False reproduces compute_positions, which is only non-zero on signal bars.
+    A (strategies x time) signal matrix is filled row by row.
+    """
+    signals = np.asarray(signals, dtype=np.int8)
+    if not carry:
+        return signals.copy()
+    # index of the most recent signal at or before each bar (index 0 is always HOLD)
+    last_signal = np.where(signals != 0, np.arange(signals.shape[-1]), 0)
+    np.maximum.accumulate(last_signal, axis=-1, out=last_signal)
+    return np.take_along_axis(signals, last_signal, axis=-1)
+
+def compute_strategy_returns_array(prices, positions):
+    """Per-bar strategy returns: the position held at i-1 earns the price return into bar i"""
+    n = min(len(prices), len(positions))
+    return compute_simple_returns_array(prices[:n]) * positions[:max(n - 1, 0)]
+
+def compute_equity_curve_array(prices, positions, initial_capital=1000.0):
+    """Vectorized compute_equity_curve: initial capital compounded by a cumulative product"""
+    strategy_returns = compute_strategy_returns_array(prices, positions)
+    equity = np.empty(len(strategy_returns) + 1)
+    equity[0] = initial_capital
+    np.cumprod(1.0 + strategy_returns, out=equity[1:])
+    equity[1:] *= initial_capital
+    return equity
+
+def compute_portfolio_equity_array(prices, positions, initial_capital=1000.0, fee=0.0, slippage=0.0,
+                                   sizing=1.0, weights=None, out=None):
+    """
+    Backtest a (strategies x time) position matrix in one vectorized pass.
+
+    `prices` is one series shared by every strategy or one row per strategy. The
+    exposure positions * sizing (fraction of equity; sizing is a scalar, one value
+    per strategy or a full matrix) held at bar i-1 earns the price return into bar i,
+    as in compute_equity_curve_array. A change of exposure trades at that bar's close
+    and costs fee + slippage per unit of equity traded, the entry at bar 0 included.
+
+    Returns (equity, portfolio): the (strategies x time) curves, each starting from
+    initial_capital (written into `out` if given), and the curve of a portfolio that
+    splits initial_capital across the strategies by `weights` (default equal) and
+    does not rebalance.
+    """
+    positions = np.asarray(positions)
+    if positions.ndim != 2:
+        raise ValueError("positions must be a (strategies x time) matrix")
+    n_strategies, n = positions.shape
+    prices = np.asarray(prices, dtype=float)
+    if prices.ndim not in (1, 2) or prices.shape[-1] != n or (prices.ndim == 2 and prices.shape[0] != n_strategies):
+        raise ValueError("prices must be one series or one row per strategy, with one value per bar")
+    returns = np.diff(prices, axis=-1) / prices[..., :-1]
+
+    sizing = np.asarray(sizing, dtype=float)
+    if sizing.ndim == 2:
+        # a full sizing matrix is folded into (fractional) positions
+        positions = positions * np.broadcast_to(sizing, positions.shape)
+        sizing = 1.0
+    sizing = np.broadcast_to(sizing, (n_strategies,))
+    if weights is None:
+        weights = np.full(n_strategies, 1.0 / max(n_strategies, 1))
+    weights = np.asarray(weights, dtype=float)
+    if weights.shape != (n_strategies,):
+        raise ValueError("weights must have one value per strategy")
+
+    # the compounding is a serial chain per row, so it runs in one native pass over the
+    # int8 (or float64) positions instead of several full-size NumPy temporaries
+    equity = indicator_engine.portfolio_equity(returns, positions, sizing, initial_capital, fee + slippage, out=out)
+    return equity, weights @ equity
+
+def finish_plot(fig, path=None):
+    """Save the figure to `path` and close it, or show it when no path is given"""
+    import matplotlib.pyplot as plt
+    if path is None:
+        plt.show()
+    else:
+        fig.savefig(path)
+        plt.close(fig)
+
+def plot_positions_over_time(positions, title="Positions Over Time", path=None):
     import numpy as np
     import matplotlib.pyplot as plt
 
@@ -70,7 +164,7 @@ def plot_positions_over_time(positions, title="Positions Over Time"):
             last_state = state[i]
 
     # Plot as a step function (much clearer for positions)
-    plt.figure(figsize=(14, 5))
+    fig = plt.figure(figsize=(14, 5))
     plt.step(range(len(state)), state, where="post", label="Position (state)")
 
     # Optional: show HOLD indicators as small dots along the baseline
@@ -86,7 +180,7 @@ def plot_positions_over_time(positions, title="Positions Over Time"):
     plt.grid(True, alpha=0.3)
     plt.legend()
     plt.tight_layout()
-    plt.show()
+    finish_plot(fig, path)
 
 def compute_equity_curve(prices, positions, initial_capital=1000.0):
     equity = [initial_capital]
@@ -99,7 +193,7 @@ def compute_equity_curve(prices, positions, initial_capital=1000.0):
 
     return equity
 
-def plot_equity_curve(equity, title=None):
+def plot_equity_curve(equity, title=None, path=None):
     import numpy as np
     import matplotlib.pyplot as plt
     from matplotlib.ticker import FuncFormatter, MaxNLocator
@@ -148,7 +242,7 @@ def plot_equity_curve(equity, title=None):
     ax.margins(x=0.01, y=0.05)
 
     plt.tight_layout()
-    plt.show()
+    finish_plot(fig, path)
 
 
     
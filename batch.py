@@ -0,0 +1,99 @@
+import csv
+import glob
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import data_cache
+import indicator_engine
+import sweep
+
+#run the crossover backtest for every symbol file in a directory across a process pool.
+#only file paths and small stats dicts cross process boundaries: each worker maps the
+#parsed columns from the shared data cache (parsing the CSV there on first use), so price
+#arrays are never pickled and workers reading the same symbol share the page cache
+
+RESULT_FIELDS = ['symbol', 'rows',
+                 'sma_total_return', 'sma_max_drawdown', 'sma_sharpe', 'sma_trades',
+                 'ema_total_return', 'ema_max_drawdown', 'ema_sharpe', 'ema_trades',
+                 'error']
+
+def list_symbol_files(directory, pattern='*.csv'):
+    return sorted(glob.glob(os.path.join(directory, pattern)))
+
+def symbol_from_path(file_path):
+    """Kraken files are named <PAIR>_<interval>.csv, e.g. 1INCHEUR_1440.csv"""
+    return os.path.splitext(os.path.basename(file_path))[0]
+
+def evaluate_symbol(close_prices, fast, slow):
+    """SMA and EMA crossover stats for one price series"""
+    price_returns = (close_prices[1:] - close_prices[:-1]) / close_prices[:-1]
+    result = {'rows': len(close_prices)}
+    kernels = [('sma', indicator_engine.simple_moving_average, slow),
+               ('ema', indicator_engine.exponential_moving_average, 1)]
+    for ma_type, kernel, warmup in kernels:
+        stats = sweep.evaluate_crossover(price_returns, kernel(close_prices, fast), kernel(close_prices, slow), warmup)
+        for name, value in stats.items():
+            result[f'{ma_type}_{name}'] = value
+    return result
+
+def run_symbol(file_path, fast, slow, cache_dir=None, timeframe=None):
+    """Worker entry point: everything is loaded in the worker from the memory-mapped cache"""
+    row = {'symbol': symbol_from_path(file_path), 'error': ''}
+    try:
+        close_prices = data_cache.load_columns(file_path, cache_dir=cache_dir, warn=False,
+                                              timeframe=timeframe)['close']
+        if len(close_prices) < 2:
+            raise ValueError("not enough rows")
+        row.update(evaluate_symbol(close_prices, fast, slow))
+    except Exception as exc:
+        # one bad file should not abort a run over hundreds of symbols
+        row['error'] = f"{type(exc).__name__}: {exc}"
+    return row
+
+def run_batch(directory, fast, slow, workers=None, pattern='*.csv', cache_dir=None, timeframe=None):
+    """Backtest every matching file in `directory` (resampled to `timeframe` if given); returns one result dict per symbol"""
+    if fast >= slow:
+        raise ValueError("fast window must be smaller than slow window")
+    files = list_symbol_files(directory, pattern)
+    rows = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(run_symbol, path, fast, slow, cache_dir, timeframe) for path in files]
+        for future in as_completed(futures):
+            rows.append(future.result())
+    rows.sort(key=lambda row: row['symbol'])
+    return rows
+
+def write_results_csv(rows, file_path):
+    with open(file_path, 'w', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=RESULT_FIELDS, restval='')
+        writer.writeheader()
+        writer.writerows(rows)
+
+def format_batch_table(rows):
+    lines = [f"{'Symbol':<20} {'Rows':>9} {'SMA Return':>12} {'SMA MaxDD':>10} {'SMA Sharpe':>11} "
+             f"{'EMA Return':>12} {'EMA MaxDD':>10} {'EMA Sharpe':>11}"]
+    lines.append('-' * len(lines[0]))
+    for row in rows:
+        if row['error']:
+            lines.append(f"{row['symbol']:<20} ERROR {row['error']}")
+            continue
+        lines.append(f"{row['symbol']:<20} {row['rows']:>9} {row['sma_total_return']:>12.4f} {row['sma_max_drawdown']:>10.4f} "
+                     f"{row['sma_sharpe']:>11.4f} {row['ema_total_return']:>12.4f} {row['ema_max_drawdown']:>10.4f} "
+                     f"{row['ema_sharpe']:>11.4f}")
+    return "\n".join(lines)
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description='Backtest the crossover strategy for every symbol file in a directory.')
+    parser.add_argument('directory', help='Directory of Kraken OHLCVT CSV files')
+    parser.add_argument('fast', type=int, help='Window size for fast moving average')
+    parser.add_argument('slow', type=int, help='Window size for slow moving average')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: one per CPU)')
+    parser.add_argument('--pattern', default='*.csv', help='Glob pattern for symbol files')
+    parser.add_argument('--csv', dest='csv_output', help='Also write the result table to this CSV file')
+    args = parser.parse_args()
+
+    results = run_batch(args.directory, args.fast, args.slow, workers=args.workers, pattern=args.pattern)
+    print(format_batch_table(results))
+    if args.csv_output:
+        write_results_csv(results, args.csv_output)
@@ -44,6 +44,39 @@ def benchmark_function(func, data, window, name, iterations=10):
         'times': times
     }
 
+def benchmark_multi_window(close_prices, window_sizes, iterations=10):
+    """Compare one C++ call per window against the batched multi-window kernels"""
+    results = {}
+    # Both variants write into the same preallocated buffer so only the kernels are timed;
+    # it matches the kernels' result dtype (float32 for float32 prices)
+    dtype = np.float32 if np.asarray(close_prices).dtype == np.float32 else np.float64
+    out = np.empty((len(window_sizes), len(close_prices)), dtype=dtype)
+    kernels = {
+        'sma': (indicator_engine.simple_moving_average, indicator_engine.simple_moving_average_multi),
+        'ema': (indicator_engine.exponential_moving_average, indicator_engine.exponential_moving_average_multi),
+    }
+    for metric, (single, multi) in kernels.items():
+        per_window = benchmark_function(
+            lambda data, windows: [single(data, w, out=out[k]) for k, w in enumerate(windows)],
+            close_prices,
+            window_sizes,
+            f"C++ {metric.upper()} per window",
+            iterations
+        )
+        batched = benchmark_function(
+            lambda data, windows: multi(data, windows, out=out),
+            close_prices,
+            window_sizes,
+            f"C++ {metric.upper()} multi-window",
+            iterations
+        )
+        results[metric] = {
+            'per_window': per_window,
+            'batched': batched,
+            'speedup': per_window['avg'] / batched['avg']
+        }
+    return results
+
 def main():
     print("\n" + "="*80)
     print("BENCHMARK: Python vs C++ Moving Average Implementations")
@@ -57,9 +90,9 @@ def main():
         return False
     
     close_prices = load_test_data(data_path)
-    close_prices_cpp = close_prices.astype(np.float64)
     
     print(f"\n✓ Loaded test data: {len(close_prices)} price points")
+    # float32 and float64 data go to the C++ kernels as is (no conversion copy)
     print(f"✓ Data type: {close_prices.dtype}")
     
     # Benchmark parameters
@@ -94,7 +127,7 @@ def main():
         
         cpp_sma_result = benchmark_function(
             indicator_engine.simple_moving_average,
-            close_prices_cpp,
+            close_prices,
             window,
             f"C++ SMA (w={window})",
             iterations
@@ -117,7 +150,7 @@ def main():
         
         cpp_ema_result = benchmark_function(
             indicator_engine.exponential_moving_average,
-            close_prices_cpp,
+            close_prices,
             window,
             f"C++ EMA (w={window})",
             iterations
@@ -172,6 +205,16 @@ def main():
     
     print(f"\nSMA Speedup: {np.mean(sma_speedups):.2f}x average (min: {np.min(sma_speedups):.2f}x, max: {np.max(sma_speedups):.2f}x)")
     print(f"EMA Speedup: {np.mean(ema_speedups):.2f}x average (min: {np.min(ema_speedups):.2f}x, max: {np.max(ema_speedups):.2f}x)")
+
+    # Multi-window batch vs one call per window
+    print(f"\n{'='*80}")
+    print(f"MULTI-WINDOW BATCH ({len(window_sizes)} windows)")
+    print(f"{'='*80}")
+
+    multi_results = benchmark_multi_window(close_prices, window_sizes, iterations)
+    for metric, res in multi_results.items():
+        print(f"\n{metric.upper()}: per window {res['per_window']['avg']*1000:.4f} ms, "
+              f"batched {res['batched']['avg']*1000:.4f} ms, speedup {res['speedup']:.2f}x")
     
     print(f"\n{'='*80}\n")
     
@@ -0,0 +1,398 @@
+#!/usr/bin/env python3
+
+import argparse
+import gc
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+#scaling benchmark for the whole pipeline on synthetic data (1e3 .. 1e8 bars).
+#every (case, size) runs in a fresh subprocess so peak RSS belongs to that case alone:
+#  wall time     min / median / mean over `repeat` timed runs after one warmup
+#  peak RSS      high-water RSS of the case process, and how much the case raised it
+#  allocations   tracemalloc peak / retained bytes of one extra untimed run (NumPy
+#                buffers are traced; memory owned only by C++ is not)
+#results are written as JSON; `compare` flags regressions against a stored baseline
+
+DEFAULT_SIZES = [10**3, 10**4, 10**5, 10**6, 10**7]
+# writing and parsing a CSV with 1e8 rows takes ~7 GB of disk, so ingestion stops here by default
+DEFAULT_MAX_CSV_ROWS = 10**7
+FAST_WINDOW = 20
+SLOW_WINDOW = 100
+MULTI_WINDOWS = [10, 20, 50, 100, 200]
+DONCHIAN_WINDOW = 500
+INGEST_CASES = ('ingest_csv', 'ingest_cache', 'stream_csv')
+
+def synthetic_ohlcvt(n, seed=0):
+    """Geometric random walk with 1-minute bars, as OHLCVT columns"""
+    rng = np.random.default_rng(seed)
+    close = 100.0 * np.exp(np.cumsum(rng.normal(0.0, 0.001, n)))
+    spread = close * rng.uniform(0.0, 0.002, n)
+    return {
+        'timestamp': 1600000000 + 60 * np.arange(n, dtype=np.int64),
+        'open': np.roll(close, 1),
+        'high': close + spread,
+        'low': close - spread,
+        'close': close,
+        'volume': rng.uniform(0.0, 10.0, n),
+        'trades': rng.integers(1, 100, n),
+    }
+
+def ensure_close_prices(data_dir, n, seed=0):
+    path = os.path.join(data_dir, f'close_{n}_{seed}.npy')
+    if not os.path.exists(path):
+        np.save(path, synthetic_ohlcvt(n, seed)['close'])
+    return path
+
+def ensure_csv(data_dir, n, seed=0, chunk=10**6):
+    """Kraken-style CSV of n synthetic rows, written once per (n, seed) in chunks"""
+    path = os.path.join(data_dir, f'bars_{n}_{seed}.csv')
+    if os.path.exists(path):
+        return path
+    tmp_path = path + '.tmp'
+    columns = synthetic_ohlcvt(n, seed)
+    with open(tmp_path, 'w') as file:
+        for start in range(0, n, chunk):
+            stop = min(start + chunk, n)
+            block = np.column_stack([columns[name][start:stop] for name in
+                                     ('timestamp', 'open', 'high', 'low', 'close', 'volume', 'trades')])
+            np.savetxt(file, block, fmt=['%d', '%.8f', '%.8f', '%.8f', '%.8f', '%.8f', '%d'], delimiter=',')
+    os.replace(tmp_path, path)
+    return path
+
+def prepare_case(case, n, data_dir, seed=0):
+    """Untimed setup: returns the zero-argument function to benchmark"""
+    import backtest
+    import indicator_engine
+    import load_data
+    import stats
+    import strategy
+
+    if case == 'ingest_csv':
+        csv_path = ensure_csv(data_dir, n, seed)
+        return lambda: load_data.load_ohlcvt(csv_path)
+    if case == 'ingest_cache':
+        import data_cache
+        csv_path = ensure_csv(data_dir, n, seed)
+        cache_dir = os.path.join(data_dir, 'cache')
+        data_cache.load_columns(csv_path, cache_dir=cache_dir, warn=False)
+        # mapping is lazy, so touch the close column to include reading it
+        return lambda: float(data_cache.load_columns(csv_path, cache_dir=cache_dir, warn=False)['close'].sum())
+    if case == 'stream_csv':
+        import streaming
+        csv_path = ensure_csv(data_dir, n, seed)
+        # CSV -> both crossover backtests in 16 MB chunks; peak RSS should stay flat as n grows
+        return lambda: streaming.run_streaming(csv_path, FAST_WINDOW, SLOW_WINDOW, chunk_bytes=1 << 24, warn=False)
+
+    close = np.load(ensure_close_prices(data_dir, n, seed))
+    if case == 'sma':
+        return lambda: indicator_engine.simple_moving_average(close, SLOW_WINDOW)
+    if case == 'ema':
+        return lambda: indicator_engine.exponential_moving_average(close, SLOW_WINDOW)
+    if case == 'sma_parallel':
+        return lambda: indicator_engine.simple_moving_average_parallel(close, SLOW_WINDOW)
+    if case == 'ema_parallel':
+        return lambda: indicator_engine.exponential_moving_average_parallel(close, SLOW_WINDOW)
+    if case == 'sma_multi':
+        return lambda: indicator_engine.simple_moving_average_multi(close, MULTI_WINDOWS)
+    if case == 'ema_multi':
+        return lambda: indicator_engine.exponential_moving_average_multi(close, MULTI_WINDOWS)
+    if case == 'bollinger':
+        return lambda: indicator_engine.bollinger_bands(close, SLOW_WINDOW)
+    if case == 'donchian':
+        return lambda: indicator_engine.donchian_channels(close, close, DONCHIAN_WINDOW)
+
+    fast_ma = indicator_engine.exponential_moving_average(close, FAST_WINDOW)
+    slow_ma = indicator_engine.exponential_moving_average(close, SLOW_WINDOW)
+    if case == 'signals':
+        return lambda: strategy.crossover_signals(fast_ma, slow_ma)
+
+    signals = strategy.crossover_signals(fast_ma, slow_ma)
+    if case == 'backtest':
+        def run_backtest():
+            positions = backtest.compute_positions_array(signals)
+            return backtest.compute_equity_curve_array(close, positions)
+        return run_backtest
+
+    equity = backtest.compute_equity_curve_array(close, backtest.compute_positions_array(signals))
+    if case == 'stats':
+        def run_stats():
+            simple_returns = backtest.compute_simple_returns_array(close)
+            return (simple_returns.sum(), backtest.compute_log_returns_array(close).sum(),
+                    stats.compute_maximum_drawdown_array(equity), stats.compute_sharpe_ratio(simple_returns))
+        return run_stats
+
+    if case == 'pipeline':
+        def run_pipeline():
+            # indicators -> signals -> positions -> equity -> stats for one crossover
+            fast = indicator_engine.exponential_moving_average(close, FAST_WINDOW)
+            slow = indicator_engine.exponential_moving_average(close, SLOW_WINDOW)
+            positions = backtest.compute_positions_array(strategy.crossover_signals(fast, slow))
+            curve = backtest.compute_equity_curve_array(close, positions)
+            simple_returns = backtest.compute_simple_returns_array(close)
+            return stats.compute_maximum_drawdown_array(curve), stats.compute_sharpe_ratio(simple_returns)
+        return run_pipeline
+
+    raise ValueError(f"Unknown benchmark case: {case!r}")
+
+CASES = list(INGEST_CASES) + ['sma', 'ema', 'sma_parallel', 'ema_parallel', 'sma_multi', 'ema_multi', 'bollinger', 'donchian', 'signals', 'backtest', 'stats', 'pipeline']
+
+def reset_peak_rss():
+    """Reset the peak RSS counter (Linux); a forked process otherwise starts with its parent's peak"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as file:
+            file.write('5')
+        return True
+    except OSError:
+        return False
+
+def max_rss_bytes():
+    try:
+        # VmHWM honours reset_peak_rss, ru_maxrss does not
+        with open('/proc/self/status') as file:
+            for line in file:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    scale = 1 if sys.platform == 'darwin' else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+def measure_case(case, n, data_dir, repeat=5, min_time=0.2, seed=0):
+    """Time one case in this process; returns a result dict"""
+    func = prepare_case(case, n, data_dir, seed)
+    gc.collect()
+    reset_peak_rss()
+    rss_before = max_rss_bytes()
+
+    func()  # warmup
+    times = []
+    start_all = time.perf_counter()
+    # small sizes are repeated until min_time has passed so the timings are not just noise
+    while len(times) < repeat or (time.perf_counter() - start_all < min_time and len(times) < 1000):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    rss_after = max_rss_bytes()
+
+    tracemalloc.start()
+    result = func()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+
+    times = np.array(times)
+    return {
+        'case': case,
+        'size': n,
+        'repeats': len(times),
+        'wall_min': float(times.min()),
+        'wall_median': float(np.median(times)),
+        'wall_mean': float(times.mean()),
+        'rows_per_second': float(n / np.median(times)) if np.median(times) > 0 else None,
+        'peak_rss_bytes': rss_after,
+        'peak_rss_delta_bytes': max(rss_after - rss_before, 0),
+        'alloc_peak_bytes': peak,
+        'alloc_retained_bytes': retained,
+    }
+
+def run_case_isolated(case, n, data_dir, repeat=5, min_time=0.2, seed=0):
+    """measure_case in a fresh interpreter so earlier cases do not inflate its peak RSS"""
+    cmd = [sys.executable, os.path.abspath(__file__), '_case', case, str(n),
+           '--data-dir', data_dir, '--repeat', str(repeat), '--min-time', str(min_time), '--seed', str(seed)]
+    proc = subprocess.run(cmd, capture_output=True, text=True)
+    if proc.returncode != 0:
+        return {'case': case, 'size': n, 'error': proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else
+                f"exit status {proc.returncode}"}
+    return json.loads(proc.stdout)
+
+def environment_info():
+    import indicator_engine
+    info = {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'engine': os.path.basename(indicator_engine.__file__),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+    try:
+        info['commit'] = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                        cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        pass
+    return info
+
+def run_suite(sizes=None, cases=None, data_dir=None, repeat=5, min_time=0.2, seed=0,
+              max_csv_rows=DEFAULT_MAX_CSV_ROWS, isolate=True, progress=None):
+    """Run every (case, size) pair; returns {'environment': ..., 'results': [...]}"""
+    sizes = sizes or DEFAULT_SIZES
+    cases = cases or CASES
+    data_dir = data_dir or os.path.join(tempfile.gettempdir(), 'pycpp-indicator-bench')
+    os.makedirs(data_dir, exist_ok=True)
+    runner = run_case_isolated if isolate else measure_case
+
+    results = []
+    for n in sizes:
+        run_cases = [case for case in cases if case not in INGEST_CASES or n <= max_csv_rows]
+        # inputs are generated here, not in the case process, so generation never shows up in its peak RSS
+        if any(case in INGEST_CASES for case in run_cases):
+            ensure_csv(data_dir, n, seed)
+        if any(case not in INGEST_CASES for case in run_cases):
+            ensure_close_prices(data_dir, n, seed)
+        for case in run_cases:
+            result = runner(case, n, data_dir, repeat, min_time, seed)
+            results.append(result)
+            if progress:
+                progress(result)
+    return {'environment': environment_info(), 'results': results}
+
+def compare_results(baseline, current, threshold=0.10, memory_threshold=0.20):
+    """
+    Compare two suite outputs case by case. A case regresses when its median wall
+    time grows by more than `threshold`, or its RSS growth / allocation peak grows by
+    more than `memory_threshold` (fractions). A case that failed in the current run
+    (crash, timeout, out of memory) regresses as 'error', and a baseline case the
+    current run does not have as 'missing'. Returns a list of row dicts.
+    """
+    base = {(r['case'], r['size']): r for r in baseline['results'] if 'error' not in r}
+    seen = set()
+    rows = []
+    for result in current['results']:
+        key = (result['case'], result['size'])
+        seen.add(key)
+        if 'error' in result:
+            rows.append({'case': key[0], 'size': key[1], 'regressions': ['error']})
+            continue
+        if key not in base:
+            continue
+        old = base[key]
+        row = {'case': key[0], 'size': key[1], 'regressions': []}
+        row['time_ratio'] = result['wall_median'] / old['wall_median'] if old['wall_median'] > 0 else 1.0
+        if row['time_ratio'] > 1.0 + threshold:
+            row['regressions'].append('time')
+        for field in ('peak_rss_delta_bytes', 'alloc_peak_bytes'):
+            ratio = (result[field] + 1) / (old[field] + 1)
+            row[field.replace('_bytes', '_ratio')] = ratio
+            # ignore growth below a page or so; small sizes are mostly noise
+            if ratio > 1.0 + memory_threshold and result[field] - old[field] > 64 * 1024:
+                row['regressions'].append(field.replace('_bytes', ''))
+        rows.append(row)
+    for key in base:
+        if key not in seen:
+            rows.append({'case': key[0], 'size': key[1], 'regressions': ['missing']})
+    return rows
+
+def format_bytes(n):
+    for unit in ('B', 'KiB', 'MiB', 'GiB'):
+        if abs(n) < 1024 or unit == 'GiB':
+            return f"{n:.0f} {unit}" if unit == 'B' else f"{n:.1f} {unit}"
+        n /= 1024.0
+
+def format_result(result):
+    if 'error' in result:
+        return f"{result['case']:<14} {result['size']:>11,}  ERROR {result['error']}"
+    return (f"{result['case']:<14} {result['size']:>11,} {result['wall_median']*1000:>12.3f} "
+            f"{format_bytes(result['peak_rss_bytes']):>11} {format_bytes(result['peak_rss_delta_bytes']):>11} "
+            f"{format_bytes(result['alloc_peak_bytes']):>11}")
+
+def format_header():
+    header = (f"{'Case':<14} {'Size':>11} {'Median (ms)':>12} {'Peak RSS':>11} {'RSS Delta':>11} "
+              f"{'Alloc Peak':>11}")
+    return header + "\n" + '-' * len(header)
+
+def format_comparison(rows):
+    lines = [f"{'Case':<14} {'Size':>11} {'Time':>8} {'RSS':>8} {'Alloc':>8}  Status"]
+    lines.append('-' * len(lines[0]))
+    for row in rows:
+        status = 'REGRESSION (' + ', '.join(row['regressions']) + ')' if row['regressions'] else 'ok'
+        # failed and missing cases have no ratios
+        ratios = [row.get(field) for field in ('time_ratio', 'peak_rss_delta_ratio', 'alloc_peak_ratio')]
+        ratios = " ".join(f"{ratio:>7.2f}x" if ratio is not None else f"{'-':>8}" for ratio in ratios)
+        lines.append(f"{row['case']:<14} {row['size']:>11,} {ratios}  {status}")
+    return "\n".join(lines)
+
+def parse_sizes(text):
+    """'1e3,1e5,1000000' -> [1000, 100000, 1000000]"""
+    return [int(float(part)) for part in text.split(',') if part.strip()]
+
+def load_json(path):
+    with open(path) as file:
+        return json.load(file)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Scaling benchmark suite for the indicator pipeline.')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    run = sub.add_parser('run', help='Run the suite and write the results as JSON')
+    run.add_argument('--sizes', type=parse_sizes, default=DEFAULT_SIZES,
+                     help='Comma separated series lengths (default: 1e3,1e4,1e5,1e6,1e7; up to 1e8 is supported)')
+    run.add_argument('--cases', default=','.join(CASES), help=f'Comma separated cases from: {", ".join(CASES)}')
+    run.add_argument('--repeat', type=int, default=5, help='Minimum timed runs per case')
+    run.add_argument('--min-time', type=float, default=0.2, help='Keep repeating small cases for at least this long (s)')
+    run.add_argument('--seed', type=int, default=0)
+    run.add_argument('--data-dir', help='Where synthetic inputs are generated and kept between runs')
+    run.add_argument('--max-csv-rows', type=int, default=DEFAULT_MAX_CSV_ROWS,
+                     help='Largest size for the ingestion cases')
+    run.add_argument('--output', '-o', default='bench_results.json', help='JSON results file')
+    run.add_argument('--baseline', help='Compare against this results file and exit 1 on regressions')
+    run.add_argument('--threshold', type=float, default=0.10, help='Allowed wall time growth (fraction)')
+    run.add_argument('--memory-threshold', type=float, default=0.20, help='Allowed memory growth (fraction)')
+
+    compare = sub.add_parser('compare', help='Compare two results files and exit 1 on regressions')
+    compare.add_argument('baseline')
+    compare.add_argument('current')
+    compare.add_argument('--threshold', type=float, default=0.10, help='Allowed wall time growth (fraction)')
+    compare.add_argument('--memory-threshold', type=float, default=0.20, help='Allowed memory growth (fraction)')
+
+    case = sub.add_parser('_case')  # internal: one isolated measurement, JSON on stdout
+    case.add_argument('case')
+    case.add_argument('size', type=int)
+    case.add_argument('--data-dir', required=True)
+    case.add_argument('--repeat', type=int, default=5)
+    case.add_argument('--min-time', type=float, default=0.2)
+    case.add_argument('--seed', type=int, default=0)
+
+    args = parser.parse_args(argv)
+
+    if args.command == '_case':
+        print(json.dumps(measure_case(args.case, args.size, args.data_dir, args.repeat, args.min_time, args.seed)))
+        return 0
+
+    if args.command == 'run':
+        cases = [c.strip() for c in args.cases.split(',') if c.strip()]
+        unknown = sorted(set(cases) - set(CASES))
+        if unknown:
+            parser.error(f"unknown cases: {', '.join(unknown)}")
+        print(format_header())
+        current = run_suite(args.sizes, cases, args.data_dir, args.repeat, args.min_time, args.seed,
+                            args.max_csv_rows, progress=lambda result: print(format_result(result), flush=True))
+        with open(args.output, 'w') as file:
+            json.dump(current, file, indent=2)
+        print(f"\nResults written to {args.output}")
+        if not args.baseline:
+            return 0
+        baseline = load_json(args.baseline)
+    else:
+        baseline, current = load_json(args.baseline), load_json(args.current)
+
+    rows = compare_results(baseline, current, args.threshold, args.memory_threshold)
+    print(format_comparison(rows))
+    regressions = [row for row in rows if row['regressions']]
+    print(f"\n{len(regressions)} regression(s) in {len(rows)} compared cases")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,43 +2,1158 @@
 #include <pybind11/stl.h>
 #include <pybind11/numpy.h>
 #include <vector>
+#include <cstddef>
 
-// Forward declarations from indicator_engine.cpp
-std::vector<double> simple_moving_average(const std::vector<double>& close_prices, int window);
-std::vector<double> exponential_moving_average(const std::vector<double>& close_prices, int window);
+#include "indicator_engine.h"
 
 namespace py = pybind11;
 
-pybind11::array_t<double> py_sma(pybind11::array_t<double> input, int window) {
-    auto buf = input.request();
-    double *ptr = static_cast<double *>(buf.ptr);
-    std::vector<double> prices(ptr, ptr + buf.shape[0]);
-    
-    std::vector<double> result = simple_moving_average(prices, window);
-    
-    return pybind11::array_t<double>(result.size(), result.data());
+static void check_window(int window) {
+    if (window <= 0) {
+        throw py::value_error("window must be a positive integer");
+    }
 }
 
-pybind11::array_t<double> py_ema(pybind11::array_t<double> input, int window) {
-    auto buf = input.request();
-    double *ptr = static_cast<double *>(buf.ptr);
-    std::vector<double> prices(ptr, ptr + buf.shape[0]);
-    
-    std::vector<double> result = exponential_moving_average(prices, window);
-    
-    return pybind11::array_t<double>(result.size(), result.data());
+static void check_1d(const py::array& arr, const char* name) {
+    if (arr.ndim() != 1) {
+        throw py::value_error(std::string(name) + " must be a 1-D array");
+    }
+}
+
+// Element stride of an array along `axis` (NumPy strides are in bytes)
+static std::ptrdiff_t element_stride(const py::array& arr, int axis = 0) {
+    std::ptrdiff_t stride = arr.strides(axis);
+    std::ptrdiff_t itemsize = static_cast<std::ptrdiff_t>(arr.itemsize());
+    if (stride % itemsize != 0) {
+        throw py::value_error("array strides must be a multiple of the item size");
+    }
+    return stride / itemsize;
+}
+
+template <typename T>
+static void check_output_dtype(const py::object& out) {
+    if (!py::isinstance<py::array_t<T>>(out)) {
+        throw py::type_error("out must be a " + py::str(py::dtype::of<T>()).cast<std::string>() + " numpy array");
+    }
+}
+
+// Return the caller's `out` buffer (validated) or allocate a fresh result array
+template <typename T = double>
+static py::array_t<T> prepare_output(const py::object& out, py::ssize_t n) {
+    if (out.is_none()) {
+        return py::array_t<T>(n);
+    }
+    check_output_dtype<T>(out);
+    py::array_t<T> result = py::reinterpret_borrow<py::array_t<T>>(out);
+    check_1d(result, "out");
+    if (result.shape(0) != n) {
+        throw py::value_error("out must have the same length as close_prices");
+    }
+    if (!result.writeable()) {
+        throw py::value_error("out must be writeable");
+    }
+    return result;
+}
+
+// float32 input with a float64 `out` runs the float64 kernel on the converted input, as it
+// did before the float32 overloads existed (pybind does not fall back to the float64
+// overload once the float32 one has been chosen)
+static bool is_float64_output(const py::object& out) {
+    return !out.is_none() && py::isinstance<py::array_t<double>>(out);
+}
+
+static py::array_t<double> upcast(const py::array_t<float>& input) {
+    return py::array_t<double>::ensure(input);
+}
+
+// Same as prepare_output for the (windows x time) result of the multi-window kernels
+template <typename T = double>
+static py::array_t<T> prepare_output_2d(const py::object& out, py::ssize_t rows, py::ssize_t n,
+                                        const char* shape_error = "out must have shape (len(windows), len(close_prices))") {
+    if (out.is_none()) {
+        return py::array_t<T>({rows, n});
+    }
+    check_output_dtype<T>(out);
+    py::array_t<T> result = py::reinterpret_borrow<py::array_t<T>>(out);
+    if (result.ndim() != 2 || result.shape(0) != rows || result.shape(1) != n) {
+        throw py::value_error(shape_error);
+    }
+    if (!result.writeable()) {
+        throw py::value_error("out must be writeable");
+    }
+    return result;
+}
+
+static bool shares_memory(const py::array& a, const py::array& b) {
+    return py::module_::import("numpy").attr("may_share_memory")(a, b).cast<bool>();
+}
+
+// The moving average bindings are registered for float64 and then float32 arrays: pybind
+// tries every overload without conversion first, so float32 input runs the float kernels
+// (float32 result) and anything else is converted to float64 as before.
+template <typename T>
+pybind11::array_t<T> py_sma(pybind11::array_t<T> input, int window, py::object out) {
+    check_window(window);
+    check_1d(input, "close_prices");
+    py::ssize_t n = input.shape(0);
+    py::array_t<T> result = prepare_output<T>(out, n);
+    // The running sum re-reads input[i - window], so the output may not alias the input
+    if (!out.is_none() && shares_memory(input, result)) {
+        throw py::value_error("out must not overlap close_prices for simple_moving_average");
+    }
+
+    const T* in_ptr = input.data();
+    T* out_ptr = result.mutable_data();
+    std::ptrdiff_t in_stride = element_stride(input);
+    std::ptrdiff_t out_stride = element_stride(result);
+    {
+        py::gil_scoped_release release;
+        simple_moving_average(in_ptr, in_stride, n, window, out_ptr, out_stride);
+    }
+    return result;
+}
+
+template <typename T>
+pybind11::array_t<T> py_ema(pybind11::array_t<T> input, int window, py::object out) {
+    check_window(window);
+    check_1d(input, "close_prices");
+    py::ssize_t n = input.shape(0);
+    py::array_t<T> result = prepare_output<T>(out, n);
+
+    const T* in_ptr = input.data();
+    T* out_ptr = result.mutable_data();
+    std::ptrdiff_t in_stride = element_stride(input);
+    std::ptrdiff_t out_stride = element_stride(result);
+    // Each input element is read before the same index is written, so out may be
+    // the input itself (in-place), but not a shifted view of it
+    bool in_place = in_ptr == out_ptr && in_stride == out_stride;
+    if (!out.is_none() && !in_place && shares_memory(input, result)) {
+        throw py::value_error("out must be close_prices itself or not overlap it for exponential_moving_average");
+    }
+    {
+        py::gil_scoped_release release;
+        exponential_moving_average(in_ptr, in_stride, n, window, out_ptr, out_stride);
+    }
+    return result;
+}
+
+// Rolling extremes re-read values up to window-1 bars back, so out may not alias the input.
+// Like the moving averages these are registered for float64 and then float32 arrays.
+template <typename T>
+static pybind11::array_t<T> run_rolling(void (*kernel)(const T*, std::ptrdiff_t, std::ptrdiff_t, int, T*, std::ptrdiff_t),
+                                        const char* name, pybind11::array_t<T> input, int window, py::object out) {
+    check_window(window);
+    check_1d(input, "values");
+    py::ssize_t n = input.shape(0);
+    py::array_t<T> result = prepare_output<T>(out, n);
+    if (!out.is_none() && shares_memory(input, result)) {
+        throw py::value_error(std::string("out must not overlap values for ") + name);
+    }
+
+    const T* in_ptr = input.data();
+    T* out_ptr = result.mutable_data();
+    std::ptrdiff_t in_stride = element_stride(input);
+    std::ptrdiff_t out_stride = element_stride(result);
+    {
+        py::gil_scoped_release release;
+        kernel(in_ptr, in_stride, n, window, out_ptr, out_stride);
+    }
+    return result;
+}
+
+template <typename T>
+pybind11::array_t<T> py_rolling_min(pybind11::array_t<T> input, int window, py::object out) {
+    return run_rolling<T>(&rolling_min<T>, "rolling_min", input, window, out);
+}
+
+template <typename T>
+pybind11::array_t<T> py_rolling_max(pybind11::array_t<T> input, int window, py::object out) {
+    return run_rolling<T>(&rolling_max<T>, "rolling_max", input, window, out);
+}
+
+py::object py_rolling_min_float(pybind11::array_t<float> input, int window, py::object out) {
+    if (is_float64_output(out)) {
+        return py_rolling_min<double>(upcast(input), window, out);
+    }
+    return py_rolling_min<float>(input, window, out);
+}
+
+py::object py_rolling_max_float(pybind11::array_t<float> input, int window, py::object out) {
+    if (is_float64_output(out)) {
+        return py_rolling_max<double>(upcast(input), window, out);
+    }
+    return py_rolling_max<float>(input, window, out);
+}
+
+template <typename T>
+py::tuple py_donchian_channels(pybind11::array_t<T> high, pybind11::array_t<T> low, int window) {
+    check_window(window);
+    check_1d(high, "high");
+    check_1d(low, "low");
+    py::ssize_t n = high.shape(0);
+    if (low.shape(0) != n) {
+        throw py::value_error("high and low must have the same length");
+    }
+    py::array_t<T> upper(n), middle(n), lower(n);
+
+    const T* high_ptr = high.data();
+    const T* low_ptr = low.data();
+    std::ptrdiff_t high_stride = element_stride(high);
+    std::ptrdiff_t low_stride = element_stride(low);
+    T* upper_ptr = upper.mutable_data();
+    T* middle_ptr = middle.mutable_data();
+    T* lower_ptr = lower.mutable_data();
+    {
+        py::gil_scoped_release release;
+        donchian_channels(high_ptr, high_stride, low_ptr, low_stride, n, window, upper_ptr, middle_ptr, lower_ptr);
+    }
+    return py::make_tuple(upper, middle, lower);
+}
+
+// Dispersion kernels re-read the value leaving the window, so out may not alias the input
+static void check_ddof(int window, int ddof) {
+    if (ddof < 0 || ddof >= window) {
+        throw py::value_error("ddof must be non-negative and smaller than window");
+    }
+}
+
+template <typename T>
+static pybind11::array_t<T> run_dispersion(void (*kernel)(const T*, std::ptrdiff_t, std::ptrdiff_t, int, int, T*,
+                                                          std::ptrdiff_t),
+                                           const char* name, pybind11::array_t<T> input, int window, int ddof,
+                                           py::object out) {
+    check_window(window);
+    check_ddof(window, ddof);
+    check_1d(input, "values");
+    py::ssize_t n = input.shape(0);
+    py::array_t<T> result = prepare_output<T>(out, n);
+    if (!out.is_none() && shares_memory(input, result)) {
+        throw py::value_error(std::string("out must not overlap values for ") + name);
+    }
+
+    const T* in_ptr = input.data();
+    T* out_ptr = result.mutable_data();
+    std::ptrdiff_t in_stride = element_stride(input);
+    std::ptrdiff_t out_stride = element_stride(result);
+    {
+        py::gil_scoped_release release;
+        kernel(in_ptr, in_stride, n, window, ddof, out_ptr, out_stride);
+    }
+    return result;
+}
+
+template <typename T>
+pybind11::array_t<T> py_rolling_variance(pybind11::array_t<T> input, int window, int ddof, py::object out) {
+    return run_dispersion<T>(&rolling_variance<T>, "rolling_variance", input, window, ddof, out);
+}
+
+template <typename T>
+pybind11::array_t<T> py_rolling_std(pybind11::array_t<T> input, int window, int ddof, py::object out) {
+    return run_dispersion<T>(&rolling_std<T>, "rolling_std", input, window, ddof, out);
+}
+
+template <typename T>
+pybind11::array_t<T> py_rolling_zscore(pybind11::array_t<T> input, int window, int ddof, py::object out) {
+    return run_dispersion<T>(&rolling_zscore<T>, "rolling_zscore", input, window, ddof, out);
+}
+
+py::object py_rolling_variance_float(pybind11::array_t<float> input, int window, int ddof, py::object out) {
+    if (is_float64_output(out)) {
+        return py_rolling_variance<double>(upcast(input), window, ddof, out);
+    }
+    return py_rolling_variance<float>(input, window, ddof, out);
+}
+
+py::object py_rolling_std_float(pybind11::array_t<float> input, int window, int ddof, py::object out) {
+    if (is_float64_output(out)) {
+        return py_rolling_std<double>(upcast(input), window, ddof, out);
+    }
+    return py_rolling_std<float>(input, window, ddof, out);
+}
+
+py::object py_rolling_zscore_float(pybind11::array_t<float> input, int window, int ddof, py::object out) {
+    if (is_float64_output(out)) {
+        return py_rolling_zscore<double>(upcast(input), window, ddof, out);
+    }
+    return py_rolling_zscore<float>(input, window, ddof, out);
+}
+
+template <typename T>
+py::tuple py_bollinger_bands(pybind11::array_t<T> input, int window, double num_std, int ddof) {
+    check_window(window);
+    check_ddof(window, ddof);
+    check_1d(input, "close_prices");
+    py::ssize_t n = input.shape(0);
+    py::array_t<T> upper(n), middle(n), lower(n);
+
+    const T* in_ptr = input.data();
+    std::ptrdiff_t in_stride = element_stride(input);
+    T* upper_ptr = upper.mutable_data();
+    T* middle_ptr = middle.mutable_data();
+    T* lower_ptr = lower.mutable_data();
+    {
+        py::gil_scoped_release release;
+        bollinger_bands(in_ptr, in_stride, n, window, num_std, ddof, upper_ptr, middle_ptr, lower_ptr);
+    }
+    return py::make_tuple(upper, middle, lower);
+}
+
+// OHLCV kernels take several columns of the same length; each re-reads earlier bars, so
+// `out` may not overlap any of them
+static py::ssize_t check_columns(const std::vector<std::pair<py::array, const char*> >& columns) {
+    py::ssize_t n = -1;
+    for (const auto& column : columns) {
+        check_1d(column.first, column.second);
+        if (n >= 0 && column.first.shape(0) != n) {
+            throw py::value_error("OHLCV columns must have the same length");
+        }
+        n = column.first.shape(0);
+    }
+    return n;
+}
+
+static py::array_t<double> prepare_ohlcv_output(const py::object& out, py::ssize_t n,
+                                                const std::vector<std::pair<py::array, const char*> >& columns) {
+    py::array_t<double> result = prepare_output(out, n);
+    if (!out.is_none()) {
+        for (const auto& column : columns) {
+            if (shares_memory(column.first, result)) {
+                throw py::value_error(std::string("out must not overlap ") + column.second);
+            }
+        }
+    }
+    return result;
+}
+
+pybind11::array_t<double> py_rsi(pybind11::array_t<double> close, int window, py::object out) {
+    check_window(window);
+    std::vector<std::pair<py::array, const char*> > columns = {{close, "close"}};
+    py::ssize_t n = check_columns(columns);
+    py::array_t<double> result = prepare_ohlcv_output(out, n, columns);
+
+    const double* close_ptr = close.data();
+    std::ptrdiff_t close_stride = element_stride(close);
+    double* out_ptr = result.mutable_data();
+    std::ptrdiff_t out_stride = element_stride(result);
+    {
+        py::gil_scoped_release release;
+        relative_strength_index(close_ptr, close_stride, n, window, out_ptr, out_stride);
+    }
+    return result;
+}
+
+py::tuple py_macd(pybind11::array_t<double> close, int fast, int slow, int signal) {
+    check_window(fast);
+    check_window(slow);
+    check_window(signal);
+    check_1d(close, "close");
+    py::ssize_t n = close.shape(0);
+    py::array_t<double> line(n), signal_line(n), histogram(n);
+
+    const double* close_ptr = close.data();
+    std::ptrdiff_t close_stride = element_stride(close);
+    double* line_ptr = line.mutable_data();
+    double* signal_ptr = signal_line.mutable_data();
+    double* histogram_ptr = histogram.mutable_data();
+    {
+        py::gil_scoped_release release;
+        macd(close_ptr, close_stride, n, fast, slow, signal, line_ptr, signal_ptr, histogram_ptr);
+    }
+    return py::make_tuple(line, signal_line, histogram);
+}
+
+pybind11::array_t<double> py_atr(pybind11::array_t<double> high, pybind11::array_t<double> low,
+                                 pybind11::array_t<double> close, int window, py::object out) {
+    check_window(window);
+    std::vector<std::pair<py::array, const char*> > columns = {{high, "high"}, {low, "low"}, {close, "close"}};
+    py::ssize_t n = check_columns(columns);
+    py::array_t<double> result = prepare_ohlcv_output(out, n, columns);
+
+    const double* high_ptr = high.data();
+    const double* low_ptr = low.data();
+    const double* close_ptr = close.data();
+    std::ptrdiff_t high_stride = element_stride(high);
+    std::ptrdiff_t low_stride = element_stride(low);
+    std::ptrdiff_t close_stride = element_stride(close);
+    double* out_ptr = result.mutable_data();
+    std::ptrdiff_t out_stride = element_stride(result);
+    {
+        py::gil_scoped_release release;
+        average_true_range(high_ptr, high_stride, low_ptr, low_stride, close_ptr, close_stride, n,
+                           window, out_ptr, out_stride);
+    }
+    return result;
+}
+
+pybind11::array_t<double> py_vwap(pybind11::array_t<double> high, pybind11::array_t<double> low,
+                                  pybind11::array_t<double> close, pybind11::array_t<double> volume,
+                                  int window, py::object out) {
+    if (window < 0) {
+        throw py::value_error("window must be 0 (cumulative) or a positive integer");
+    }
+    std::vector<std::pair<py::array, const char*> > columns = {
+        {high, "high"}, {low, "low"}, {close, "close"}, {volume, "volume"}};
+    py::ssize_t n = check_columns(columns);
+    py::array_t<double> result = prepare_ohlcv_output(out, n, columns);
+
+    const double* high_ptr = high.data();
+    const double* low_ptr = low.data();
+    const double* close_ptr = close.data();
+    const double* volume_ptr = volume.data();
+    std::ptrdiff_t high_stride = element_stride(high);
+    std::ptrdiff_t low_stride = element_stride(low);
+    std::ptrdiff_t close_stride = element_stride(close);
+    std::ptrdiff_t volume_stride = element_stride(volume);
+    double* out_ptr = result.mutable_data();
+    std::ptrdiff_t out_stride = element_stride(result);
+    {
+        py::gil_scoped_release release;
+        volume_weighted_average_price(high_ptr, high_stride, low_ptr, low_stride, close_ptr, close_stride,
+                                      volume_ptr, volume_stride, n, window, out_ptr, out_stride);
+    }
+    return result;
+}
+
+pybind11::array_t<double> py_obv(pybind11::array_t<double> close, pybind11::array_t<double> volume, py::object out) {
+    std::vector<std::pair<py::array, const char*> > columns = {{close, "close"}, {volume, "volume"}};
+    py::ssize_t n = check_columns(columns);
+    py::array_t<double> result = prepare_ohlcv_output(out, n, columns);
+
+    const double* close_ptr = close.data();
+    const double* volume_ptr = volume.data();
+    std::ptrdiff_t close_stride = element_stride(close);
+    std::ptrdiff_t volume_stride = element_stride(volume);
+    double* out_ptr = result.mutable_data();
+    std::ptrdiff_t out_stride = element_stride(result);
+    {
+        py::gil_scoped_release release;
+        on_balance_volume(close_ptr, close_stride, volume_ptr, volume_stride, n, out_ptr, out_stride);
+    }
+    return result;
+}
+
+template <typename T>
+pybind11::array_t<T> py_sma_parallel(pybind11::array_t<T> input, int window, int threads, py::object out) {
+    check_window(window);
+    check_1d(input, "close_prices");
+    py::ssize_t n = input.shape(0);
+    py::array_t<T> result = prepare_output<T>(out, n);
+    // chunks re-read the window before them, which another thread may already have written
+    if (!out.is_none() && shares_memory(input, result)) {
+        throw py::value_error("out must not overlap close_prices for simple_moving_average_parallel");
+    }
+
+    const T* in_ptr = input.data();
+    T* out_ptr = result.mutable_data();
+    std::ptrdiff_t in_stride = element_stride(input);
+    std::ptrdiff_t out_stride = element_stride(result);
+    {
+        py::gil_scoped_release release;
+        simple_moving_average_parallel(in_ptr, in_stride, n, window, out_ptr, out_stride, threads);
+    }
+    return result;
+}
+
+template <typename T>
+pybind11::array_t<T> py_ema_parallel(pybind11::array_t<T> input, int window, int threads, py::object out) {
+    check_window(window);
+    check_1d(input, "close_prices");
+    py::ssize_t n = input.shape(0);
+    py::array_t<T> result = prepare_output<T>(out, n);
+
+    const T* in_ptr = input.data();
+    T* out_ptr = result.mutable_data();
+    std::ptrdiff_t in_stride = element_stride(input);
+    std::ptrdiff_t out_stride = element_stride(result);
+    // like the serial EMA every element is read before the same index is written
+    bool in_place = in_ptr == out_ptr && in_stride == out_stride;
+    if (!out.is_none() && !in_place && shares_memory(input, result)) {
+        throw py::value_error("out must be close_prices itself or not overlap it for exponential_moving_average_parallel");
+    }
+    {
+        py::gil_scoped_release release;
+        exponential_moving_average_parallel(in_ptr, in_stride, n, window, out_ptr, out_stride, threads);
+    }
+    return result;
+}
+
+// Incremental indicators: update_many feeds a whole array through the running state
+template <typename Indicator>
+pybind11::array_t<double> py_update_many(Indicator& indicator, pybind11::array_t<double> input, py::object out) {
+    check_1d(input, "prices");
+    py::ssize_t n = input.shape(0);
+    py::array_t<double> result = prepare_output(out, n);
+
+    const double* in_ptr = input.data();
+    double* out_ptr = result.mutable_data();
+    std::ptrdiff_t in_stride = element_stride(input);
+    std::ptrdiff_t out_stride = element_stride(result);
+    bool in_place = in_ptr == out_ptr && in_stride == out_stride;
+    if (!out.is_none() && !in_place && shares_memory(input, result)) {
+        throw py::value_error("out must be prices itself or not overlap it");
+    }
+    {
+        py::gil_scoped_release release;
+        indicator.update_many(in_ptr, in_stride, n, out_ptr, out_stride);
+    }
+    return result;
+}
+
+static py::dict sma_get_state(const IncrementalSMA& sma) {
+    py::dict state;
+    state["window"] = sma.window();
+    state["count"] = sma.count();
+    state["sum"] = sma.sum();
+    state["buffer"] = sma.buffer();
+    return state;
+}
+
+static void sma_set_state(IncrementalSMA& sma, const py::dict& state) {
+    if (state["window"].cast<int>() != sma.window()) {
+        throw py::value_error("state window does not match this indicator");
+    }
+    sma.restore(state["count"].cast<long long>(), state["sum"].cast<double>(),
+                state["buffer"].cast<std::vector<double>>());
+}
+
+static py::dict ema_get_state(const IncrementalEMA& ema) {
+    py::dict state;
+    state["window"] = ema.window();
+    state["count"] = ema.count();
+    state["value"] = ema.value();
+    return state;
+}
+
+static void ema_set_state(IncrementalEMA& ema, const py::dict& state) {
+    if (state["window"].cast<int>() != ema.window()) {
+        throw py::value_error("state window does not match this indicator");
+    }
+    ema.restore(state["count"].cast<long long>(), state["value"].cast<double>());
+}
+
+// Hand a std::vector's buffer to NumPy without copying; the capsule frees it
+template <typename T>
+static py::array_t<T> vector_to_array(std::vector<T>&& values) {
+    std::vector<T>* owned = new std::vector<T>(std::move(values));
+    py::capsule owner(owned, [](void* p) { delete static_cast<std::vector<T>*>(p); });
+    return py::array_t<T>(static_cast<py::ssize_t>(owned->size()), owned->data(), owner);
+}
+
+static py::dict columns_to_dict(OHLCVTColumns& columns) {
+    py::dict arrays;
+    arrays["timestamp"] = vector_to_array(std::move(columns.timestamp));
+    arrays["open"] = vector_to_array(std::move(columns.open));
+    arrays["high"] = vector_to_array(std::move(columns.high));
+    arrays["low"] = vector_to_array(std::move(columns.low));
+    arrays["close"] = vector_to_array(std::move(columns.close));
+    arrays["volume"] = vector_to_array(std::move(columns.volume));
+    arrays["trades"] = vector_to_array(std::move(columns.trades));
+    return arrays;
+}
+
+static py::tuple columns_to_python(OHLCVTColumns& columns) {
+    return py::make_tuple(columns_to_dict(columns), columns.malformed);
+}
+
+py::tuple py_load_ohlcvt_csv(const std::string& path) {
+    OHLCVTColumns columns;
+    {
+        py::gil_scoped_release release;
+        columns = load_ohlcvt_csv(path);
+    }
+    return columns_to_python(columns);
+}
+
+// Parse CSV rows held in a bytes-like object; the buffer stays alive (and pinned) while parsing
+py::tuple py_parse_ohlcvt_csv(py::buffer data, long long first_line) {
+    if (first_line < 1) {
+        throw py::value_error("first_line must be at least 1");
+    }
+    py::buffer_info info = data.request();
+    if (info.ndim != 1 || info.itemsize != 1 || info.strides[0] != 1) {
+        throw py::value_error("data must be a contiguous bytes-like object");
+    }
+    const char* begin = static_cast<const char*>(info.ptr);
+    OHLCVTColumns columns;
+    {
+        py::gil_scoped_release release;
+        parse_ohlcvt_csv(begin, begin + info.size, first_line, columns);
+    }
+    return columns_to_python(columns);
+}
+
+static py::dict run_resample(const OHLCVTView& view, std::ptrdiff_t n, const std::vector<std::int64_t>& intervals) {
+    std::vector<OHLCVTColumns> bars;
+    {
+        py::gil_scoped_release release;
+        resample_ohlcvt(view, n, intervals, bars);
+    }
+    py::dict result;
+    for (std::size_t k = 0; k < intervals.size(); ++k) {
+        result[py::int_(intervals[k])] = columns_to_dict(bars[k]);
+    }
+    return result;
+}
+
+py::dict py_resample_ohlcvt(pybind11::array_t<std::int64_t> timestamp, pybind11::array_t<double> open,
+                            pybind11::array_t<double> high, pybind11::array_t<double> low,
+                            pybind11::array_t<double> close, pybind11::array_t<double> volume,
+                            const std::vector<std::int64_t>& intervals, py::object trades) {
+    std::vector<std::pair<py::array, const char*> > columns = {
+        {timestamp, "timestamp"}, {open, "open"}, {high, "high"}, {low, "low"}, {close, "close"}, {volume, "volume"}};
+    py::array_t<std::int64_t> trade_counts;
+    if (!trades.is_none()) {
+        trade_counts = py::array_t<std::int64_t>::ensure(trades);
+        if (!trade_counts) {
+            throw py::type_error("trades must be convertible to an int64 array");
+        }
+        columns.push_back({trade_counts, "trades"});
+    }
+    py::ssize_t n = check_columns(columns);
+    OHLCVTView view = {timestamp.data(), element_stride(timestamp), open.data(), element_stride(open),
+                       high.data(), element_stride(high), low.data(), element_stride(low),
+                       close.data(), element_stride(close), volume.data(), element_stride(volume),
+                       trades.is_none() ? nullptr : trade_counts.data(),
+                       trades.is_none() ? 0 : element_stride(trade_counts)};
+    return run_resample(view, n, intervals);
+}
+
+py::dict py_resample_trades(pybind11::array_t<std::int64_t> timestamp, pybind11::array_t<double> price,
+                            pybind11::array_t<double> volume, const std::vector<std::int64_t>& intervals) {
+    py::ssize_t n = check_columns({{timestamp, "timestamp"}, {price, "price"}, {volume, "volume"}});
+    std::ptrdiff_t price_stride = element_stride(price);
+    OHLCVTView view = {timestamp.data(), element_stride(timestamp), price.data(), price_stride,
+                       price.data(), price_stride, price.data(), price_stride, price.data(), price_stride,
+                       volume.data(), element_stride(volume), nullptr, 0};
+    return run_resample(view, n, intervals);
+}
+
+template <typename T, typename Kernel>
+static pybind11::array_t<T> run_multi(Kernel kernel, pybind11::array_t<T> input,
+                                      const std::vector<int>& windows, py::object out) {
+    for (int window : windows) {
+        check_window(window);
+    }
+    check_1d(input, "close_prices");
+    py::ssize_t n = input.shape(0);
+    py::ssize_t rows = static_cast<py::ssize_t>(windows.size());
+    py::array_t<T> result = prepare_output_2d<T>(out, rows, n);
+    if (!out.is_none() && shares_memory(input, result)) {
+        throw py::value_error("out must not overlap close_prices");
+    }
+
+    const T* in_ptr = input.data();
+    T* out_ptr = result.mutable_data();
+    std::ptrdiff_t in_stride = element_stride(input);
+    std::ptrdiff_t row_stride = element_stride(result, 0);
+    std::ptrdiff_t col_stride = element_stride(result, 1);
+    {
+        py::gil_scoped_release release;
+        kernel(in_ptr, in_stride, n, windows.data(), rows, out_ptr, row_stride, col_stride);
+    }
+    return result;
+}
+
+template <typename T>
+pybind11::array_t<T> py_sma_multi(pybind11::array_t<T> input, const std::vector<int>& windows, py::object out) {
+    return run_multi<T>(&simple_moving_average_multi<T>, input, windows, out);
+}
+
+template <typename T>
+pybind11::array_t<T> py_ema_multi(pybind11::array_t<T> input, const std::vector<int>& windows, py::object out) {
+    return run_multi<T>(&exponential_moving_average_multi<T>, input, windows, out);
+}
+
+py::object py_sma_float(pybind11::array_t<float> input, int window, py::object out) {
+    if (is_float64_output(out)) {
+        return py_sma<double>(upcast(input), window, out);
+    }
+    return py_sma<float>(input, window, out);
+}
+
+py::object py_ema_float(pybind11::array_t<float> input, int window, py::object out) {
+    if (is_float64_output(out)) {
+        return py_ema<double>(upcast(input), window, out);
+    }
+    return py_ema<float>(input, window, out);
+}
+
+py::object py_sma_parallel_float(pybind11::array_t<float> input, int window, int threads, py::object out) {
+    if (is_float64_output(out)) {
+        return py_sma_parallel<double>(upcast(input), window, threads, out);
+    }
+    return py_sma_parallel<float>(input, window, threads, out);
+}
+
+py::object py_ema_parallel_float(pybind11::array_t<float> input, int window, int threads, py::object out) {
+    if (is_float64_output(out)) {
+        return py_ema_parallel<double>(upcast(input), window, threads, out);
+    }
+    return py_ema_parallel<float>(input, window, threads, out);
+}
+
+py::object py_sma_multi_float(pybind11::array_t<float> input, const std::vector<int>& windows, py::object out) {
+    if (is_float64_output(out)) {
+        return py_sma_multi<double>(upcast(input), windows, out);
+    }
+    return py_sma_multi<float>(input, windows, out);
+}
+
+py::object py_ema_multi_float(pybind11::array_t<float> input, const std::vector<int>& windows, py::object out) {
+    if (is_float64_output(out)) {
+        return py_ema_multi<double>(upcast(input), windows, out);
+    }
+    return py_ema_multi<float>(input, windows, out);
+}
+
+static py::dict stats_to_python(const PerformanceStats& stats) {
+    py::dict result;
+    result["periods"] = stats.periods;
+    result["total_return"] = stats.total_return;
+    result["total_simple_return"] = stats.total_simple_return;
+    result["total_log_return"] = stats.total_log_return;
+    result["mean_return"] = stats.mean_return;
+    result["volatility"] = stats.volatility;
+    result["sharpe"] = stats.sharpe;
+    result["sortino"] = stats.sortino;
+    result["hit_rate"] = stats.hit_rate;
+    result["max_drawdown"] = stats.max_drawdown;
+    result["max_drawdown_peak"] = stats.max_drawdown_peak;
+    result["max_drawdown_trough"] = stats.max_drawdown_trough;
+    result["max_drawdown_recovery"] = stats.max_drawdown_recovery;
+    result["max_drawdown_duration"] = stats.max_drawdown_duration;
+    return result;
+}
+
+static void check_periods_per_year(double periods_per_year) {
+    if (!(periods_per_year > 0.0)) {
+        throw py::value_error("periods_per_year must be positive");
+    }
+}
+
+static void accumulate_equity(PerformanceAccumulator& acc, pybind11::array_t<double> equity) {
+    check_1d(equity, "equity");
+    const double* ptr = equity.data();
+    std::ptrdiff_t stride = element_stride(equity);
+    py::ssize_t n = equity.shape(0);
+    py::gil_scoped_release release;
+    acc.add_equity_many(ptr, stride, n);
+}
+
+static void accumulate_returns(PerformanceAccumulator& acc, pybind11::array_t<double> returns) {
+    check_1d(returns, "returns");
+    const double* ptr = returns.data();
+    std::ptrdiff_t stride = element_stride(returns);
+    py::ssize_t n = returns.shape(0);
+    py::gil_scoped_release release;
+    acc.add_returns_many(ptr, stride, n);
+}
+
+py::dict py_performance_stats(pybind11::array_t<double> values, const std::string& kind,
+                              double periods_per_year, double risk_free_rate) {
+    check_periods_per_year(periods_per_year);
+    PerformanceAccumulator acc(risk_free_rate);
+    if (kind == "equity") {
+        accumulate_equity(acc, values);
+    } else if (kind == "returns") {
+        accumulate_returns(acc, values);
+    } else {
+        throw py::value_error("kind must be 'equity' or 'returns'");
+    }
+    return stats_to_python(acc.result(periods_per_year));
+}
+
+template <typename P>
+py::array_t<double> py_portfolio_equity(pybind11::array_t<double> returns, pybind11::array_t<P> positions,
+                                        pybind11::array_t<double> sizing, double initial_capital, double cost,
+                                        py::object out) {
+    if (positions.ndim() != 2) {
+        throw py::value_error("positions must be a 2-D (strategies x time) array");
+    }
+    py::ssize_t rows = positions.shape(0);
+    py::ssize_t n = positions.shape(1);
+    py::ssize_t n_returns = n > 0 ? n - 1 : 0;
+    if (returns.ndim() == 1 ? returns.shape(0) != n_returns
+                            : returns.ndim() != 2 || returns.shape(0) != rows || returns.shape(1) != n_returns) {
+        throw py::value_error("returns must have shape (n - 1,) or (strategies, n - 1) for n bars of positions");
+    }
+    check_1d(sizing, "sizing");
+    if (sizing.shape(0) != rows) {
+        throw py::value_error("sizing must have one entry per strategy");
+    }
+    py::array_t<double> result = prepare_output_2d<double>(out, rows, n, "out must have the shape of positions");
+    PortfolioView<P> view;
+    view.returns = returns.data();
+    view.returns_row_stride = returns.ndim() == 2 ? element_stride(returns, 0) : 0;
+    view.returns_stride = element_stride(returns, returns.ndim() - 1);
+    view.positions = positions.data();
+    view.positions_row_stride = element_stride(positions, 0);
+    view.positions_stride = element_stride(positions, 1);
+    view.sizing = sizing.data();
+    view.sizing_stride = element_stride(sizing);
+    double* dst = result.mutable_data();
+    std::ptrdiff_t row_stride = element_stride(result, 0);
+    std::ptrdiff_t col_stride = element_stride(result, 1);
+    {
+        py::gil_scoped_release release;
+        portfolio_equity<P>(view, rows, n, initial_capital, cost, dst, row_stride, col_stride);
+    }
+    return result;
+}
+
+static py::dict py_kernel_timers() {
+    py::dict timers;
+    for (const auto& entry : kernel_timer_snapshot()) {
+        py::dict stats;
+        stats["calls"] = entry.second.calls;
+        stats["items"] = entry.second.items;
+        stats["bytes"] = entry.second.bytes;
+        stats["seconds"] = entry.second.seconds;
+        timers[py::str(entry.first)] = stats;
+    }
+    return timers;
 }
 
 PYBIND11_MODULE(indicator_engine, m) {
-    m.def("simple_moving_average", &py_sma, 
-          "Compute Simple Moving Average",
-          py::arg("close_prices"), 
-          py::arg("window"));
-    
-    m.def("exponential_moving_average", &py_ema,
-          "Compute Exponential Moving Average",
+    m.def("simple_moving_average", &py_sma<double>,
+          "Compute Simple Moving Average (zero-padded for the first window-1 values).\n\n"
+          "Runs directly on the input buffer; pass a preallocated array of the result dtype as `out`\n"
+          "to avoid allocating a result.",
+          py::arg("close_prices"),
+          py::arg("window"),
+          py::arg("out") = py::none());
+    m.def("simple_moving_average", &py_sma_float,
+          "float32 input: float32 result (computed with float64 accumulators), or float64 with a float64 out.",
+          py::arg("close_prices"),
+          py::arg("window"),
+          py::arg("out") = py::none());
+
+    m.def("exponential_moving_average", &py_ema<double>,
+          "Compute Exponential Moving Average.\n\n"
+          "Runs directly on the input buffer; pass a preallocated array of the result dtype as `out`\n"
+          "(or the input itself) to avoid allocating a result.",
+          py::arg("close_prices"),
+          py::arg("window"),
+          py::arg("out") = py::none());
+    m.def("exponential_moving_average", &py_ema_float,
+          "float32 input: float32 result (computed with float64 accumulators), or float64 with a float64 out.",
+          py::arg("close_prices"),
+          py::arg("window"),
+          py::arg("out") = py::none());
+
+    m.def("simple_moving_average_parallel", &py_sma_parallel<double>,
+          "Multithreaded simple_moving_average for very long series.\n\n"
+          "Each thread seeds its chunk's running sum from the preceding window. Differs from the\n"
+          "serial kernel only by running-sum rounding (~1e-12 x max |price|). threads <= 0 uses\n"
+          "every hardware thread; series shorter than 2 x 65536 points run serially.",
+          py::arg("close_prices"),
+          py::arg("window"),
+          py::arg("threads") = 0,
+          py::arg("out") = py::none());
+    m.def("simple_moving_average_parallel", &py_sma_parallel_float,
+          "float32 input: float32 result (computed with float64 accumulators), or float64 with a float64 out.",
+          py::arg("close_prices"),
+          py::arg("window"),
+          py::arg("threads") = 0,
+          py::arg("out") = py::none());
+
+    m.def("exponential_moving_average_parallel", &py_ema_parallel<double>,
+          "Multithreaded exponential_moving_average (parallel scan with carry fix-ups).\n\n"
+          "Relative difference to the serial kernel is below ~1e-13. threads <= 0 uses every\n"
+          "hardware thread; series shorter than 2 x 65536 points run serially. May run in place.",
+          py::arg("close_prices"),
+          py::arg("window"),
+          py::arg("threads") = 0,
+          py::arg("out") = py::none());
+    m.def("exponential_moving_average_parallel", &py_ema_parallel_float,
+          "float32 input: float32 result (computed with float64 accumulators), or float64 with a float64 out.",
+          py::arg("close_prices"),
+          py::arg("window"),
+          py::arg("threads") = 0,
+          py::arg("out") = py::none());
+
+    m.def("simple_moving_average_multi", &py_sma_multi<double>,
+          "Compute one SMA row per window, shape (len(windows), len(close_prices)).\n\n"
+          "All windows are derived from a single shared prefix sum in one pass over the data.",
+          py::arg("close_prices"),
+          py::arg("windows"),
+          py::arg("out") = py::none());
+    m.def("simple_moving_average_multi", &py_sma_multi_float,
+          "float32 input: float32 result (computed with float64 accumulators), or float64 with a float64 out.",
+          py::arg("close_prices"),
+          py::arg("windows"),
+          py::arg("out") = py::none());
+
+    m.def("exponential_moving_average_multi", &py_ema_multi<double>,
+          "Compute one EMA row per window, shape (len(windows), len(close_prices)).\n\n"
+          "All windows are updated together in one blocked pass over the data.",
+          py::arg("close_prices"),
+          py::arg("windows"),
+          py::arg("out") = py::none());
+    m.def("exponential_moving_average_multi", &py_ema_multi_float,
+          "float32 input: float32 result (computed with float64 accumulators), or float64 with a float64 out.",
+          py::arg("close_prices"),
+          py::arg("windows"),
+          py::arg("out") = py::none());
+
+    m.def("rolling_variance", &py_rolling_variance<double>,
+          "Rolling variance over the last `window` values (zero-padded for the first window-1 values).\n\n"
+          "Single pass: the mean shares the SMA's running sum, the squared deviations are\n"
+          "updated Welford-style. ddof=0 is the population variance (as np.var), ddof=1 the sample variance.",
+          py::arg("values"),
+          py::arg("window"),
+          py::arg("ddof") = 0,
+          py::arg("out") = py::none());
+    m.def("rolling_variance", &py_rolling_variance_float,
+          "float32 input: float32 result (computed with float64 accumulators), or float64 with a float64 out.",
+          py::arg("values"),
+          py::arg("window"),
+          py::arg("ddof") = 0,
+          py::arg("out") = py::none());
+
+    m.def("rolling_std", &py_rolling_std<double>,
+          "Rolling standard deviation, the square root of rolling_variance.",
+          py::arg("values"),
+          py::arg("window"),
+          py::arg("ddof") = 0,
+          py::arg("out") = py::none());
+    m.def("rolling_std", &py_rolling_std_float,
+          "float32 input: float32 result (computed with float64 accumulators), or float64 with a float64 out.",
+          py::arg("values"),
+          py::arg("window"),
+          py::arg("ddof") = 0,
+          py::arg("out") = py::none());
+
+    m.def("rolling_zscore", &py_rolling_zscore<double>,
+          "Rolling z-score (value - rolling mean) / rolling std, zero-padded for the first\n"
+          "window-1 values and 0.0 where the window is constant.",
+          py::arg("values"),
+          py::arg("window"),
+          py::arg("ddof") = 0,
+          py::arg("out") = py::none());
+    m.def("rolling_zscore", &py_rolling_zscore_float,
+          "float32 input: float32 result (computed with float64 accumulators), or float64 with a float64 out.",
+          py::arg("values"),
+          py::arg("window"),
+          py::arg("ddof") = 0,
+          py::arg("out") = py::none());
+
+    m.def("bollinger_bands", &py_bollinger_bands<double>,
+          "Bollinger Bands, returns (upper, middle, lower).\n\n"
+          "middle is identical to simple_moving_average; upper/lower add/subtract num_std\n"
+          "rolling standard deviations. All are zero-padded for the first window-1 values.",
+          py::arg("close_prices"),
+          py::arg("window"),
+          py::arg("num_std") = 2.0,
+          py::arg("ddof") = 0);
+    m.def("bollinger_bands", &py_bollinger_bands<float>,
+          "float32 input: float32 bands (computed with float64 accumulators).",
           py::arg("close_prices"),
+          py::arg("window"),
+          py::arg("num_std") = 2.0,
+          py::arg("ddof") = 0);
+
+    m.def("rolling_min", &py_rolling_min<double>,
+          "Rolling minimum over the last `window` values (zero-padded for the first window-1 values).\n\n"
+          "O(n) for any window (monotonic deque); pass an array of the result dtype as `out` to reuse it.",
+          py::arg("values"),
+          py::arg("window"),
+          py::arg("out") = py::none());
+    m.def("rolling_min", &py_rolling_min_float,
+          "float32 input: float32 result, or float64 with a float64 out.",
+          py::arg("values"),
+          py::arg("window"),
+          py::arg("out") = py::none());
+
+    m.def("rolling_max", &py_rolling_max<double>,
+          "Rolling maximum over the last `window` values (zero-padded for the first window-1 values).\n\n"
+          "O(n) for any window (monotonic deque); pass an array of the result dtype as `out` to reuse it.",
+          py::arg("values"),
+          py::arg("window"),
+          py::arg("out") = py::none());
+    m.def("rolling_max", &py_rolling_max_float,
+          "float32 input: float32 result, or float64 with a float64 out.",
+          py::arg("values"),
+          py::arg("window"),
+          py::arg("out") = py::none());
+
+    m.def("donchian_channels", &py_donchian_channels<double>,
+          "Donchian channels, returns (upper, middle, lower).\n\n"
+          "upper is the rolling max of `high`, lower the rolling min of `low` and middle their\n"
+          "average; all are zero-padded for the first window-1 values. Pass the close prices\n"
+          "as both high and low for a close-only channel.",
+          py::arg("high"),
+          py::arg("low"),
           py::arg("window"));
-    
+    m.def("donchian_channels", &py_donchian_channels<float>,
+          "float32 high and low: float32 channels.",
+          py::arg("high"),
+          py::arg("low"),
+          py::arg("window"));
+
+    m.def("relative_strength_index", &py_rsi,
+          "Relative Strength Index with Wilder smoothing (0-100).\n\n"
+          "The first `window` values are 0.0; the first RSI, at index `window`, is seeded with\n"
+          "the plain average gain/loss of the first `window` price changes.",
+          py::arg("close"),
+          py::arg("window") = 14,
+          py::arg("out") = py::none());
+
+    m.def("macd", &py_macd,
+          "Moving Average Convergence Divergence, returns (macd, signal, histogram).\n\n"
+          "macd = EMA(fast) - EMA(slow), signal = EMA(macd, signal), histogram = macd - signal,\n"
+          "using the exponential_moving_average recursion; computed in one pass.",
+          py::arg("close"),
+          py::arg("fast") = 12,
+          py::arg("slow") = 26,
+          py::arg("signal") = 9);
+
+    m.def("average_true_range", &py_atr,
+          "Average True Range with Wilder smoothing (zero-padded for the first window-1 values).",
+          py::arg("high"),
+          py::arg("low"),
+          py::arg("close"),
+          py::arg("window") = 14,
+          py::arg("out") = py::none());
+
+    m.def("volume_weighted_average_price", &py_vwap,
+          "Volume weighted average of the typical price (high + low + close) / 3.\n\n"
+          "Cumulative from the first bar with window=0, otherwise over the last `window` bars\n"
+          "(zero-padded). Bars without any traded volume in the window are 0.0.",
+          py::arg("high"),
+          py::arg("low"),
+          py::arg("close"),
+          py::arg("volume"),
+          py::arg("window") = 0,
+          py::arg("out") = py::none());
+
+    m.def("on_balance_volume", &py_obv,
+          "On-Balance Volume: running sum of volume, added on up closes and subtracted on down closes.",
+          py::arg("close"),
+          py::arg("volume"),
+          py::arg("out") = py::none());
+
+    m.def("performance_stats", &py_performance_stats,
+          py::arg("values"), py::arg("kind") = "equity", py::arg("periods_per_year") = 252.0,
+          py::arg("risk_free_rate") = 0.0,
+          "Total simple/log return, max drawdown (with peak, trough, recovery and duration),\n"
+          "volatility, Sharpe, Sortino and hit rate of an equity curve in one pass.\n\n"
+          "kind='returns' takes per-period simple returns instead and compounds them from 1.0\n"
+          "(drawdown indices then count the starting point as index 0). Volatility, Sharpe and\n"
+          "Sortino use the population std and are annualized by sqrt(periods_per_year);\n"
+          "risk_free_rate is per period.");
+
+    m.def("portfolio_equity", &py_portfolio_equity<double>,
+          "Equity curves of a (strategies x time) block of positions in one pass.\n\n"
+          "returns[i] is the simple return into bar i + 1, shared (1-D) or per strategy (2-D).\n"
+          "positions[k, i] * sizing[k] is the fraction of equity held from the close of bar i;\n"
+          "each change of that exposure costs `cost` per unit traded, the entry at bar 0 included.",
+          py::arg("returns"), py::arg("positions"), py::arg("sizing"),
+          py::arg("initial_capital") = 1000.0, py::arg("cost") = 0.0, py::arg("out") = py::none());
+    m.def("portfolio_equity", &py_portfolio_equity<std::int8_t>,
+          "int8 positions (crossover signals): same result without widening the positions.",
+          py::arg("returns"), py::arg("positions"), py::arg("sizing"),
+          py::arg("initial_capital") = 1000.0, py::arg("cost") = 0.0, py::arg("out") = py::none());
+
+    m.def("load_ohlcvt_csv", &py_load_ohlcvt_csv,
+          "Parse a timestamp,open,high,low,close,volume[,trades] CSV into columns.\n\n"
+          "Returns (columns, malformed): a dict of contiguous arrays (int64 timestamp and\n"
+          "trades, float64 prices and volume) and a list of (line_number, reason) for\n"
+          "every row that could not be parsed.",
+          py::arg("path"));
+
+    m.def("resample_ohlcvt", &py_resample_ohlcvt,
+          py::arg("timestamp"), py::arg("open"), py::arg("high"), py::arg("low"), py::arg("close"),
+          py::arg("volume"), py::arg("intervals"), py::arg("trades") = py::none(),
+          "Aggregate bars with ascending timestamps (seconds) into every interval (seconds)\n"
+          "in `intervals` in one pass.\n\n"
+          "Returns {interval: columns} with the keys of load_ohlcvt_csv: each bar is stamped\n"
+          "with the start of its interval-aligned bucket, takes the first open, the highest\n"
+          "high, the lowest low and the last close, and sums volume and trades (each input\n"
+          "row counts as one trade when `trades` is None). Empty buckets produce no bar.");
+
+    m.def("resample_trades", &py_resample_trades,
+          py::arg("timestamp"), py::arg("price"), py::arg("volume"), py::arg("intervals"),
+          "Build OHLCVT bars from individual trades (timestamp, price, volume) for every\n"
+          "interval in one pass; same result layout as resample_ohlcvt.");
+
+    m.def("parse_ohlcvt_csv", &py_parse_ohlcvt_csv,
+          "Parse CSV rows from a bytes-like object, e.g. one chunk of a larger file.\n\n"
+          "Returns (columns, malformed) like load_ohlcvt_csv. `first_line` is the line number\n"
+          "of the first row in `data`; a header is only recognised when it is 1.",
+          py::arg("data"), py::arg("first_line") = 1);
+
+    m.def("set_kernel_timing", &set_kernel_timing,
+          "Turn the cumulative per-kernel timers on or off (off by default).",
+          py::arg("enabled"));
+
+    m.def("kernel_timing_enabled", &kernel_timing_enabled);
+
+    m.def("reset_kernel_timers", &reset_kernel_timers, "Clear all kernel timer totals.");
+
+    m.def("kernel_timers", &py_kernel_timers,
+          "Totals per kernel since the last reset: {name: {calls, items, bytes, seconds}}.\n\n"
+          "Only calls made while timing was enabled are counted.");
+
+    py::class_<IncrementalSMA>(m, "IncrementalSMA",
+                               "Simple moving average updated in O(1) per bar from a ring buffer and running sum.\n\n"
+                               "Values match simple_moving_average (0.0 until `window` prices have been seen).")
+        .def(py::init<int>(), py::arg("window"))
+        .def("update", &IncrementalSMA::update, py::arg("price"),
+             "Add one price and return the current average")
+        .def("update_many", &py_update_many<IncrementalSMA>, py::arg("prices"), py::arg("out") = py::none(),
+             "Add an array of prices and return the average after each one")
+        .def("reset", &IncrementalSMA::reset)
+        .def_property_readonly("window", &IncrementalSMA::window)
+        .def_property_readonly("count", &IncrementalSMA::count)
+        .def_property_readonly("ready", &IncrementalSMA::ready)
+        .def_property_readonly("value", &IncrementalSMA::value)
+        .def("get_state", &sma_get_state, "Return the state as a dict of plain Python values")
+        .def("set_state", &sma_set_state, py::arg("state"), "Restore a state returned by get_state")
+        .def(py::pickle(
+            [](const IncrementalSMA& sma) { return sma_get_state(sma); },
+            [](const py::dict& state) {
+                IncrementalSMA sma(state["window"].cast<int>());
+                sma_set_state(sma, state);
+                return sma;
+            }));
+
+    py::class_<IncrementalEMA>(m, "IncrementalEMA",
+                               "Exponential moving average updated in O(1) per bar.\n\n"
+                               "Values match exponential_moving_average (seeded with the first price).")
+        .def(py::init<int>(), py::arg("window"))
+        .def("update", &IncrementalEMA::update, py::arg("price"),
+             "Add one price and return the current average")
+        .def("update_many", &py_update_many<IncrementalEMA>, py::arg("prices"), py::arg("out") = py::none(),
+             "Add an array of prices and return the average after each one")
+        .def("reset", &IncrementalEMA::reset)
+        .def_property_readonly("window", &IncrementalEMA::window)
+        .def_property_readonly("count", &IncrementalEMA::count)
+        .def_property_readonly("ready", &IncrementalEMA::ready)
+        .def_property_readonly("value", &IncrementalEMA::value)
+        .def("get_state", &ema_get_state, "Return the state as a dict of plain Python values")
+        .def("set_state", &ema_set_state, py::arg("state"), "Restore a state returned by get_state")
+        .def(py::pickle(
+            [](const IncrementalEMA& ema) { return ema_get_state(ema); },
+            [](const py::dict& state) {
+                IncrementalEMA ema(state["window"].cast<int>());
+                ema_set_state(ema, state);
+                return ema;
+            }));
+
+    py::class_<PerformanceAccumulator>(m, "PerformanceAccumulator",
+                                       "Running performance_stats for an equity curve or returns fed in chunks.")
+        .def(py::init<double>(), py::arg("risk_free_rate") = 0.0)
+        .def("add_equity", &accumulate_equity, py::arg("equity"), "Append equity values")
+        .def("add_returns", &accumulate_returns, py::arg("returns"),
+             "Append per-period returns, compounded onto the current equity (1.0 to start)")
+        .def("stats", [](const PerformanceAccumulator& acc, double periods_per_year) {
+                 check_periods_per_year(periods_per_year);
+                 return stats_to_python(acc.result(periods_per_year));
+             }, py::arg("periods_per_year") = 252.0, "Statistics of everything added so far")
+        .def("reset", &PerformanceAccumulator::reset)
+        .def_property_readonly("risk_free_rate", &PerformanceAccumulator::risk_free_rate)
+        .def_property_readonly("count", &PerformanceAccumulator::count);
+
     m.doc() = "Indicator Engine - C++ compiled moving average calculations";
 }
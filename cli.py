@@ -1,18 +1,158 @@
 #!/usr/bin/env python3
 
 import argparse
+import csv
+import json
+import os
+import sys
+import batch
+import indicator_cache
+import instrument
+import replay
 import stats
+import streaming
+import sweep
+import walkforward
 
-def main():
+def is_window_range(text):
+    return any(sep in text for sep in (':', ','))
+
+def write_records(records, fieldnames, output, stream=None):
+    """Write result dicts to stdout as a JSON list or as CSV rows with a header"""
+    stream = stream or sys.stdout
+    if output == 'json':
+        json.dump(records, stream, indent=2)
+        stream.write("\n")
+    else:
+        writer = csv.DictWriter(stream, fieldnames=fieldnames, restval='', extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(records)
+
+def main(argv=None):
     parser = argparse.ArgumentParser(description='Run backtest and compute stats for moving average crossover strategies.')
-    parser.add_argument('csv_path', help='Path to the CSV file containing price data')
-    parser.add_argument('fast', type=int, help='Window size for fast moving average')
-    parser.add_argument('slow', type=int, help='Window size for slow moving average')
-    
-    args = parser.parse_args()
-    
-    # Run the full strategy with the provided arguments
-    stats.run_full_strategy(args.csv_path, args.fast, args.slow)
+    parser.add_argument('csv_path', help='Path to the CSV file containing price data, or a directory of CSV files to batch')
+    parser.add_argument('fast', help='Window size for fast moving average, or a range/list (e.g. 5:50:5) to sweep')
+    parser.add_argument('slow', help='Window size for slow moving average, or a range/list (e.g. 20:200:10) to sweep')
+    parser.add_argument('--rank-by', choices=['sharpe', 'total_return', 'max_drawdown'], default='sharpe',
+                        help='Sweep mode: metric used to rank the (fast, slow) pairs')
+    parser.add_argument('--top', type=int, default=20, help='Sweep mode: number of ranked pairs to output')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Batch and walk-forward mode: worker processes (default: one per CPU)')
+    parser.add_argument('--walk-forward', metavar='TRAIN:TEST[:STEP]',
+                        help='Walk-forward mode: pick the best pair on each TRAIN-bar segment and score it on the next TEST bars')
+    parser.add_argument('--timeframe',
+                        help='Resample the bars first, e.g. 15m, 1h, 1d or minutes (1440); not with --stream')
+    parser.add_argument('--start',
+                        help='Single run: first bar time, e.g. 2024-01-01, epoch seconds or --start=-180d (180 days before the last bar)')
+    parser.add_argument('--end', help='Single run: stop before this bar time (same forms as --start)')
+    parser.add_argument('--stream', action='store_true',
+                        help='Single run: backtest a CSV or close price .npy in chunks with bounded memory')
+    parser.add_argument('--chunk-mb', type=float, default=64.0, help='Stream mode: chunk size in MB')
+    parser.add_argument('--replay', type=int, metavar='STREAMS',
+                        help='Replay mode: feed the bars one at a time through the incremental signal path as '
+                             'STREAMS concurrent symbol streams and report per-bar latency; not with --timeframe')
+    parser.add_argument('--speed', type=float, default=None,
+                        help='Replay mode: bars per second per stream (default: as fast as possible)')
+    parser.add_argument('--transport', choices=sorted(replay.TRANSPORTS), default='direct',
+                        help='Replay mode: in-process queues (direct) or the local socket feed stand-in')
+    parser.add_argument('--output', choices=['text', 'json', 'csv'], default='text',
+                        help='Print results as a text table (default), JSON or CSV')
+    parser.add_argument('--profile', action='store_true',
+                        help='Print per-stage and C++ kernel timings to stderr when done')
+    parser.add_argument('--trace', help='Write the stage timings as a Chrome trace file (chrome://tracing)')
+    plotting = parser.add_mutually_exclusive_group()
+    plotting.add_argument('--no-plot', action='store_true',
+                          help='Headless mode: never plot or import matplotlib (the default)')
+    plotting.add_argument('--plot-dir', help='Single run: render the plots as PNG files into this directory')
+    plotting.add_argument('--show', action='store_true', help='Single run: open the plots in interactive windows')
+
+    args = parser.parse_args(argv)
+
+    if args.profile or args.trace:
+        instrument.enable()
+    try:
+        run(args)
+    finally:
+        if args.profile:
+            print(instrument.report(), file=sys.stderr)
+            print(indicator_cache.get_cache().report(), file=sys.stderr)
+        if args.trace:
+            instrument.dump_trace(args.trace)
+
+def run(args):
+    if args.timeframe and (args.stream or args.replay):
+        raise SystemExit("--timeframe cannot be combined with --stream or --replay")
+
+    if (args.start or args.end) and (os.path.isdir(args.csv_path) or args.walk_forward or args.replay or args.stream
+                                     or is_window_range(args.fast) or is_window_range(args.slow)):
+        raise SystemExit("--start/--end only apply to a single run")
+
+    # A directory runs every symbol file in it across a process pool
+    if os.path.isdir(args.csv_path):
+        results = batch.run_batch(args.csv_path, int(args.fast), int(args.slow), workers=args.workers,
+                                  timeframe=args.timeframe)
+        if args.output == 'text':
+            print(batch.format_batch_table(results))
+        else:
+            write_records(results, batch.RESULT_FIELDS, args.output)
+        return
+
+    if args.walk_forward:
+        sizes = [int(f) for f in args.walk_forward.split(':')]
+        if len(sizes) not in (2, 3):
+            raise SystemExit(f"--walk-forward expects TRAIN:TEST[:STEP], got {args.walk_forward!r}")
+        rows, summary = walkforward.run_walk_forward_file(args.csv_path,
+                                                          sweep.parse_window_range(args.fast),
+                                                          sweep.parse_window_range(args.slow),
+                                                          *sizes, timeframe=args.timeframe, rank_by=args.rank_by,
+                                                          workers=args.workers)
+        if args.output == 'text':
+            print(walkforward.format_walk_forward_table(rows, summary))
+        else:
+            write_records(rows, walkforward.WALK_FORWARD_FIELDS, args.output)
+        return
+
+    # Live path rehearsal: bars are pushed through the stateful indicators one at a time
+    if args.replay:
+        report = replay.run_replay(replay.replicate(args.csv_path, args.replay), int(args.fast), int(args.slow),
+                                   speed=args.speed, transport=args.transport)
+        if args.output == 'text':
+            print(replay.format_replay_report(report))
+        else:
+            write_records([report], replay.REPLAY_FIELDS, args.output)
+        return
+
+    # Any range or list of windows switches to a parameter sweep over all valid pairs
+    if is_window_range(args.fast) or is_window_range(args.slow):
+        results = sweep.run_sweep(args.csv_path,
+                                  sweep.parse_window_range(args.fast),
+                                  sweep.parse_window_range(args.slow),
+                                  timeframe=args.timeframe, rank_by=args.rank_by)
+        if args.output == 'text':
+            print(sweep.format_sweep_table(results, top=args.top))
+        else:
+            write_records(results[:args.top], sweep.SWEEP_FIELDS, args.output)
+        return
+
+    # Out-of-core run: same numbers as a single-pair sweep, one chunk in memory at a time
+    if args.stream:
+        records = streaming.run_streaming(args.csv_path, int(args.fast), int(args.slow),
+                                          chunk_bytes=int(args.chunk_mb * 1024**2))
+        if args.output == 'text':
+            print(sweep.format_sweep_table(records))
+        else:
+            write_records(records, sweep.SWEEP_FIELDS, args.output)
+        return
+
+    # Run the full strategy with the provided arguments; plotting only when asked for
+    records, series = stats.compute_full_strategy(args.csv_path, int(args.fast), int(args.slow),
+                                                 args.timeframe, args.start, args.end)
+    if args.output == 'text':
+        print(stats.format_stats(records))
+    else:
+        write_records(records, stats.STATS_FIELDS, args.output)
+    if args.plot_dir or args.show:
+        stats.plot_full_strategy(series, args.plot_dir)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
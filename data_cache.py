@@ -0,0 +1,178 @@
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+import load_data
+
+#content-addressed cache of parsed CSV columns, shared by concurrent jobs:
+#  index/<source key>.json   source path + size + mtime -> content hash
+#  entries/<content hash>/   one .npy per column plus meta.json, reloaded with mmap
+#  locks/<source key>.lock   held while a source is parsed so only one job parses it
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    'INDICATOR_CACHE_DIR',
+    os.path.join(os.path.expanduser('~'), '.cache', 'pycpp-indicator-engine'))
+DEFAULT_MAX_BYTES = int(os.environ.get('INDICATOR_CACHE_MAX_BYTES', 10 * 1024**3))
+
+# malformed rows kept in meta.json so cache hits can still warn about them
+MAX_STORED_MALFORMED = 100
+
+def file_digest(file_path, chunk_size=1 << 20):
+    """blake2b hash of the file contents, read in chunks"""
+    digest = hashlib.blake2b(digest_size=20)
+    with open(file_path, 'rb') as file:
+        for chunk in iter(lambda: file.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def source_key(file_path):
+    """Key of a source file by resolved path, size and modification time"""
+    st = os.stat(file_path)
+    ident = f"{os.path.realpath(file_path)}|{st.st_size}|{st.st_mtime_ns}"
+    return hashlib.blake2b(ident.encode(), digest_size=20).hexdigest()
+
+def _write_json_atomic(path, data):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    with os.fdopen(fd, 'w') as file:
+        json.dump(data, file)
+    os.replace(tmp_path, path)
+
+def _read_json(path):
+    try:
+        with open(path) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+def _entry_is_complete(entry_dir):
+    return os.path.isfile(os.path.join(entry_dir, 'meta.json'))
+
+def _lookup_entry(cache_dir, key):
+    index = _read_json(os.path.join(cache_dir, 'index', key + '.json'))
+    if index is None:
+        return None
+    entry_dir = os.path.join(cache_dir, 'entries', index['content'])
+    return entry_dir if _entry_is_complete(entry_dir) else None
+
+def _build_entry(cache_dir, file_path, content):
+    """Parse the CSV once and publish its columns under entries/<content> atomically"""
+    entry_dir = os.path.join(cache_dir, 'entries', content)
+    if _entry_is_complete(entry_dir):
+        # same contents already cached from another path or an older mtime
+        return entry_dir
+
+    columns, malformed = load_data.load_ohlcvt(file_path)
+    tmp_dir = tempfile.mkdtemp(dir=os.path.join(cache_dir, 'entries'), prefix='.building-')
+    try:
+        for name in load_data.OHLCVT_COLUMNS:
+            np.save(os.path.join(tmp_dir, name + '.npy'), columns[name])
+        _write_json_atomic(os.path.join(tmp_dir, 'meta.json'), {
+            'source': os.path.realpath(file_path),
+            'rows': int(len(columns['close'])),
+            'malformed_count': len(malformed),
+            'malformed': [list(row) for row in malformed[:MAX_STORED_MALFORMED]],
+        })
+        os.rename(tmp_dir, entry_dir)
+    except OSError:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        if not _entry_is_complete(entry_dir):
+            raise
+    return entry_dir
+
+def entry_size(entry_dir):
+    return sum(entry.stat().st_size for entry in os.scandir(entry_dir) if entry.is_file())
+
+def evict(cache_dir=None, max_bytes=None, keep=()):
+    """
+    Delete least recently used entries until the cache holds at most max_bytes.
+    Entries in `keep` are never removed. Processes that already mapped a deleted
+    entry keep working (POSIX unlink semantics). Returns the removed entry names.
+    """
+    cache_dir = cache_dir or DEFAULT_CACHE_DIR
+    max_bytes = DEFAULT_MAX_BYTES if max_bytes is None else max_bytes
+    entries_dir = os.path.join(cache_dir, 'entries')
+    if not os.path.isdir(entries_dir):
+        return []
+
+    entries = []
+    for entry in os.scandir(entries_dir):
+        if entry.is_dir() and _entry_is_complete(entry.path):
+            # meta.json is touched on every hit, so its mtime is the last use
+            last_used = os.stat(os.path.join(entry.path, 'meta.json')).st_mtime
+            entries.append((last_used, entry.name, entry.path, entry_size(entry.path)))
+
+    total = sum(size for _, _, _, size in entries)
+    removed = []
+    for _, name, path, size in sorted(entries):
+        if total <= max_bytes:
+            break
+        if name in keep:
+            continue
+        shutil.rmtree(path, ignore_errors=True)
+        total -= size
+        removed.append(name)
+    return removed
+
+def _parse_locked(cache_dir, file_path, key, max_bytes):
+    with open(os.path.join(cache_dir, 'locks', key + '.lock'), 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        # another job may have finished the parse while we waited
+        entry_dir = _lookup_entry(cache_dir, key)
+        if entry_dir is not None:
+            return entry_dir
+        content = file_digest(file_path)
+        entry_dir = _build_entry(cache_dir, file_path, content)
+        _write_json_atomic(os.path.join(cache_dir, 'index', key + '.json'), {
+            'content': content,
+            'path': os.path.realpath(file_path),
+        })
+        evict(cache_dir, max_bytes, keep={content})
+        return entry_dir
+
+def load_columns(file_path, cache_dir=None, max_bytes=None, warn=True, timeframe=None):
+    """
+    Return the OHLCVT columns of a CSV as read-only memory-mapped arrays.
+
+    The first call for a given source (path, size, mtime) parses it with
+    load_data.load_ohlcvt and stores the columns under the hash of its contents;
+    later calls - including concurrent jobs, which wait on a file lock instead of
+    parsing again - map the cached .npy files and share the page cache.
+    With a `timeframe` ('15m', '1h', ...) the cached columns are resampled to it
+    (see load_data.resample_columns); resampled bars are not cached themselves.
+    """
+    cache_dir = cache_dir or DEFAULT_CACHE_DIR
+    for sub in ('index', 'entries', 'locks'):
+        os.makedirs(os.path.join(cache_dir, sub), exist_ok=True)
+
+    key = source_key(file_path)
+    # a second attempt covers an entry evicted by another job between lookup and load
+    for attempt in range(2):
+        entry_dir = _lookup_entry(cache_dir, key)
+        if entry_dir is None:
+            entry_dir = _parse_locked(cache_dir, file_path, key, max_bytes)
+        try:
+            meta_path = os.path.join(entry_dir, 'meta.json')
+            meta = _read_json(meta_path)
+            if meta is None:
+                raise FileNotFoundError(meta_path)
+            os.utime(meta_path)
+            columns = {name: np.load(os.path.join(entry_dir, name + '.npy'), mmap_mode='r')
+                       for name in load_data.OHLCVT_COLUMNS}
+            break
+        except OSError:
+            if attempt == 1:
+                raise
+
+    if warn:
+        load_data.warn_malformed_rows(file_path, meta['malformed'], total=meta['malformed_count'])
+    if timeframe is not None:
+        return load_data.resample_columns(columns, [timeframe])[timeframe]
+    return columns
+
+def clear(cache_dir=None):
+    shutil.rmtree(cache_dir or DEFAULT_CACHE_DIR, ignore_errors=True)
@@ -0,0 +1,204 @@
+import hashlib
+import os
+import tempfile
+import threading
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+
+#memoized indicator results keyed on (data fingerprint, indicator name, parameters):
+#  memory tier   LRU of arrays bounded by INDICATOR_RESULT_CACHE_BYTES (default 256 MiB)
+#  disk tier     optional directory of <key>.npy files reloaded with mmap, bounded by its own
+#                byte limit and evicted least recently used first (INDICATOR_RESULT_CACHE_DIR)
+#cached arrays are returned read-only, so a caller can never change what the next one gets.
+#the fingerprint is a hash of the input values; read-only inputs (data_cache columns, cached
+#results) are hashed once per object
+
+DEFAULT_MAX_BYTES = int(os.environ.get('INDICATOR_RESULT_CACHE_BYTES', 256 * 1024**2))
+DEFAULT_DISK_DIR = os.environ.get('INDICATOR_RESULT_CACHE_DIR') or None
+DEFAULT_DISK_MAX_BYTES = int(os.environ.get('INDICATOR_RESULT_CACHE_DISK_BYTES', 4 * 1024**3))
+
+_fingerprints = {}
+_fingerprints_lock = threading.Lock()
+
+def _is_immutable(values):
+    # a read-only view of a writeable array can still change underneath it
+    while isinstance(values, np.ndarray):
+        if values.flags.writeable:
+            return False
+        values = values.base
+    return True
+
+def fingerprint(values):
+    """blake2b hash of an array's dtype, shape and contents"""
+    values = np.asarray(values)
+    memoize = _is_immutable(values)
+    if memoize:
+        with _fingerprints_lock:
+            known = _fingerprints.get(id(values))
+        if known is not None:
+            return known
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(f"{values.dtype.str}|{values.shape}".encode())
+    digest.update(memoryview(np.ascontiguousarray(values)).cast('B'))
+    result = digest.hexdigest()
+    if memoize:
+        # forget the hash when the array goes away, before its id can be reused
+        with _fingerprints_lock:
+            _fingerprints[id(values)] = result
+        weakref.finalize(values, _fingerprints.pop, id(values), None)
+    return result
+
+def make_key(fingerprint, name, params):
+    return hashlib.blake2b(repr((fingerprint, name, tuple(params))).encode(), digest_size=20).hexdigest()
+
+class IndicatorCache:
+    """Two-tier (memory LRU, optional mmap disk) cache of indicator result arrays"""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, disk_dir=None, disk_max_bytes=DEFAULT_DISK_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._counts = {'hits': 0, 'disk_hits': 0, 'misses': 0, 'evictions': 0, 'disk_evictions': 0}
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, key + '.npy')
+
+    def _remember(self, key, values):
+        """Add to the memory tier (caller holds the lock); arrays over the whole budget are not kept"""
+        if values.nbytes > self.max_bytes:
+            return
+        if key in self._entries:
+            self._bytes -= self._entries.pop(key).nbytes
+        self._entries[key] = values
+        self._bytes += values.nbytes
+        while self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.nbytes
+            self._counts['evictions'] += 1
+
+    def get(self, key):
+        """Cached array for `key` or None; disk hits are promoted to the memory tier"""
+        with self._lock:
+            values = self._entries.get(key)
+            if values is not None:
+                self._entries.move_to_end(key)
+                self._counts['hits'] += 1
+                return values
+        if self.disk_dir:
+            path = self._disk_path(key)
+            try:
+                values = np.load(path, mmap_mode='r')
+                os.utime(path)
+            except (OSError, ValueError):
+                values = None
+            if values is not None:
+                with self._lock:
+                    self._counts['disk_hits'] += 1
+                    self._remember(key, values)
+                return values
+        with self._lock:
+            self._counts['misses'] += 1
+        return None
+
+    def put(self, key, values):
+        """Store a result (made read-only) in memory and, if enabled, on disk; returns it"""
+        values = np.asarray(values)
+        values.flags.writeable = False
+        with self._lock:
+            self._remember(key, values)
+        if self.disk_dir:
+            fd, tmp_path = tempfile.mkstemp(dir=self.disk_dir, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as file:
+                np.save(file, values)
+            os.replace(tmp_path, self._disk_path(key))
+            self.evict_disk(keep={key})
+        return values
+
+    def get_or_compute(self, fingerprint, name, params, compute):
+        """Return the cached result for (fingerprint, name, params), calling compute() on a miss"""
+        key = make_key(fingerprint, name, params)
+        values = self.get(key)
+        if values is None:
+            values = self.put(key, compute())
+        return values
+
+    def evict_disk(self, keep=()):
+        """Delete least recently used disk entries until the tier fits disk_max_bytes"""
+        if not self.disk_dir:
+            return []
+        files = []
+        for entry in os.scandir(self.disk_dir):
+            if entry.name.endswith('.npy'):
+                st = entry.stat()
+                files.append((st.st_mtime, entry.name[:-4], entry.path, st.st_size))
+        total = sum(size for _, _, _, size in files)
+        removed = []
+        for _, key, path, size in sorted(files):
+            if total <= self.disk_max_bytes:
+                break
+            if key in keep:
+                continue
+            try:
+                os.unlink(path)
+            except OSError:
+                continue
+            total -= size
+            removed.append(key)
+        with self._lock:
+            self._counts['disk_evictions'] += len(removed)
+        return removed
+
+    def clear(self, disk=False):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+        if disk and self.disk_dir:
+            for entry in os.scandir(self.disk_dir):
+                if entry.name.endswith('.npy'):
+                    os.unlink(entry.path)
+
+    def stats(self):
+        """Hit/miss counters plus the memory tier's current size"""
+        with self._lock:
+            result = dict(self._counts, entries=len(self._entries), bytes=self._bytes)
+        lookups = result['hits'] + result['disk_hits'] + result['misses']
+        result['hit_rate'] = (result['hits'] + result['disk_hits']) / lookups if lookups else 0.0
+        return result
+
+    def report(self):
+        s = self.stats()
+        return (f"indicator cache: {s['hits']} hits, {s['disk_hits']} disk hits, {s['misses']} misses "
+                f"({s['hit_rate']:.1%} hit rate), {s['entries']} entries / {s['bytes'] / 1024**2:.1f} MiB in memory, "
+                f"{s['evictions']} evictions")
+
+_default = None
+
+def get_cache():
+    """The process-wide cache, configured from the environment on first use"""
+    global _default
+    if _default is None:
+        _default = IndicatorCache(DEFAULT_MAX_BYTES, DEFAULT_DISK_DIR, DEFAULT_DISK_MAX_BYTES)
+    return _default
+
+def configure(max_bytes=DEFAULT_MAX_BYTES, disk_dir=None, disk_max_bytes=DEFAULT_DISK_MAX_BYTES):
+    """Replace the process-wide cache (max_bytes=0 and no disk_dir turns caching off)"""
+    global _default
+    _default = IndicatorCache(max_bytes, disk_dir, disk_max_bytes)
+    return _default
+
+def cached_call(func, values, *params, cache=None, key=None):
+    """
+    func(values, *params) through the cache. Results are keyed on the function's module
+    and name, the parameters and fingerprint(values) (pass `key` to reuse a fingerprint
+    already computed for `values`).
+    """
+    cache = cache or get_cache()
+    name = f"{func.__module__}.{func.__name__}"
+    return cache.get_or_compute(key or fingerprint(values), name, params, lambda: func(values, *params))
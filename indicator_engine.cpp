@@ -2,108 +2,1533 @@
 #include <vector>
 #include <numeric>
 #include <iostream>
-#include <fstream>
 #include <cstring>
+#include <cerrno>
 #include <stdexcept>
 #include <cstdint>
+#include <cstddef>
+#include <algorithm>
+#include <cstdlib>
+#include <cctype>
+#include <cmath>
+#include <string>
+#include <map>
+#include <limits>
+#include <mutex>
+#include <atomic>
+#include <thread>
+#include <system_error>
+#include <fcntl.h>
+#include <sys/mman.h>
+#include <sys/stat.h>
+#include <unistd.h>
 
-std::vector<double> simple_moving_average(const std::vector<double>& close_prices, int window) {
-    std::vector<double> sma;
-    int n = close_prices.size();
-    sma.resize(n, 0.0);
+#include "indicator_engine.h"
+
+static std::atomic<bool> g_kernel_timing(false);
+
+static std::mutex& kernel_timer_mutex() {
+    static std::mutex mutex;
+    return mutex;
+}
+
+static std::map<std::string, KernelTimerStats>& kernel_timers() {
+    static std::map<std::string, KernelTimerStats> timers;
+    return timers;
+}
+
+void set_kernel_timing(bool enabled) {
+    g_kernel_timing.store(enabled, std::memory_order_relaxed);
+}
+
+bool kernel_timing_enabled() {
+    return g_kernel_timing.load(std::memory_order_relaxed);
+}
+
+void reset_kernel_timers() {
+    std::lock_guard<std::mutex> lock(kernel_timer_mutex());
+    kernel_timers().clear();
+}
+
+std::vector<std::pair<std::string, KernelTimerStats> > kernel_timer_snapshot() {
+    std::lock_guard<std::mutex> lock(kernel_timer_mutex());
+    return std::vector<std::pair<std::string, KernelTimerStats> >(kernel_timers().begin(), kernel_timers().end());
+}
+
+ScopedKernelTimer::ScopedKernelTimer(const char* name, long long items, long long bytes)
+    : name_(name), active_(kernel_timing_enabled()), items_(items), bytes_(bytes) {
+    if (active_) {
+        start_ = std::chrono::steady_clock::now();
+    }
+}
+
+ScopedKernelTimer::~ScopedKernelTimer() {
+    if (!active_) {
+        return;
+    }
+    double seconds = std::chrono::duration<double>(std::chrono::steady_clock::now() - start_).count();
+    std::lock_guard<std::mutex> lock(kernel_timer_mutex());
+    KernelTimerStats& stats = kernel_timers()[name_];  // value-initialized on first use
+    stats.calls += 1;
+    stats.items += items_;
+    stats.bytes += bytes_;
+    stats.seconds += seconds;
+}
+
+// Kernels work on raw pointers with element strides so the Python bindings can run
+// them directly on NumPy buffers (including non-contiguous views) without copying.
+// One pass over a sliding window shared by the SMA and the dispersion kernels. The running
+// sum adds the new value and then subtracts the one leaving (the order IncrementalSMA
+// reproduces), so every mean is bit-identical to simple_moving_average. With
+// kVariance the sum of squared deviations (m2) is updated Welford-style from the old
+// and new means: x added while growing, (x_old -> x_new) replaced once the window is full,
+// and recomputed exactly once per window length to stop rounding drift. Windows whose
+// std is below kFlatRelativeStd of their mean are reported as flat (zero variance).
+// emit(i, mean, m2) is called for every full window, emit_padding(i) before that.
+static const double kFlatRelativeStd = 1e-9;
 
+template <bool kVariance, typename T, typename Emit, typename Pad>
+static void rolling_window_pass(const T* values, std::ptrdiff_t in_stride, std::ptrdiff_t n,
+                                int window, Emit emit, Pad emit_padding) {
     double sum = 0.0;
-    for (int i = 0; i < n; ++i) {
-        sum += close_prices[i];
+    double m2 = 0.0;
+    for (std::ptrdiff_t i = 0; i < n; ++i) {
+        double value = values[i * in_stride];
+        double old_mean = 0.0;
+        if (kVariance) {
+            old_mean = i == 0 ? 0.0 : sum / (i < window ? i : window);
+        }
+        sum += value;
         if (i >= window) {
-            sum -= close_prices[i - window];
+            double leaving = values[(i - window) * in_stride];
+            sum -= leaving;
+            if (kVariance) {
+                double new_mean = sum / window;
+                m2 += (value - leaving) * (value - new_mean + leaving - old_mean);
+            }
+        } else if (kVariance) {
+            m2 += (value - old_mean) * (value - sum / (i + 1));
+        }
+        if (kVariance && i >= window && (i + 1) % window == 0) {
+            // Sliding updates drift by ~eps * value^2 per bar, which swamps the variance of
+            // quiet windows on long series; recomputing m2 from the window once per window
+            // length bounds the drift at one extra read per bar
+            double mean = sum / window;
+            m2 = 0.0;
+            for (std::ptrdiff_t k = i - window + 1; k <= i; ++k) {
+                double deviation = values[k * in_stride] - mean;
+                m2 += deviation * deviation;
+            }
+        }
+        if (kVariance && m2 < 0.0) {
+            m2 = 0.0;  // rounding can push a (near) constant window just below zero
         }
         if (i >= window - 1) {
-            sma[i] = sum / window;
+            double mean = sum / window;
+            // a std below kFlatRelativeStd of the mean is rounding noise of the running sum
+            double flat_m2 = kFlatRelativeStd * kFlatRelativeStd * mean * mean * window;
+            emit(i, mean, kVariance && m2 <= flat_m2 ? 0.0 : m2);
         } else {
-            sma[i] = 0.0;
+            emit_padding(i);
         }
     }
-    return sma;
 }
 
-std::vector<double> exponential_moving_average(const std::vector<double>& close_prices, int window) {
-    std::vector<double> ema;
-    int n = close_prices.size();
-    ema.resize(n, 0.0);
+// Writes 0.0 for the zero-padded head of a rolling output
+template <typename T>
+struct ZeroPadding {
+    T* out;
+    std::ptrdiff_t stride;
+    void operator()(std::ptrdiff_t i) const { out[i * stride] = 0.0; }
+};
+
+template <typename T>
+struct EmitMean {
+    T* out;
+    std::ptrdiff_t stride;
+    void operator()(std::ptrdiff_t i, double mean, double) const { out[i * stride] = static_cast<T>(mean); }
+};
+
+template <typename T>
+void simple_moving_average(const T* close_prices, std::ptrdiff_t in_stride, std::ptrdiff_t n,
+                           int window, T* out, std::ptrdiff_t out_stride) {
+    ScopedKernelTimer timer("simple_moving_average", n, n * sizeof(T));
+    EmitMean<T> emit = {out, out_stride};
+    ZeroPadding<T> pad = {out, out_stride};
+    rolling_window_pass<false>(close_prices, in_stride, n, window, emit, pad);
+}
+
+template <typename T>
+struct EmitVariance {
+    T* out;
+    std::ptrdiff_t stride;
+    double scale;  // 1 / (window - ddof)
+    bool take_sqrt;
+    void operator()(std::ptrdiff_t i, double, double m2) const {
+        double variance = m2 * scale;
+        out[i * stride] = static_cast<T>(take_sqrt ? std::sqrt(variance) : variance);
+    }
+};
+
+template <typename T>
+void rolling_variance(const T* values, std::ptrdiff_t in_stride, std::ptrdiff_t n,
+                      int window, int ddof, T* out, std::ptrdiff_t out_stride) {
+    ScopedKernelTimer timer("rolling_variance", n, n * sizeof(T));
+    EmitVariance<T> emit = {out, out_stride, 1.0 / (window - ddof), false};
+    ZeroPadding<T> pad = {out, out_stride};
+    rolling_window_pass<true>(values, in_stride, n, window, emit, pad);
+}
+
+template <typename T>
+void rolling_std(const T* values, std::ptrdiff_t in_stride, std::ptrdiff_t n,
+                 int window, int ddof, T* out, std::ptrdiff_t out_stride) {
+    ScopedKernelTimer timer("rolling_std", n, n * sizeof(T));
+    EmitVariance<T> emit = {out, out_stride, 1.0 / (window - ddof), true};
+    ZeroPadding<T> pad = {out, out_stride};
+    rolling_window_pass<true>(values, in_stride, n, window, emit, pad);
+}
+
+template <typename T>
+struct EmitZScore {
+    const T* values;
+    std::ptrdiff_t in_stride;
+    T* out;
+    std::ptrdiff_t out_stride;
+    double scale;
+    void operator()(std::ptrdiff_t i, double mean, double m2) const {
+        double std_dev = std::sqrt(m2 * scale);
+        out[i * out_stride] = static_cast<T>(std_dev > 0.0 ? (values[i * in_stride] - mean) / std_dev : 0.0);
+    }
+};
+
+template <typename T>
+void rolling_zscore(const T* values, std::ptrdiff_t in_stride, std::ptrdiff_t n,
+                    int window, int ddof, T* out, std::ptrdiff_t out_stride) {
+    ScopedKernelTimer timer("rolling_zscore", n, n * sizeof(T));
+    EmitZScore<T> emit = {values, in_stride, out, out_stride, 1.0 / (window - ddof)};
+    ZeroPadding<T> pad = {out, out_stride};
+    rolling_window_pass<true>(values, in_stride, n, window, emit, pad);
+}
+
+template <typename T>
+struct EmitBands {
+    T* upper;
+    T* middle;
+    T* lower;
+    double scale;
+    double num_std;
+    void operator()(std::ptrdiff_t i, double mean, double m2) const {
+        double width = num_std * std::sqrt(m2 * scale);
+        upper[i] = static_cast<T>(mean + width);
+        middle[i] = static_cast<T>(mean);
+        lower[i] = static_cast<T>(mean - width);
+    }
+};
+
+template <typename T>
+struct BandsPadding {
+    T* upper;
+    T* middle;
+    T* lower;
+    void operator()(std::ptrdiff_t i) const { upper[i] = middle[i] = lower[i] = 0.0; }
+};
+
+template <typename T>
+void bollinger_bands(const T* close_prices, std::ptrdiff_t in_stride, std::ptrdiff_t n,
+                     int window, double num_std, int ddof, T* upper, T* middle, T* lower) {
+    ScopedKernelTimer timer("bollinger_bands", n, n * sizeof(T));
+    EmitBands<T> emit = {upper, middle, lower, 1.0 / (window - ddof), num_std};
+    BandsPadding<T> pad = {upper, middle, lower};
+    rolling_window_pass<true>(close_prices, in_stride, n, window, emit, pad);
+}
+
+template <typename T>
+void exponential_moving_average(const T* close_prices, std::ptrdiff_t in_stride, std::ptrdiff_t n,
+                                int window, T* out, std::ptrdiff_t out_stride) {
+    ScopedKernelTimer timer("exponential_moving_average", n, n * sizeof(T));
+    if (n == 0) {
+        return;
+    }
+    double alpha = 2.0 / (window + 1);
+    double prev = close_prices[0];
+    out[0] = static_cast<T>(prev);
+    for (std::ptrdiff_t i = 1; i < n; ++i) {
+        prev = alpha * close_prices[i * in_stride] + (1 - alpha) * prev;
+        out[i * out_stride] = static_cast<T>(prev);
+    }
+}
+
+// Below this many elements per chunk a thread costs more than it saves
+static const std::ptrdiff_t kMinParallelChunk = 1 << 16;
+
+static int parallel_chunks(std::ptrdiff_t n, int threads) {
+    if (threads <= 0) {
+        threads = static_cast<int>(std::thread::hardware_concurrency());
+    }
+    std::ptrdiff_t by_size = n / kMinParallelChunk;
+    if (by_size < threads) {
+        threads = static_cast<int>(by_size);
+    }
+    return threads < 1 ? 1 : threads;
+}
+
+// Run task(0 .. tasks-1), task 0 on the calling thread. If a thread cannot be started
+// its task runs inline, so the work is always done.
+template <typename Task>
+static void run_parallel(int tasks, Task task) {
+    std::vector<std::thread> workers;
+    for (int t = 1; t < tasks; ++t) {
+        try {
+            workers.push_back(std::thread(task, t));
+        } catch (const std::system_error&) {
+            task(t);
+        }
+    }
+    task(0);
+    for (std::size_t k = 0; k < workers.size(); ++k) {
+        workers[k].join();
+    }
+}
+
+static std::ptrdiff_t chunk_begin(std::ptrdiff_t n, int chunks, int c) {
+    return n * c / chunks;
+}
+
+template <typename T>
+void simple_moving_average_parallel(const T* close_prices, std::ptrdiff_t in_stride, std::ptrdiff_t n,
+                                    int window, T* out, std::ptrdiff_t out_stride, int threads) {
+    int chunks = parallel_chunks(n, threads);
+    if (chunks == 1) {
+        simple_moving_average(close_prices, in_stride, n, window, out, out_stride);
+        return;
+    }
+    ScopedKernelTimer timer("simple_moving_average_parallel", n, n * sizeof(T));
+    run_parallel(chunks, [=](int c) {
+        std::ptrdiff_t begin = chunk_begin(n, chunks, c);
+        std::ptrdiff_t end = chunk_begin(n, chunks, c + 1);
+        // seed with the window ending just before the chunk: the serial loop's state at `begin`
+        std::ptrdiff_t seed_from = begin - window > 0 ? begin - window : 0;
+        double sum = 0.0;
+        for (std::ptrdiff_t i = seed_from; i < begin; ++i) {
+            sum += close_prices[i * in_stride];
+        }
+        for (std::ptrdiff_t i = begin; i < end; ++i) {
+            sum += close_prices[i * in_stride];
+            if (i >= window) {
+                sum -= close_prices[(i - window) * in_stride];
+            }
+            out[i * out_stride] = static_cast<T>(i >= window - 1 ? sum / window : 0.0);
+        }
+    });
+}
+
+// Once (1-a)^k falls below this, the carry no longer changes a double at price scale
+static const double kCarryCutoff = 1e-18;
+
+template <typename T>
+void exponential_moving_average_parallel(const T* close_prices, std::ptrdiff_t in_stride, std::ptrdiff_t n,
+                                         int window, T* out, std::ptrdiff_t out_stride, int threads) {
+    int chunks = parallel_chunks(n, threads);
+    if (chunks == 1) {
+        exponential_moving_average(close_prices, in_stride, n, window, out, out_stride);
+        return;
+    }
+    ScopedKernelTimer timer("exponential_moving_average_parallel", n, n * sizeof(T));
     double alpha = 2.0 / (window + 1);
-    ema[0] = close_prices[0];
-    for (int i = 1; i < n; ++i) {
-        ema[i] = alpha * close_prices[i] + (1 - alpha) * ema[i - 1];
+    double decay = 1 - alpha;
+    std::vector<double> local_last(chunks);
+
+    // 1) every chunk runs the recurrence on its own; chunk 0 is seeded with the first price
+    //    exactly as in the serial kernel, the others start from 0
+    run_parallel(chunks, [&](int c) {
+        std::ptrdiff_t begin = chunk_begin(n, chunks, c);
+        std::ptrdiff_t end = chunk_begin(n, chunks, c + 1);
+        double prev;
+        if (c == 0) {
+            prev = close_prices[0];
+            out[0] = static_cast<T>(prev);
+            ++begin;
+        } else {
+            prev = 0.0;
+        }
+        for (std::ptrdiff_t i = begin; i < end; ++i) {
+            prev = alpha * close_prices[i * in_stride] + decay * prev;
+            out[i * out_stride] = static_cast<T>(prev);
+        }
+        local_last[c] = prev;
+    });
+
+    // 2) chain the carries: true value before chunk c = local_last[c-1] + decay^len * carry[c-1]
+    std::vector<double> carry(chunks, 0.0);
+    carry[1] = local_last[0];
+    for (int c = 2; c < chunks; ++c) {
+        std::ptrdiff_t length = chunk_begin(n, chunks, c) - chunk_begin(n, chunks, c - 1);
+        carry[c] = local_last[c - 1] + std::pow(decay, static_cast<double>(length)) * carry[c - 1];
+    }
+
+    // 3) add each carry back into its chunk, decaying geometrically
+    run_parallel(chunks - 1, [&](int t) {
+        int c = t + 1;
+        std::ptrdiff_t begin = chunk_begin(n, chunks, c);
+        std::ptrdiff_t end = chunk_begin(n, chunks, c + 1);
+        double factor = decay;
+        for (std::ptrdiff_t i = begin; i < end && factor >= kCarryCutoff; ++i) {
+            out[i * out_stride] = static_cast<T>(out[i * out_stride] + factor * carry[c]);
+            factor *= decay;
+        }
+    });
+}
+
+// Multi-window kernels write one row per window into `out` (row/col strides in elements).
+// Time is processed in cache-sized blocks so every window's row for a block is computed
+// while that block of input is still hot, i.e. the series is streamed from memory once.
+static const std::ptrdiff_t kTimeBlock = 4096;
+
+template <typename T>
+void simple_moving_average_multi(const T* close_prices, std::ptrdiff_t in_stride, std::ptrdiff_t n,
+                                 const int* windows, std::ptrdiff_t n_windows,
+                                 T* out, std::ptrdiff_t row_stride, std::ptrdiff_t col_stride) {
+    ScopedKernelTimer timer("simple_moving_average_multi", n * n_windows, n * sizeof(T));
+    if (n == 0) {
+        return;
+    }
+    // One shared prefix sum for all windows. Summing deviations from the first price
+    // keeps the prefix small, so differencing it loses far less precision.
+    double offset = close_prices[0];
+    std::vector<double> prefix(n + 1);
+    prefix[0] = 0.0;
+    for (std::ptrdiff_t i = 0; i < n; ++i) {
+        prefix[i + 1] = prefix[i] + (close_prices[i * in_stride] - offset);
     }
+
+    for (std::ptrdiff_t start = 0; start < n; start += kTimeBlock) {
+        std::ptrdiff_t stop = std::min(start + kTimeBlock, n);
+        for (std::ptrdiff_t k = 0; k < n_windows; ++k) {
+            std::ptrdiff_t window = windows[k];
+            T* row = out + k * row_stride;
+            for (std::ptrdiff_t i = start; i < stop; ++i) {
+                if (i >= window - 1) {
+                    row[i * col_stride] = static_cast<T>((prefix[i + 1] - prefix[i + 1 - window]) / window + offset);
+                } else {
+                    row[i * col_stride] = 0.0;
+                }
+            }
+        }
+    }
+}
+
+template <typename T>
+void exponential_moving_average_multi(const T* close_prices, std::ptrdiff_t in_stride, std::ptrdiff_t n,
+                                      const int* windows, std::ptrdiff_t n_windows,
+                                      T* out, std::ptrdiff_t row_stride, std::ptrdiff_t col_stride) {
+    ScopedKernelTimer timer("exponential_moving_average_multi", n * n_windows, n * sizeof(T));
+    if (n == 0) {
+        return;
+    }
+    std::vector<double> alpha(n_windows);
+    std::vector<double> state(n_windows, close_prices[0]);
+    for (std::ptrdiff_t k = 0; k < n_windows; ++k) {
+        alpha[k] = 2.0 / (windows[k] + 1);
+    }
+
+    // The EMA recursion is latency bound, so windows are advanced in interleaved groups:
+    // the independent recursions of a group overlap in the pipeline at each time step.
+    const std::ptrdiff_t group = 4;
+    for (std::ptrdiff_t start = 0; start < n; start += kTimeBlock) {
+        std::ptrdiff_t stop = std::min(start + kTimeBlock, n);
+        for (std::ptrdiff_t k0 = 0; k0 < n_windows; k0 += group) {
+            std::ptrdiff_t width = std::min(group, n_windows - k0);
+            double a[group], prev[group];
+            T* row[group];
+            for (std::ptrdiff_t j = 0; j < width; ++j) {
+                a[j] = alpha[k0 + j];
+                prev[j] = state[k0 + j];
+                row[j] = out + (k0 + j) * row_stride;
+            }
+            std::ptrdiff_t i = start;
+            if (i == 0) {
+                for (std::ptrdiff_t j = 0; j < width; ++j) {
+                    row[j][0] = static_cast<T>(prev[j]);
+                }
+                i = 1;
+            }
+            if (width == group) {
+                for (; i < stop; ++i) {
+                    double price = close_prices[i * in_stride];
+                    for (std::ptrdiff_t j = 0; j < group; ++j) {
+                        prev[j] = a[j] * price + (1 - a[j]) * prev[j];
+                        row[j][i * col_stride] = static_cast<T>(prev[j]);
+                    }
+                }
+            } else {
+                for (; i < stop; ++i) {
+                    double price = close_prices[i * in_stride];
+                    for (std::ptrdiff_t j = 0; j < width; ++j) {
+                        prev[j] = a[j] * price + (1 - a[j]) * prev[j];
+                        row[j][i * col_stride] = static_cast<T>(prev[j]);
+                    }
+                }
+            }
+            for (std::ptrdiff_t j = 0; j < width; ++j) {
+                state[k0 + j] = prev[j];
+            }
+        }
+    }
+}
+
+// The moving average kernels are compiled for double and float prices (bindings.cpp picks
+// one from the NumPy dtype)
+template void simple_moving_average<double>(const double*, std::ptrdiff_t, std::ptrdiff_t, int, double*, std::ptrdiff_t);
+template void exponential_moving_average<double>(const double*, std::ptrdiff_t, std::ptrdiff_t, int, double*, std::ptrdiff_t);
+template void simple_moving_average_parallel<double>(const double*, std::ptrdiff_t, std::ptrdiff_t, int, double*,
+                                                     std::ptrdiff_t, int);
+template void exponential_moving_average_parallel<double>(const double*, std::ptrdiff_t, std::ptrdiff_t, int, double*,
+                                                          std::ptrdiff_t, int);
+template void simple_moving_average_multi<double>(const double*, std::ptrdiff_t, std::ptrdiff_t, const int*, std::ptrdiff_t,
+                                                  double*, std::ptrdiff_t, std::ptrdiff_t);
+template void exponential_moving_average_multi<double>(const double*, std::ptrdiff_t, std::ptrdiff_t, const int*,
+                                                       std::ptrdiff_t, double*, std::ptrdiff_t, std::ptrdiff_t);
+template void simple_moving_average<float>(const float*, std::ptrdiff_t, std::ptrdiff_t, int, float*, std::ptrdiff_t);
+template void exponential_moving_average<float>(const float*, std::ptrdiff_t, std::ptrdiff_t, int, float*, std::ptrdiff_t);
+template void simple_moving_average_parallel<float>(const float*, std::ptrdiff_t, std::ptrdiff_t, int, float*,
+                                                    std::ptrdiff_t, int);
+template void exponential_moving_average_parallel<float>(const float*, std::ptrdiff_t, std::ptrdiff_t, int, float*,
+                                                         std::ptrdiff_t, int);
+template void simple_moving_average_multi<float>(const float*, std::ptrdiff_t, std::ptrdiff_t, const int*, std::ptrdiff_t,
+                                                 float*, std::ptrdiff_t, std::ptrdiff_t);
+template void exponential_moving_average_multi<float>(const float*, std::ptrdiff_t, std::ptrdiff_t, const int*,
+                                                      std::ptrdiff_t, float*, std::ptrdiff_t, std::ptrdiff_t);
+
+// Sliding window extreme with a monotonic deque of indices. The deque lives in a ring of
+// `window` slots (it never holds more) and its values are ordered so that the front is
+// always the extreme of the current window: every index is pushed and popped at most
+// once, so the whole pass is O(n) for any window.
+template <typename T, typename Compare>
+static void rolling_extreme(const T* values, std::ptrdiff_t in_stride, std::ptrdiff_t n,
+                            int window, T* out, std::ptrdiff_t out_stride, Compare keeps) {
+    std::vector<std::ptrdiff_t> ring(window);
+    std::ptrdiff_t head = 0;  // slot of the front (the current extreme)
+    std::ptrdiff_t size = 0;
+    for (std::ptrdiff_t i = 0; i < n; ++i) {
+        T value = values[i * in_stride];
+        // the front leaves the window first; indices only grow, so at most one expires per bar
+        if (size > 0 && ring[head] <= i - window) {
+            head = head + 1 == window ? 0 : head + 1;
+            --size;
+        }
+        // drop values that can never be the extreme again while `value` is in the window
+        while (size > 0) {
+            std::ptrdiff_t back = head + size - 1;
+            if (back >= window) back -= window;
+            if (keeps(values[ring[back] * in_stride], value)) break;
+            --size;
+        }
+        std::ptrdiff_t slot = head + size;
+        if (slot >= window) slot -= window;
+        ring[slot] = i;
+        ++size;
+        out[i * out_stride] = i >= window - 1 ? values[ring[head] * in_stride] : T(0);
+    }
+}
+
+template <typename T>
+static bool less_than(T kept, T value) { return kept < value; }
+template <typename T>
+static bool greater_than(T kept, T value) { return kept > value; }
+
+template <typename T>
+void rolling_min(const T* values, std::ptrdiff_t in_stride, std::ptrdiff_t n,
+                 int window, T* out, std::ptrdiff_t out_stride) {
+    ScopedKernelTimer timer("rolling_min", n, n * sizeof(T));
+    rolling_extreme(values, in_stride, n, window, out, out_stride, less_than<T>);
+}
+
+template <typename T>
+void rolling_max(const T* values, std::ptrdiff_t in_stride, std::ptrdiff_t n,
+                 int window, T* out, std::ptrdiff_t out_stride) {
+    ScopedKernelTimer timer("rolling_max", n, n * sizeof(T));
+    rolling_extreme(values, in_stride, n, window, out, out_stride, greater_than<T>);
+}
+
+template <typename T>
+void donchian_channels(const T* high, std::ptrdiff_t high_stride, const T* low, std::ptrdiff_t low_stride,
+                       std::ptrdiff_t n, int window, T* upper, T* middle, T* lower) {
+    ScopedKernelTimer timer("donchian_channels", n, 2 * n * sizeof(T));
+    rolling_extreme(high, high_stride, n, window, upper, 1, greater_than<T>);
+    rolling_extreme(low, low_stride, n, window, lower, 1, less_than<T>);
+    for (std::ptrdiff_t i = 0; i < n; ++i) {
+        middle[i] = static_cast<T>(0.5 * (static_cast<double>(upper[i]) + lower[i]));
+    }
+}
+
+template void rolling_variance<double>(const double*, std::ptrdiff_t, std::ptrdiff_t, int, int, double*, std::ptrdiff_t);
+template void rolling_std<double>(const double*, std::ptrdiff_t, std::ptrdiff_t, int, int, double*, std::ptrdiff_t);
+template void rolling_zscore<double>(const double*, std::ptrdiff_t, std::ptrdiff_t, int, int, double*, std::ptrdiff_t);
+template void bollinger_bands<double>(const double*, std::ptrdiff_t, std::ptrdiff_t, int, double, int, double*, double*, double*);
+template void rolling_min<double>(const double*, std::ptrdiff_t, std::ptrdiff_t, int, double*, std::ptrdiff_t);
+template void rolling_max<double>(const double*, std::ptrdiff_t, std::ptrdiff_t, int, double*, std::ptrdiff_t);
+template void donchian_channels<double>(const double*, std::ptrdiff_t, const double*, std::ptrdiff_t, std::ptrdiff_t, int,
+                                        double*, double*, double*);
+template void rolling_variance<float>(const float*, std::ptrdiff_t, std::ptrdiff_t, int, int, float*, std::ptrdiff_t);
+template void rolling_std<float>(const float*, std::ptrdiff_t, std::ptrdiff_t, int, int, float*, std::ptrdiff_t);
+template void rolling_zscore<float>(const float*, std::ptrdiff_t, std::ptrdiff_t, int, int, float*, std::ptrdiff_t);
+template void bollinger_bands<float>(const float*, std::ptrdiff_t, std::ptrdiff_t, int, double, int, float*, float*, float*);
+template void rolling_min<float>(const float*, std::ptrdiff_t, std::ptrdiff_t, int, float*, std::ptrdiff_t);
+template void rolling_max<float>(const float*, std::ptrdiff_t, std::ptrdiff_t, int, float*, std::ptrdiff_t);
+template void donchian_channels<float>(const float*, std::ptrdiff_t, const float*, std::ptrdiff_t, std::ptrdiff_t, int,
+                                       float*, float*, float*);
+
+void relative_strength_index(const double* close, std::ptrdiff_t close_stride, std::ptrdiff_t n,
+                             int window, double* out, std::ptrdiff_t out_stride) {
+    ScopedKernelTimer timer("relative_strength_index", n, n * sizeof(double));
+    double avg_gain = 0.0;
+    double avg_loss = 0.0;
+    for (std::ptrdiff_t i = 0; i < n; ++i) {
+        if (i > 0) {
+            double change = close[i * close_stride] - close[(i - 1) * close_stride];
+            double gain = change > 0.0 ? change : 0.0;
+            double loss = change < 0.0 ? -change : 0.0;
+            if (i <= window) {
+                // seed: plain average of the first `window` changes
+                avg_gain += gain / window;
+                avg_loss += loss / window;
+            } else {
+                avg_gain = (avg_gain * (window - 1) + gain) / window;
+                avg_loss = (avg_loss * (window - 1) + loss) / window;
+            }
+        }
+        if (i < window) {
+            out[i * out_stride] = 0.0;
+        } else if (avg_loss == 0.0) {
+            out[i * out_stride] = avg_gain == 0.0 ? 50.0 : 100.0;
+        } else {
+            out[i * out_stride] = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss);
+        }
+    }
+}
+
+void macd(const double* close, std::ptrdiff_t close_stride, std::ptrdiff_t n, int fast, int slow, int signal,
+          double* line, double* signal_line, double* histogram) {
+    ScopedKernelTimer timer("macd", n, n * sizeof(double));
+    if (n == 0) {
+        return;
+    }
+    // same recursion and seeding as exponential_moving_average, three EMAs in one pass
+    double fast_alpha = 2.0 / (fast + 1);
+    double slow_alpha = 2.0 / (slow + 1);
+    double signal_alpha = 2.0 / (signal + 1);
+    double fast_ema = close[0];
+    double slow_ema = close[0];
+    double signal_ema = fast_ema - slow_ema;
+    line[0] = signal_ema;
+    signal_line[0] = signal_ema;
+    histogram[0] = 0.0;
+    for (std::ptrdiff_t i = 1; i < n; ++i) {
+        double price = close[i * close_stride];
+        fast_ema = fast_alpha * price + (1 - fast_alpha) * fast_ema;
+        slow_ema = slow_alpha * price + (1 - slow_alpha) * slow_ema;
+        double value = fast_ema - slow_ema;
+        signal_ema = signal_alpha * value + (1 - signal_alpha) * signal_ema;
+        line[i] = value;
+        signal_line[i] = signal_ema;
+        histogram[i] = value - signal_ema;
+    }
+}
+
+void average_true_range(const double* high, std::ptrdiff_t high_stride, const double* low, std::ptrdiff_t low_stride,
+                        const double* close, std::ptrdiff_t close_stride, std::ptrdiff_t n,
+                        int window, double* out, std::ptrdiff_t out_stride) {
+    ScopedKernelTimer timer("average_true_range", n, 3 * n * sizeof(double));
+    double atr = 0.0;
+    for (std::ptrdiff_t i = 0; i < n; ++i) {
+        double h = high[i * high_stride];
+        double l = low[i * low_stride];
+        double true_range = h - l;
+        if (i > 0) {
+            double prev_close = close[(i - 1) * close_stride];
+            true_range = std::max(true_range, std::max(std::fabs(h - prev_close), std::fabs(l - prev_close)));
+        }
+        if (i < window) {
+            // seed: plain average of the first `window` true ranges
+            atr += true_range / window;
+        } else {
+            atr = (atr * (window - 1) + true_range) / window;
+        }
+        out[i * out_stride] = i >= window - 1 ? atr : 0.0;
+    }
+}
+
+void volume_weighted_average_price(const double* high, std::ptrdiff_t high_stride,
+                                   const double* low, std::ptrdiff_t low_stride,
+                                   const double* close, std::ptrdiff_t close_stride,
+                                   const double* volume, std::ptrdiff_t volume_stride, std::ptrdiff_t n,
+                                   int window, double* out, std::ptrdiff_t out_stride) {
+    ScopedKernelTimer timer("volume_weighted_average_price", n, 4 * n * sizeof(double));
+    double price_volume = 0.0;
+    double total_volume = 0.0;
+    // bars with volume in the window: once it drops to 0 the running sums hold only rounding
+    // residue, so they are reset instead of dividing residue by residue
+    std::ptrdiff_t traded = 0;
+    for (std::ptrdiff_t i = 0; i < n; ++i) {
+        double v = volume[i * volume_stride];
+        price_volume += (high[i * high_stride] + low[i * low_stride] + close[i * close_stride]) / 3.0 * v;
+        total_volume += v;
+        traded += v != 0.0;
+        if (window > 0 && i >= window) {
+            std::ptrdiff_t k = i - window;
+            double old_v = volume[k * volume_stride];
+            price_volume -= (high[k * high_stride] + low[k * low_stride] + close[k * close_stride]) / 3.0 * old_v;
+            total_volume -= old_v;
+            traded -= old_v != 0.0;
+        }
+        if (traded == 0) {
+            price_volume = 0.0;
+            total_volume = 0.0;
+        }
+        if ((window > 0 && i < window - 1) || total_volume <= 0.0) {
+            out[i * out_stride] = 0.0;
+        } else {
+            out[i * out_stride] = price_volume / total_volume;
+        }
+    }
+}
+
+void on_balance_volume(const double* close, std::ptrdiff_t close_stride, const double* volume,
+                       std::ptrdiff_t volume_stride, std::ptrdiff_t n, double* out, std::ptrdiff_t out_stride) {
+    ScopedKernelTimer timer("on_balance_volume", n, 2 * n * sizeof(double));
+    double obv = 0.0;
+    for (std::ptrdiff_t i = 0; i < n; ++i) {
+        if (i > 0) {
+            double change = close[i * close_stride] - close[(i - 1) * close_stride];
+            if (change > 0.0) {
+                obv += volume[i * volume_stride];
+            } else if (change < 0.0) {
+                obv -= volume[i * volume_stride];
+            }
+        }
+        out[i * out_stride] = obv;
+    }
+}
+
+std::vector<double> simple_moving_average(const std::vector<double>& close_prices, int window) {
+    std::vector<double> sma(close_prices.size(), 0.0);
+    simple_moving_average(close_prices.data(), 1, close_prices.size(), window, sma.data(), 1);
+    return sma;
+}
+
+std::vector<double> exponential_moving_average(const std::vector<double>& close_prices, int window) {
+    std::vector<double> ema(close_prices.size(), 0.0);
+    exponential_moving_average(close_prices.data(), 1, close_prices.size(), window, ema.data(), 1);
     return ema;
 }
 
-std::vector<double> load_npy_file(const std::string& filename) {
-    std::ifstream file(filename, std::ios::binary);
-    if (!file) {
-        throw std::runtime_error("Cannot open file: " + filename);
+IncrementalSMA::IncrementalSMA(int window) : window_(window), ring_(window > 0 ? window : 0) {
+    if (window <= 0) {
+        throw std::invalid_argument("window must be a positive integer");
     }
+    reset();
+}
 
-    char magic[6];
-    file.read(magic, 6);
-    if (std::string(magic, 6) != "\x93NUMPY") {
-        throw std::runtime_error("Invalid NPY file format");
+void IncrementalSMA::reset() {
+    std::fill(ring_.begin(), ring_.end(), 0.0);
+    head_ = 0;
+    count_ = 0;
+    sum_ = 0.0;
+}
+
+// Same add-then-subtract order as simple_moving_average so results are bit-identical
+double IncrementalSMA::update(double price) {
+    sum_ += price;
+    if (count_ >= window_) {
+        sum_ -= ring_[head_];
+    }
+    ring_[head_] = price;
+    head_ = (head_ + 1) % ring_.size();
+    ++count_;
+    return value();
+}
+
+void IncrementalSMA::update_many(const double* prices, std::ptrdiff_t in_stride, std::ptrdiff_t n,
+                                 double* out, std::ptrdiff_t out_stride) {
+    ScopedKernelTimer timer("IncrementalSMA.update_many", n, n * sizeof(double));
+    for (std::ptrdiff_t i = 0; i < n; ++i) {
+        out[i * out_stride] = update(prices[i * in_stride]);
     }
+}
 
-    unsigned char version_major, version_minor;
-    file.read((char*)&version_major, 1);
-    file.read((char*)&version_minor, 1);
+std::vector<double> IncrementalSMA::buffer() const {
+    std::size_t filled = static_cast<std::size_t>(std::min<long long>(count_, window_));
+    std::vector<double> ordered;
+    ordered.reserve(filled);
+    std::size_t oldest = filled < ring_.size() ? 0 : head_;
+    for (std::size_t k = 0; k < filled; ++k) {
+        ordered.push_back(ring_[(oldest + k) % ring_.size()]);
+    }
+    return ordered;
+}
+
+void IncrementalSMA::restore(long long count, double sum, const std::vector<double>& buffer) {
+    if (count < 0 || buffer.size() != static_cast<std::size_t>(std::min<long long>(count, window_))) {
+        throw std::invalid_argument("buffer must hold min(count, window) values");
+    }
+    reset();
+    std::copy(buffer.begin(), buffer.end(), ring_.begin());
+    head_ = buffer.size() % ring_.size();
+    count_ = count;
+    sum_ = sum;
+}
 
-    uint16_t header_len;
-    file.read((char*)&header_len, 2);
+IncrementalEMA::IncrementalEMA(int window) : window_(window), alpha_(2.0 / (window + 1)) {
+    if (window <= 0) {
+        throw std::invalid_argument("window must be a positive integer");
+    }
+    reset();
+}
 
-    std::vector<char> header(header_len);
-    file.read(&header[0], header_len);
+void IncrementalEMA::reset() {
+    count_ = 0;
+    value_ = 0.0;
+}
 
-    std::cout << "NPY version: " << (int)version_major << "." << (int)version_minor << std::endl;
-    std::cout << "Header length: " << header_len << std::endl;
+// The first price seeds the average, as in exponential_moving_average
+double IncrementalEMA::update(double price) {
+    if (count_ == 0) {
+        value_ = price;
+    } else {
+        value_ = alpha_ * price + (1 - alpha_) * value_;
+    }
+    ++count_;
+    return value_;
+}
 
-    std::vector<double> data;
-    double value;
-    int count = 0;
-    while (file.read((char*)&value, sizeof(double))) {
-        data.push_back(value);
-        count++;
+void IncrementalEMA::update_many(const double* prices, std::ptrdiff_t in_stride, std::ptrdiff_t n,
+                                 double* out, std::ptrdiff_t out_stride) {
+    ScopedKernelTimer timer("IncrementalEMA.update_many", n, n * sizeof(double));
+    for (std::ptrdiff_t i = 0; i < n; ++i) {
+        out[i * out_stride] = update(prices[i * in_stride]);
     }
+}
 
-    std::cout << "Loaded " << count << " values" << std::endl;
-    
-    if (data.empty()) {
-        throw std::runtime_error("No data found in NPY file");
+void IncrementalEMA::restore(long long count, double value) {
+    if (count < 0) {
+        throw std::invalid_argument("count must be non-negative");
     }
+    count_ = count;
+    value_ = count > 0 ? value : 0.0;
+}
+
+PerformanceAccumulator::PerformanceAccumulator(double risk_free_rate) : risk_free_rate_(risk_free_rate) {
+    reset();
+}
 
-    file.close();
-    return data;
+void PerformanceAccumulator::reset() {
+    count_ = 0;
+    first_equity_ = last_equity_ = peak_ = 0.0;
+    peak_index_ = 0;
+    max_drawdown_ = 0.0;
+    drawdown_peak_ = drawdown_trough_ = 0;
+    drawdown_recovery_ = -1;
+    mean_ = m2_ = downside_sq_ = simple_sum_ = 0.0;
+    wins_ = losses_ = 0;
 }
 
-void save_npy_file(const std::string& filename, const std::vector<double>& data) {
-    std::ofstream file(filename, std::ios::binary);
-    if (!file) {
-        throw std::runtime_error("Cannot create file: " + filename);
+// One equity point and (after the first) the return that led to it
+void PerformanceAccumulator::record(double equity, double ret) {
+    long long index = count_;
+    if (index == 0) {
+        first_equity_ = peak_ = equity;
+    } else {
+        long long periods = index;
+        double delta = ret - mean_;
+        mean_ += delta / periods;
+        m2_ += delta * (ret - mean_);
+        double excess = ret - risk_free_rate_;
+        if (excess < 0.0) {
+            downside_sq_ += excess * excess;
+        }
+        simple_sum_ += ret;
+        if (ret > 0.0) {
+            ++wins_;
+        } else if (ret < 0.0) {
+            ++losses_;
+        }
     }
 
-    file.write("\x93NUMPY", 6);
-    unsigned char version[2] = {1, 0};
-    file.write((char*)version, 2);
+    if (equity >= peak_) {
+        // back at the peak of the largest drawdown so far: it has recovered
+        if (drawdown_recovery_ < 0 && max_drawdown_ > 0.0 && peak_index_ == drawdown_peak_) {
+            drawdown_recovery_ = index;
+        }
+        peak_ = equity;
+        peak_index_ = index;
+    } else {
+        double drawdown = (peak_ - equity) / peak_;
+        if (drawdown > max_drawdown_) {
+            max_drawdown_ = drawdown;
+            drawdown_peak_ = peak_index_;
+            drawdown_trough_ = index;
+            drawdown_recovery_ = -1;
+        }
+    }
+    last_equity_ = equity;
+    ++count_;
+}
 
-    std::string header = "{'descr': '<f8', 'fortran_order': False, 'shape': (" + std::to_string(data.size()) + ",), }";
-    while (header.size() % 16 != 0) header += " ";
+void PerformanceAccumulator::add_equity(double equity) {
+    // a wiped-out account returns -1 on the bar it hits zero and nothing after that
+    record(equity, count_ > 0 && last_equity_ != 0.0 ? equity / last_equity_ - 1.0 : 0.0);
+}
 
-    uint16_t header_len = header.size();
-    file.write((char*)&header_len, 2);
-    file.write(header.c_str(), header.size());
+void PerformanceAccumulator::add_return(double ret) {
+    if (count_ == 0) {
+        record(1.0, 0.0);
+    }
+    record(last_equity_ * (1.0 + ret), ret);
+}
 
-    for (double val : data) {
-        file.write((char*)&val, sizeof(double));
+void PerformanceAccumulator::add_equity_many(const double* equity, std::ptrdiff_t stride, std::ptrdiff_t n) {
+    ScopedKernelTimer timer("PerformanceAccumulator.add_equity_many", n, n * sizeof(double));
+    for (std::ptrdiff_t i = 0; i < n; ++i) {
+        add_equity(equity[i * stride]);
     }
+}
 
-    file.close();
+void PerformanceAccumulator::add_returns_many(const double* returns, std::ptrdiff_t stride, std::ptrdiff_t n) {
+    ScopedKernelTimer timer("PerformanceAccumulator.add_returns_many", n, n * sizeof(double));
+    for (std::ptrdiff_t i = 0; i < n; ++i) {
+        add_return(returns[i * stride]);
+    }
+}
+
+// Advances kRows strategies together: each row's compounding is a serial chain of
+// multiplies, so interleaving independent rows keeps the pipeline full (as in the EMA
+// multi kernel).
+template <int kRows, typename P>
+static void portfolio_rows(const PortfolioView<P>& view, std::ptrdiff_t k0, std::ptrdiff_t n,
+                           double initial_capital, double cost,
+                           double* equity, std::ptrdiff_t row_stride, std::ptrdiff_t col_stride) {
+    const P* positions[kRows];
+    const double* returns[kRows];
+    double* out[kRows];
+    double sizing[kRows], level[kRows], held[kRows];
+    for (int j = 0; j < kRows; ++j) {
+        positions[j] = view.positions + (k0 + j) * view.positions_row_stride;
+        returns[j] = view.returns + (k0 + j) * view.returns_row_stride;
+        out[j] = equity + (k0 + j) * row_stride;
+        sizing[j] = view.sizing[(k0 + j) * view.sizing_stride];
+        level[j] = initial_capital;
+        held[j] = 0.0;
+    }
+    for (std::ptrdiff_t i = 0; i < n; ++i) {
+        for (int j = 0; j < kRows; ++j) {
+            double exposure = static_cast<double>(positions[j][i * view.positions_stride]) * sizing[j];
+            double growth = i > 0 ? 1.0 + held[j] * returns[j][(i - 1) * view.returns_stride] : 1.0;
+            // branch-free: an unchanged exposure multiplies by exactly 1.0
+            growth *= 1.0 - cost * std::fabs(exposure - held[j]);
+            level[j] *= growth;
+            out[j][i * col_stride] = level[j];
+            held[j] = exposure;
+        }
+    }
+}
+
+template <typename P>
+void portfolio_equity(const PortfolioView<P>& view, std::ptrdiff_t n_strategies, std::ptrdiff_t n,
+                      double initial_capital, double cost,
+                      double* equity, std::ptrdiff_t row_stride, std::ptrdiff_t col_stride) {
+    ScopedKernelTimer timer("portfolio_equity", n_strategies * n, n_strategies * n * (sizeof(P) + sizeof(double)));
+    const std::ptrdiff_t group = 4;
+    std::ptrdiff_t k = 0;
+    for (; k + group <= n_strategies; k += group) {
+        portfolio_rows<group>(view, k, n, initial_capital, cost, equity, row_stride, col_stride);
+    }
+    for (; k < n_strategies; ++k) {
+        portfolio_rows<1>(view, k, n, initial_capital, cost, equity, row_stride, col_stride);
+    }
+}
+
+template void portfolio_equity<std::int8_t>(const PortfolioView<std::int8_t>&, std::ptrdiff_t, std::ptrdiff_t,
+                                            double, double, double*, std::ptrdiff_t, std::ptrdiff_t);
+template void portfolio_equity<double>(const PortfolioView<double>&, std::ptrdiff_t, std::ptrdiff_t,
+                                       double, double, double*, std::ptrdiff_t, std::ptrdiff_t);
+
+PerformanceStats PerformanceAccumulator::result(double periods_per_year) const {
+    PerformanceStats stats;
+    stats.periods = count_ > 1 ? count_ - 1 : 0;
+    bool has_equity = count_ > 0 && first_equity_ != 0.0;
+    stats.total_return = has_equity ? last_equity_ / first_equity_ - 1.0 : 0.0;
+    stats.total_log_return = has_equity ? std::log(last_equity_ / first_equity_) : 0.0;
+    stats.total_simple_return = simple_sum_;
+    stats.mean_return = mean_;
+
+    double annualize = std::sqrt(periods_per_year);
+    double std_dev = stats.periods > 0 ? std::sqrt(m2_ / stats.periods) : 0.0;
+    double downside = stats.periods > 0 ? std::sqrt(downside_sq_ / stats.periods) : 0.0;
+    double excess = mean_ - risk_free_rate_;
+    stats.volatility = std_dev * annualize;
+    stats.sharpe = std_dev > 0.0 ? excess / std_dev * annualize : 0.0;
+    stats.sortino = downside > 0.0 ? excess / downside * annualize : 0.0;
+    stats.hit_rate = wins_ + losses_ > 0 ? static_cast<double>(wins_) / (wins_ + losses_) : 0.0;
+
+    stats.max_drawdown = max_drawdown_;
+    stats.max_drawdown_peak = drawdown_peak_;
+    stats.max_drawdown_trough = drawdown_trough_;
+    stats.max_drawdown_recovery = drawdown_recovery_;
+    if (max_drawdown_ > 0.0) {
+        long long end = drawdown_recovery_ >= 0 ? drawdown_recovery_ : count_ - 1;
+        stats.max_drawdown_duration = end - drawdown_peak_;
+    } else {
+        stats.max_drawdown_duration = 0;
+    }
+    return stats;
+}
+
+// Read-only memory map of a whole file (POSIX); unmapped when it goes out of scope
+class MappedFile {
+public:
+    explicit MappedFile(const std::string& path) : data_(nullptr), size_(0) {
+        int fd = ::open(path.c_str(), O_RDONLY);
+        if (fd < 0) {
+            throw std::runtime_error("Cannot open file: " + path);
+        }
+        struct stat st;
+        if (::fstat(fd, &st) != 0) {
+            ::close(fd);
+            throw std::runtime_error("Cannot stat file: " + path);
+        }
+        size_ = static_cast<std::size_t>(st.st_size);
+        if (size_ > 0) {
+            void* mapped = ::mmap(nullptr, size_, PROT_READ, MAP_PRIVATE, fd, 0);
+            if (mapped == MAP_FAILED) {
+                ::close(fd);
+                throw std::runtime_error("Cannot mmap file: " + path);
+            }
+            ::madvise(mapped, size_, MADV_SEQUENTIAL);
+            data_ = static_cast<const char*>(mapped);
+        }
+        ::close(fd);
+    }
+
+    ~MappedFile() {
+        if (data_ != nullptr) {
+            ::munmap(const_cast<char*>(data_), size_);
+        }
+    }
+
+    const char* data() const { return data_; }
+    std::size_t size() const { return size_; }
+
+private:
+    MappedFile(const MappedFile&);
+    MappedFile& operator=(const MappedFile&);
+
+    const char* data_;
+    std::size_t size_;
+};
+
+// Trim spaces, tabs and '\r' from both ends of a field
+static void trim_field(const char*& begin, const char*& end) {
+    while (begin < end && (*begin == ' ' || *begin == '\t')) ++begin;
+    while (end > begin && (end[-1] == ' ' || end[-1] == '\t' || end[-1] == '\r')) --end;
+}
+
+// Exact powers of ten representable as doubles (used by the fast path below)
+static const double kPow10[] = {1e0, 1e1, 1e2, 1e3, 1e4, 1e5, 1e6, 1e7, 1e8, 1e9, 1e10, 1e11,
+                                1e12, 1e13, 1e14, 1e15, 1e16, 1e17, 1e18, 1e19, 1e20, 1e21, 1e22};
+
+// Plain decimals like "1234.5678" are parsed directly: with at most 15 significant digits
+// and a power of ten <= 22 both operands are exact doubles, so one multiply/divide gives
+// the correctly rounded result (identical to strtod). Anything else (exponents, long
+// mantissas, inf/nan) falls back to strtod on a NUL-terminated copy of the field.
+static bool parse_double_field(const char* begin, const char* end, double& value) {
+    trim_field(begin, end);
+    if (begin == end) {
+        return false;
+    }
+    const char* p = begin;
+    bool negative = false;
+    if (*p == '-' || *p == '+') {
+        negative = *p == '-';
+        ++p;
+    }
+    std::uint64_t mantissa = 0;
+    int digits = 0;
+    int fraction_digits = 0;
+    bool seen_digit = false;
+    for (; p < end && *p >= '0' && *p <= '9'; ++p) {
+        seen_digit = true;
+        if (mantissa != 0 || *p != '0') {
+            mantissa = mantissa * 10 + static_cast<std::uint64_t>(*p - '0');
+            ++digits;
+        }
+    }
+    if (p < end && *p == '.') {
+        ++p;
+        for (; p < end && *p >= '0' && *p <= '9'; ++p) {
+            seen_digit = true;
+            mantissa = mantissa * 10 + static_cast<std::uint64_t>(*p - '0');
+            if (mantissa != 0) {
+                ++digits;
+            }
+            ++fraction_digits;
+        }
+    }
+    if (p == end && seen_digit && digits <= 15 && fraction_digits <= 22) {
+        value = static_cast<double>(mantissa) / kPow10[fraction_digits];
+        if (negative) {
+            value = -value;
+        }
+        return true;
+    }
+
+    char buf[64];
+    std::size_t len = static_cast<std::size_t>(end - begin);
+    if (len >= sizeof(buf)) {
+        return false;
+    }
+    std::memcpy(buf, begin, len);
+    buf[len] = '\0';
+    char* parsed_end;
+    value = std::strtod(buf, &parsed_end);
+    return parsed_end == buf + len;
+}
+
+static bool parse_int_field(const char* begin, const char* end, std::int64_t& value) {
+    trim_field(begin, end);
+    const char* p = begin;
+    bool negative = false;
+    if (p < end && (*p == '-' || *p == '+')) {
+        negative = *p == '-';
+        ++p;
+    }
+    if (p == end || end - p > 18) {
+        return false;
+    }
+    std::int64_t result = 0;
+    for (; p < end; ++p) {
+        if (*p < '0' || *p > '9') {
+            return false;
+        }
+        result = result * 10 + (*p - '0');
+    }
+    value = negative ? -result : result;
+    return true;
+}
+
+void parse_ohlcvt_csv(const char* begin, const char* end, long long first_line, OHLCVTColumns& columns) {
+    ScopedKernelTimer timer("parse_ohlcvt_csv", 0, end - begin);
+    std::size_t rows_before = columns.size();
+    // One cheap newline count up front so the columns never regrow
+    std::size_t rows = columns.size() + std::count(begin, end, '\n') + 1;
+    columns.timestamp.reserve(rows);
+    columns.open.reserve(rows);
+    columns.high.reserve(rows);
+    columns.low.reserve(rows);
+    columns.close.reserve(rows);
+    columns.volume.reserve(rows);
+    columns.trades.reserve(rows);
+
+    long long line_number = first_line;
+    bool first_row = first_line == 1;  // only the start of a file can hold a header
+    const char* line = begin;
+    while (line < end) {
+        const char* line_end = static_cast<const char*>(std::memchr(line, '\n', end - line));
+        if (line_end == nullptr) {
+            line_end = end;
+        }
+
+        const char* field_begin[8];
+        const char* field_end[8];
+        int n_fields = 0;
+        const char* field = line;
+        while (n_fields < 8) {
+            const char* comma = static_cast<const char*>(std::memchr(field, ',', line_end - field));
+            field_begin[n_fields] = field;
+            field_end[n_fields] = comma != nullptr ? comma : line_end;
+            ++n_fields;
+            if (comma == nullptr) {
+                break;
+            }
+            field = comma + 1;
+        }
+
+        const char* trimmed_begin = line;
+        const char* trimmed_end = line_end;
+        trim_field(trimmed_begin, trimmed_end);
+        bool is_header = first_row && trimmed_begin != trimmed_end &&
+                         !std::isdigit(static_cast<unsigned char>(*trimmed_begin));
+        if (trimmed_begin == trimmed_end || is_header) {
+            // blank line or column names
+        } else if (n_fields != 6 && n_fields != 7) {
+            columns.malformed.push_back(std::make_pair(line_number,
+                "expected 6 or 7 fields, got " + (n_fields == 8 ? std::string("more than 7") : std::to_string(n_fields))));
+        } else {
+            std::int64_t timestamp = 0;
+            std::int64_t trades = 0;
+            double values[5];
+            const char* bad = nullptr;
+            if (!parse_int_field(field_begin[0], field_end[0], timestamp)) {
+                bad = "timestamp";
+            }
+            static const char* names[5] = {"open", "high", "low", "close", "volume"};
+            for (int k = 0; k < 5 && bad == nullptr; ++k) {
+                if (!parse_double_field(field_begin[k + 1], field_end[k + 1], values[k])) {
+                    bad = names[k];
+                }
+            }
+            if (bad == nullptr && n_fields == 7 && !parse_int_field(field_begin[6], field_end[6], trades)) {
+                bad = "trades";
+            }
+
+            if (bad == nullptr) {
+                columns.timestamp.push_back(timestamp);
+                columns.open.push_back(values[0]);
+                columns.high.push_back(values[1]);
+                columns.low.push_back(values[2]);
+                columns.close.push_back(values[3]);
+                columns.volume.push_back(values[4]);
+                columns.trades.push_back(trades);
+            } else {
+                columns.malformed.push_back(std::make_pair(line_number, std::string("invalid ") + bad));
+            }
+        }
+        if (trimmed_begin != trimmed_end) {
+            first_row = false;
+        }
+
+        line = line_end + 1;
+        ++line_number;
+    }
+    timer.set_counts(static_cast<long long>(columns.size() - rows_before), end - begin);
+}
+
+OHLCVTColumns load_ohlcvt_csv(const std::string& path) {
+    MappedFile file(path);
+    OHLCVTColumns columns;
+    parse_ohlcvt_csv(file.data(), file.data() + file.size(), 1, columns);
+    return columns;
+}
+
+// Start of the interval-aligned bucket holding `timestamp` (floor, also for negative times)
+static std::int64_t bucket_start(std::int64_t timestamp, std::int64_t interval) {
+    std::int64_t bucket = timestamp / interval;
+    if (timestamp % interval != 0 && timestamp < 0) {
+        --bucket;
+    }
+    return bucket * interval;
+}
+
+void resample_ohlcvt(const OHLCVTView& input, std::ptrdiff_t n, const std::vector<std::int64_t>& intervals,
+                     std::vector<OHLCVTColumns>& out) {
+    ScopedKernelTimer timer("resample_ohlcvt", n, n * 7 * sizeof(double));
+    for (std::int64_t interval : intervals) {
+        if (interval <= 0) {
+            throw std::invalid_argument("intervals must be positive");
+        }
+    }
+    std::size_t count = intervals.size();
+    out.assign(count, OHLCVTColumns());
+    if (n == 0) {
+        return;
+    }
+
+    std::int64_t first = input.timestamp[0];
+    std::int64_t span = input.timestamp[(n - 1) * input.timestamp_stride] - first;
+    for (std::size_t k = 0; k < count; ++k) {
+        std::size_t bars = static_cast<std::size_t>(std::min<std::int64_t>(n, span / intervals[k] + 2));
+        out[k].timestamp.reserve(bars);
+        out[k].open.reserve(bars);
+        out[k].high.reserve(bars);
+        out[k].low.reserve(bars);
+        out[k].close.reserve(bars);
+        out[k].volume.reserve(bars);
+        out[k].trades.reserve(bars);
+    }
+
+    // exclusive end of each interval's open bar: rows before it only update that bar,
+    // so the division in bucket_start runs once per output bar rather than once per row
+    std::vector<std::int64_t> bucket_end(count, std::numeric_limits<std::int64_t>::min());
+    std::int64_t previous = first;
+    for (std::ptrdiff_t i = 0; i < n; ++i) {
+        std::int64_t timestamp = input.timestamp[i * input.timestamp_stride];
+        if (timestamp < previous) {
+            throw std::invalid_argument("timestamps must be sorted in ascending order");
+        }
+        previous = timestamp;
+        double open = input.open[i * input.open_stride];
+        double high = input.high[i * input.high_stride];
+        double low = input.low[i * input.low_stride];
+        double close = input.close[i * input.close_stride];
+        double volume = input.volume[i * input.volume_stride];
+        std::int64_t trades = input.trades != nullptr ? input.trades[i * input.trades_stride] : 1;
+
+        for (std::size_t k = 0; k < count; ++k) {
+            OHLCVTColumns& bars = out[k];
+            if (timestamp >= bucket_end[k]) {
+                std::int64_t start = bucket_start(timestamp, intervals[k]);
+                bucket_end[k] = start + intervals[k];
+                bars.timestamp.push_back(start);
+                bars.open.push_back(open);
+                bars.high.push_back(high);
+                bars.low.push_back(low);
+                bars.close.push_back(close);
+                bars.volume.push_back(volume);
+                bars.trades.push_back(trades);
+            } else {
+                bars.high.back() = std::max(bars.high.back(), high);
+                bars.low.back() = std::min(bars.low.back(), low);
+                bars.close.back() = close;
+                bars.volume.back() += volume;
+                bars.trades.back() += trades;
+            }
+        }
+    }
+}
+
+// NPY format (https://numpy.org/doc/stable/reference/generated/numpy.lib.format.html):
+// magic "\x93NUMPY", major/minor version, header length (2 bytes in v1.0, 4 bytes in
+// v2.0/v3.0), then an ASCII dict with 'descr', 'fortran_order' and 'shape'.
+struct NpyHeader {
+    std::string descr;
+    bool fortran_order;
+    std::vector<std::size_t> shape;
+    std::size_t data_offset;
+
+    std::size_t count() const {
+        std::size_t total = 1;
+        for (std::size_t dim : shape) total *= dim;
+        return total;
+    }
+};
+
+// Value of `key` in the header dict, i.e. the text following "'key':"
+static std::string npy_header_value(const std::string& header, const std::string& key) {
+    std::size_t pos = header.find("'" + key + "'");
+    if (pos == std::string::npos) {
+        throw std::runtime_error("NPY header is missing '" + key + "'");
+    }
+    pos = header.find(':', pos);
+    if (pos == std::string::npos) {
+        throw std::runtime_error("Malformed NPY header");
+    }
+    return header.substr(pos + 1);
+}
+
+NpyHeader parse_npy_header(const char* data, std::size_t size) {
+    if (size < 10 || std::memcmp(data, "\x93NUMPY", 6) != 0) {
+        throw std::runtime_error("Invalid NPY file format");
+    }
+    unsigned char major = static_cast<unsigned char>(data[6]);
+    std::size_t header_len;
+    std::size_t prefix;
+    if (major == 1) {
+        header_len = static_cast<unsigned char>(data[8]) | (static_cast<unsigned char>(data[9]) << 8);
+        prefix = 10;
+    } else if (major == 2 || major == 3) {
+        if (size < 12) {
+            throw std::runtime_error("Truncated NPY header");
+        }
+        header_len = 0;
+        for (int k = 3; k >= 0; --k) {
+            header_len = (header_len << 8) | static_cast<unsigned char>(data[8 + k]);
+        }
+        prefix = 12;
+    } else {
+        throw std::runtime_error("Unsupported NPY version " + std::to_string(major));
+    }
+    if (prefix + header_len > size) {
+        throw std::runtime_error("Truncated NPY header");
+    }
+    std::string header(data + prefix, header_len);
+
+    NpyHeader result;
+    result.data_offset = prefix + header_len;
+
+    std::string descr = npy_header_value(header, "descr");
+    std::size_t open_quote = descr.find_first_of("'\"");
+    if (open_quote == std::string::npos) {
+        throw std::runtime_error("Malformed NPY descr");
+    }
+    std::size_t close_quote = descr.find(descr[open_quote], open_quote + 1);
+    if (close_quote == std::string::npos) {
+        throw std::runtime_error("Malformed NPY descr");
+    }
+    result.descr = descr.substr(open_quote + 1, close_quote - open_quote - 1);
+
+    std::string fortran = npy_header_value(header, "fortran_order");
+    fortran.erase(0, fortran.find_first_not_of(' '));
+    if (fortran.compare(0, 4, "True") == 0) {
+        result.fortran_order = true;
+    } else if (fortran.compare(0, 5, "False") == 0) {
+        result.fortran_order = false;
+    } else {
+        throw std::runtime_error("Malformed NPY fortran_order");
+    }
+
+    std::string shape = npy_header_value(header, "shape");
+    std::size_t open_paren = shape.find('(');
+    std::size_t close_paren = shape.find(')', open_paren);
+    if (open_paren == std::string::npos || close_paren == std::string::npos) {
+        throw std::runtime_error("Malformed NPY shape");
+    }
+    const char* p = shape.c_str() + open_paren + 1;
+    const char* end = shape.c_str() + close_paren;
+    while (p < end) {
+        if (*p >= '0' && *p <= '9') {
+            char* next;
+            result.shape.push_back(static_cast<std::size_t>(std::strtoull(p, &next, 10)));
+            p = next;
+        } else {
+            ++p;
+        }
+    }
+    return result;
+}
+
+// A 1-D float64 NPY file mapped read-only; data() points straight into the mapping.
+// Little-endian float32 input is accepted and widened once into an owned buffer.
+class NpyInput {
+public:
+    explicit NpyInput(const std::string& path) : file_(path), data_(nullptr) {
+        header_ = parse_npy_header(file_.data(), file_.size());
+        if (header_.fortran_order || header_.shape.size() != 1) {
+            throw std::runtime_error("Expected a 1-D C-ordered array in " + path);
+        }
+        size_ = header_.count();
+
+        std::size_t item_size;
+        if (header_.descr == "<f8") {
+            item_size = 8;
+        } else if (header_.descr == "<f4") {
+            item_size = 4;
+        } else {
+            throw std::runtime_error("Unsupported NPY dtype '" + header_.descr + "' (expected <f8 or <f4)");
+        }
+        if (header_.data_offset + size_ * item_size > file_.size()) {
+            throw std::runtime_error("NPY file is truncated: " + path);
+        }
+
+        const char* raw = file_.data() + header_.data_offset;
+        bool aligned = reinterpret_cast<std::uintptr_t>(raw) % alignof(double) == 0;
+        if (item_size == 8 && aligned) {
+            data_ = reinterpret_cast<const double*>(raw);
+        } else if (item_size == 8) {
+            owned_.resize(size_);
+            std::memcpy(owned_.data(), raw, size_ * sizeof(double));
+            data_ = owned_.data();
+        } else {
+            owned_.resize(size_);
+            for (std::size_t i = 0; i < size_; ++i) {
+                float value;
+                std::memcpy(&value, raw + i * sizeof(float), sizeof(float));
+                owned_[i] = value;
+            }
+            data_ = owned_.data();
+        }
+    }
+
+    const NpyHeader& header() const { return header_; }
+    const double* data() const { return data_; }
+    std::size_t size() const { return size_; }
+
+private:
+    MappedFile file_;
+    NpyHeader header_;
+    std::size_t size_;
+    const double* data_;
+    std::vector<double> owned_;
+};
+
+static std::string npy_header_bytes(std::size_t n) {
+    std::string dict = "{'descr': '<f8', 'fortran_order': False, 'shape': (" + std::to_string(n) + ",), }";
+    // v1.0 stores the header length in 2 bytes; larger headers need v2.0
+    bool v2 = dict.size() + 1 + 10 > 65535;
+    std::size_t prefix = v2 ? 12 : 10;
+    // header (including the trailing newline) is padded so the data starts on a 64-byte boundary
+    std::size_t total = prefix + dict.size() + 1;
+    std::size_t padded = (total + 63) / 64 * 64;
+    dict.append(padded - total, ' ');
+    dict += '\n';
+
+    std::string bytes("\x93NUMPY", 6);
+    bytes += static_cast<char>(v2 ? 2 : 1);
+    bytes += static_cast<char>(0);
+    std::size_t header_len = dict.size();
+    for (std::size_t k = 0; k < (v2 ? 4u : 2u); ++k) {
+        bytes += static_cast<char>((header_len >> (8 * k)) & 0xff);
+    }
+    return bytes + dict;
+}
+
+// A 1-D float64 NPY file allocated at its final size and mapped read-write, so kernels
+// can write results directly into the page cache with no intermediate buffer.
+class NpyOutput {
+public:
+    NpyOutput(const std::string& path, std::size_t n) : path_(path), size_(n), mapping_(nullptr) {
+        std::string header = npy_header_bytes(n);
+        length_ = header.size() + n * sizeof(double);
+        int fd = ::open(path.c_str(), O_RDWR | O_CREAT | O_TRUNC, 0644);
+        if (fd < 0) {
+            throw std::runtime_error("Cannot create file: " + path);
+        }
+        // reserve the blocks up front: a sparse file would only report a full disk as
+        // SIGBUS on the first store into the mapping
+        int error = ::posix_fallocate(fd, 0, static_cast<off_t>(length_));
+        if (error != 0) {
+            ::close(fd);
+            throw std::runtime_error("Cannot allocate " + std::to_string(length_) + " bytes for " + path + ": " + std::strerror(error));
+        }
+        void* mapped = ::mmap(nullptr, length_, PROT_READ | PROT_WRITE, MAP_SHARED, fd, 0);
+        ::close(fd);
+        if (mapped == MAP_FAILED) {
+            throw std::runtime_error("Cannot mmap file: " + path);
+        }
+        mapping_ = static_cast<char*>(mapped);
+        std::memcpy(mapping_, header.data(), header.size());
+        data_ = reinterpret_cast<double*>(mapping_ + header.size());
+    }
+
+    // An output that was never committed (the run failed part way) is removed rather
+    // than left behind as a complete-looking file.
+    ~NpyOutput() {
+        if (mapping_ != nullptr) {
+            ::munmap(mapping_, length_);
+            ::unlink(path_.c_str());
+        }
+    }
+
+    // Flush the mapping to disk; write errors only surface here, munmap would drop them
+    void commit() {
+        int result = ::msync(mapping_, length_, MS_SYNC);
+        int error = errno;
+        ::munmap(mapping_, length_);
+        mapping_ = nullptr;
+        if (result != 0) {
+            ::unlink(path_.c_str());
+            throw std::runtime_error("Cannot write file: " + path_ + ": " + std::strerror(error));
+        }
+    }
+
+    double* data() { return data_; }
+    std::size_t size() const { return size_; }
+
+private:
+    NpyOutput(const NpyOutput&);
+    NpyOutput& operator=(const NpyOutput&);
+
+    std::string path_;
+    std::size_t size_;
+    std::size_t length_;
+    char* mapping_;
+    double* data_;
+};
+
+static void print_first_values(const char* name, const double* values, std::size_t n) {
+    std::cout << name << " size: " << n << std::endl;
+    std::cout << "First 20 " << name << " values: ";
+    for (std::size_t i = 0; i < 20 && i < n; ++i) {
+        std::cout << values[i] << " ";
+    }
 }
 
 int main(int argc, char* argv[]) {
@@ -117,40 +1542,38 @@ int main(int argc, char* argv[]) {
     int window = std::atoi(argv[1]);
     std::string input_file = argv[2];
     std::string output_prefix = argv[3];
+    if (window <= 0) {
+        std::cerr << "Error: window size must be a positive integer" << std::endl;
+        return 1;
+    }
 
     try {
-        std::cout << "Loading data from " << input_file << "..." << std::endl;
-        std::vector<double> close_prices = load_npy_file(input_file);
-        
-        std::cout << "Loaded " << close_prices.size() << " data points" << std::endl;
+        std::cout << "Mapping data from " << input_file << "..." << std::endl;
+        NpyInput close_prices(input_file);
+        if (close_prices.size() == 0) {
+            throw std::runtime_error("No data found in NPY file");
+        }
+        std::size_t n = close_prices.size();
+
+        std::cout << "Loaded " << n << " data points (dtype " << close_prices.header().descr << ")" << std::endl;
         std::cout << "Computing SMA and EMA with window size " << window << "..." << std::endl;
-        
-        std::vector<double> sma = simple_moving_average(close_prices, window);
-        std::vector<double> ema = exponential_moving_average(close_prices, window);
-        
+
+        // Results are computed straight into the mapped output files
+        std::string sma_file = output_prefix + "_sma.npy";
+        std::string ema_file = output_prefix + "_ema.npy";
+        NpyOutput sma(sma_file, n);
+        NpyOutput ema(ema_file, n);
+        simple_moving_average(close_prices.data(), 1, n, window, sma.data(), 1);
+        exponential_moving_average(close_prices.data(), 1, n, window, ema.data(), 1);
+
         std::cout << "\n=== SMA Results ===" << std::endl;
-        std::cout << "SMA size: " << sma.size() << std::endl;
-        std::cout << "First 20 SMA values: ";
-        for (int i = 0; i < 20 && i < (int)sma.size(); ++i) {
-            std::cout << sma[i] << " ";
-        }
+        print_first_values("SMA", sma.data(), n);
         std::cout << "\n\n=== EMA Results ===" << std::endl;
-        std::cout << "EMA size: " << ema.size() << std::endl;
-        std::cout << "First 20 EMA values: ";
-        for (int i = 0; i < 20 && i < (int)ema.size(); ++i) {
-            std::cout << ema[i] << " ";
-        }
+        print_first_values("EMA", ema.data(), n);
         std::cout << "\n" << std::endl;
-        
-        std::string sma_file = output_prefix + "_sma.npy";
-        std::string ema_file = output_prefix + "_ema.npy";
-        
-        std::cout << "Saving SMA to " << sma_file << "..." << std::endl;
-        save_npy_file(sma_file, sma);
-        
-        std::cout << "Saving EMA to " << ema_file << "..." << std::endl;
-        save_npy_file(ema_file, ema);
-        
+
+        sma.commit();
+        ema.commit();
         std::cout << "Done! Results saved to " << sma_file << " and " << ema_file << std::endl;
         return 0;
     } catch (const std::exception& e) {
@@ -158,4 +1581,3 @@ int main(int argc, char* argv[]) {
         return 1;
     }
 }
-
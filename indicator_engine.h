@@ -0,0 +1,321 @@
+// Declarations shared by indicator_engine.cpp and bindings.cpp
+#pragma once
+
+#include <vector>
+#include <string>
+#include <utility>
+#include <cstddef>
+#include <cstdint>
+#include <chrono>
+
+// The moving average kernels are templates on the price/output type, instantiated for
+// double and float. Sums, averages and EMA states are always carried in double, so float
+// only changes the storage: results are the double results rounded once to float, and
+// float input moves half the bytes per pass.
+template <typename T>
+void simple_moving_average(const T* close_prices, std::ptrdiff_t in_stride, std::ptrdiff_t n,
+                           int window, T* out, std::ptrdiff_t out_stride);
+template <typename T>
+void exponential_moving_average(const T* close_prices, std::ptrdiff_t in_stride, std::ptrdiff_t n,
+                                int window, T* out, std::ptrdiff_t out_stride);
+template <typename T>
+void simple_moving_average_multi(const T* close_prices, std::ptrdiff_t in_stride, std::ptrdiff_t n,
+                                 const int* windows, std::ptrdiff_t n_windows,
+                                 T* out, std::ptrdiff_t row_stride, std::ptrdiff_t col_stride);
+template <typename T>
+void exponential_moving_average_multi(const T* close_prices, std::ptrdiff_t in_stride, std::ptrdiff_t n,
+                                      const int* windows, std::ptrdiff_t n_windows,
+                                      T* out, std::ptrdiff_t row_stride, std::ptrdiff_t col_stride);
+
+// Multithreaded versions for very long single series. The series is split into one chunk
+// per thread (threads <= 0: one per hardware thread; short series stay serial):
+//  - SMA: every chunk seeds its running sum from the `window` values before it, so the
+//    chunks are independent. Results differ from the serial kernel only by the rounding of
+//    the running sum: |difference| <= ~1e-12 x max |price| (the serial sum drifts too).
+//  - EMA: parallel scan of the linear recurrence y[i] = a*x[i] + (1-a)*y[i-1]. Each chunk
+//    runs the recurrence from 0, the chunk carries are chained serially and then added back
+//    as carry * (1-a)^(k+1) (until that factor drops below 1e-18). Relative difference to
+//    the serial kernel <= ~1e-13; the first chunk is bit-identical. Safe in place.
+//    For float the partial values are stored before the carry is added, so results are
+//    within ~2 float ulps of the serial kernel.
+template <typename T>
+void simple_moving_average_parallel(const T* close_prices, std::ptrdiff_t in_stride, std::ptrdiff_t n,
+                                    int window, T* out, std::ptrdiff_t out_stride, int threads);
+template <typename T>
+void exponential_moving_average_parallel(const T* close_prices, std::ptrdiff_t in_stride, std::ptrdiff_t n,
+                                         int window, T* out, std::ptrdiff_t out_stride, int threads);
+
+// Rolling dispersion over the last `window` values, zero-padded for the first window-1
+// values. The mean comes from the same running sum as simple_moving_average and the
+// variance is updated Welford-style, in one pass. `ddof` is the delta degrees of freedom
+// (0: population, 1: sample) and must be smaller than `window`. Because the mean is the
+// SMA's running sum, the absolute error scales with the price level (~1e-12 of it per
+// sqrt(bar)); windows whose std is below 1e-9 of their mean are treated as constant.
+// Instantiated for double and float like the moving averages (double accumulators).
+template <typename T>
+void rolling_variance(const T* values, std::ptrdiff_t in_stride, std::ptrdiff_t n,
+                      int window, int ddof, T* out, std::ptrdiff_t out_stride);
+template <typename T>
+void rolling_std(const T* values, std::ptrdiff_t in_stride, std::ptrdiff_t n,
+                 int window, int ddof, T* out, std::ptrdiff_t out_stride);
+// (value - rolling mean) / rolling std, 0.0 where the window is constant
+template <typename T>
+void rolling_zscore(const T* values, std::ptrdiff_t in_stride, std::ptrdiff_t n,
+                    int window, int ddof, T* out, std::ptrdiff_t out_stride);
+// middle = SMA, upper/lower = middle -/+ num_std rolling stds; contiguous outputs of length n
+template <typename T>
+void bollinger_bands(const T* close_prices, std::ptrdiff_t in_stride, std::ptrdiff_t n,
+                     int window, double num_std, int ddof, T* upper, T* middle, T* lower);
+
+// OHLCV indicators. Inputs are strided columns of length n; single-output kernels
+// write a strided `out`, multi-output kernels contiguous arrays of length n.
+// RSI with Wilder smoothing: the first `window` values are 0.0, the first RSI is at
+// index `window` (seeded with the plain average of the first `window` changes).
+void relative_strength_index(const double* close, std::ptrdiff_t close_stride, std::ptrdiff_t n,
+                             int window, double* out, std::ptrdiff_t out_stride);
+// MACD line = EMA(fast) - EMA(slow), signal = EMA(MACD line, signal), histogram =
+// line - signal, all with the exponential_moving_average recursion (seeded at index 0).
+void macd(const double* close, std::ptrdiff_t close_stride, std::ptrdiff_t n, int fast, int slow, int signal,
+          double* line, double* signal_line, double* histogram);
+// Average true range with Wilder smoothing; zero-padded for the first window-1 values.
+void average_true_range(const double* high, std::ptrdiff_t high_stride, const double* low, std::ptrdiff_t low_stride,
+                        const double* close, std::ptrdiff_t close_stride, std::ptrdiff_t n,
+                        int window, double* out, std::ptrdiff_t out_stride);
+// Volume weighted average of the typical price (high + low + close) / 3, cumulative from
+// the first bar when window == 0, else over the last `window` bars (zero-padded).
+// Bars where no volume has traded in the window are 0.0.
+void volume_weighted_average_price(const double* high, std::ptrdiff_t high_stride,
+                                   const double* low, std::ptrdiff_t low_stride,
+                                   const double* close, std::ptrdiff_t close_stride,
+                                   const double* volume, std::ptrdiff_t volume_stride, std::ptrdiff_t n,
+                                   int window, double* out, std::ptrdiff_t out_stride);
+// On-balance volume: starts at 0, adds the bar's volume on an up close and subtracts it on a down close.
+void on_balance_volume(const double* close, std::ptrdiff_t close_stride, const double* volume,
+                       std::ptrdiff_t volume_stride, std::ptrdiff_t n, double* out, std::ptrdiff_t out_stride);
+
+// Rolling extremes over the last `window` values, zero-padded for the first window-1
+// values like simple_moving_average. O(n) regardless of the window (monotonic deque).
+// Instantiated for double and float; the extremes are the input values themselves.
+template <typename T>
+void rolling_min(const T* values, std::ptrdiff_t in_stride, std::ptrdiff_t n,
+                 int window, T* out, std::ptrdiff_t out_stride);
+template <typename T>
+void rolling_max(const T* values, std::ptrdiff_t in_stride, std::ptrdiff_t n,
+                 int window, T* out, std::ptrdiff_t out_stride);
+// Donchian channels: upper = rolling max of high, lower = rolling min of low,
+// middle = their average. All three outputs are contiguous arrays of length n.
+template <typename T>
+void donchian_channels(const T* high, std::ptrdiff_t high_stride, const T* low, std::ptrdiff_t low_stride,
+                       std::ptrdiff_t n, int window, T* upper, T* middle, T* lower);
+
+// Cumulative wall time per kernel for profiling. Timing is off by default; while it is
+// off a ScopedKernelTimer costs one relaxed atomic load per kernel call.
+struct KernelTimerStats {
+    long long calls;
+    long long items;   // elements (rows for the CSV parser) processed
+    long long bytes;   // input bytes read
+    double seconds;
+};
+
+void set_kernel_timing(bool enabled);
+bool kernel_timing_enabled();
+void reset_kernel_timers();
+std::vector<std::pair<std::string, KernelTimerStats> > kernel_timer_snapshot();
+
+// Adds the lifetime of the object to the named kernel's totals when timing is enabled.
+// `name` must be a string literal (it is only copied when the timer records).
+class ScopedKernelTimer {
+public:
+    ScopedKernelTimer(const char* name, long long items, long long bytes);
+    ~ScopedKernelTimer();
+
+    void set_counts(long long items, long long bytes) { items_ = items; bytes_ = bytes; }
+
+private:
+    ScopedKernelTimer(const ScopedKernelTimer&);
+    ScopedKernelTimer& operator=(const ScopedKernelTimer&);
+
+    const char* name_;
+    bool active_;
+    long long items_;
+    long long bytes_;
+    std::chrono::steady_clock::time_point start_;
+};
+
+// Stateful O(1)-per-bar versions of the kernels above for live updates. Feeding a
+// series bar by bar gives exactly the same values as the full-array kernels.
+class IncrementalSMA {
+public:
+    explicit IncrementalSMA(int window);
+
+    double update(double price);
+    void update_many(const double* prices, std::ptrdiff_t in_stride, std::ptrdiff_t n,
+                     double* out, std::ptrdiff_t out_stride);
+    void reset();
+
+    int window() const { return window_; }
+    long long count() const { return count_; }
+    bool ready() const { return count_ >= window_; }
+    double value() const { return ready() ? sum_ / window_ : 0.0; }
+
+    // Raw state for serialization: the ring buffer is returned oldest value first
+    double sum() const { return sum_; }
+    std::vector<double> buffer() const;
+    void restore(long long count, double sum, const std::vector<double>& buffer);
+
+private:
+    int window_;
+    std::vector<double> ring_;
+    std::size_t head_;  // slot of the oldest value once the ring is full
+    long long count_;
+    double sum_;
+};
+
+class IncrementalEMA {
+public:
+    explicit IncrementalEMA(int window);
+
+    double update(double price);
+    void update_many(const double* prices, std::ptrdiff_t in_stride, std::ptrdiff_t n,
+                     double* out, std::ptrdiff_t out_stride);
+    void reset();
+
+    int window() const { return window_; }
+    long long count() const { return count_; }
+    bool ready() const { return count_ > 0; }
+    double value() const { return value_; }
+
+    void restore(long long count, double value);
+
+private:
+    int window_;
+    double alpha_;
+    long long count_;
+    double value_;
+};
+
+// Performance statistics of an equity curve, gathered in one pass by PerformanceAccumulator
+struct PerformanceStats {
+    long long periods;                // number of returns (equity points - 1)
+    double total_return;              // last / first equity - 1 (compounded)
+    double total_simple_return;       // sum of the per-period simple returns
+    double total_log_return;          // log(last / first equity) = sum of log returns
+    double mean_return;
+    double volatility;                // std of the returns (ddof 0) * sqrt(periods_per_year)
+    double sharpe;                    // mean excess return / std * sqrt(periods_per_year)
+    double sortino;                   // mean excess return / downside deviation * sqrt(periods_per_year)
+    double hit_rate;                  // winning periods / periods with a non-zero return
+    double max_drawdown;              // largest (peak - equity) / peak
+    long long max_drawdown_peak;      // index of the peak the largest drawdown starts from
+    long long max_drawdown_trough;    // index of its lowest point
+    long long max_drawdown_recovery;  // first index back at the peak, -1 if not recovered
+    long long max_drawdown_duration;  // bars from the peak to the recovery (or the last bar)
+};
+
+// Feed equity values (add_equity) or per-period returns (add_return, compounded from an
+// equity of 1.0); result() can be read at any point, so one accumulator serves whole
+// arrays as well as series that arrive in chunks. `risk_free_rate` is per period.
+class PerformanceAccumulator {
+public:
+    explicit PerformanceAccumulator(double risk_free_rate = 0.0);
+
+    void add_equity(double equity);
+    void add_return(double ret);
+    void add_equity_many(const double* equity, std::ptrdiff_t stride, std::ptrdiff_t n);
+    void add_returns_many(const double* returns, std::ptrdiff_t stride, std::ptrdiff_t n);
+    void reset();
+
+    double risk_free_rate() const { return risk_free_rate_; }
+    long long count() const { return count_; }
+    PerformanceStats result(double periods_per_year) const;
+
+private:
+    void record(double equity, double ret);
+
+    double risk_free_rate_;
+    long long count_;  // equity points seen
+    double first_equity_;
+    double last_equity_;
+    double peak_;
+    long long peak_index_;
+    double max_drawdown_;
+    long long drawdown_peak_;
+    long long drawdown_trough_;
+    long long drawdown_recovery_;
+    double mean_;         // Welford mean / squared deviations of the returns
+    double m2_;
+    double downside_sq_;  // sum of min(return - risk_free_rate, 0)^2
+    double simple_sum_;
+    long long wins_;
+    long long losses_;
+};
+
+// Strided (strategies x time) inputs of portfolio_equity. A row stride of 0 shares one row
+// between all strategies (e.g. the returns of a single price series).
+template <typename P>
+struct PortfolioView {
+    const double* returns;  // column i: simple return into bar i + 1 (n - 1 columns)
+    std::ptrdiff_t returns_row_stride;
+    std::ptrdiff_t returns_stride;
+    const P* positions;     // n columns, scaled by the strategy's sizing
+    std::ptrdiff_t positions_row_stride;
+    std::ptrdiff_t positions_stride;
+    const double* sizing;   // fraction of equity per unit of position, one per strategy
+    std::ptrdiff_t sizing_stride;
+};
+
+// Equity curves of n_strategies strategies over n bars in one pass. The exposure
+// positions[k][i] * sizing[k] is taken at the close of bar i and earns the return into bar
+// i + 1; every change of exposure costs `cost` per unit of equity traded (the entry at bar 0
+// included). equity[k][i] is initial_capital compounded up to and including bar i.
+// Instantiated for int8_t (crossover positions) and double (fractional) positions.
+template <typename P>
+void portfolio_equity(const PortfolioView<P>& view, std::ptrdiff_t n_strategies, std::ptrdiff_t n,
+                      double initial_capital, double cost,
+                      double* equity, std::ptrdiff_t row_stride, std::ptrdiff_t col_stride);
+
+// Columnar OHLCVT data parsed from Kraken-style CSV rows:
+// timestamp,open,high,low,close,volume[,trades]
+struct OHLCVTColumns {
+    std::vector<std::int64_t> timestamp;
+    std::vector<double> open;
+    std::vector<double> high;
+    std::vector<double> low;
+    std::vector<double> close;
+    std::vector<double> volume;
+    std::vector<std::int64_t> trades;  // 0 when the row has no trades column
+    // (1-based line number, reason) for every row that could not be parsed
+    std::vector<std::pair<long long, std::string> > malformed;
+
+    std::size_t size() const { return close.size(); }
+};
+
+// Parse the rows in [begin, end); `first_line` is the line number of the first row.
+// A non-numeric first line is treated as a header and skipped; empty lines are ignored.
+void parse_ohlcvt_csv(const char* begin, const char* end, long long first_line, OHLCVTColumns& columns);
+OHLCVTColumns load_ohlcvt_csv(const std::string& path);
+
+// Strided input columns for resample_ohlcvt. Trades or ticks can be passed with the price
+// as open/high/low/close and trades == nullptr, in which case every row counts as one trade.
+struct OHLCVTView {
+    const std::int64_t* timestamp;
+    std::ptrdiff_t timestamp_stride;
+    const double* open;
+    std::ptrdiff_t open_stride;
+    const double* high;
+    std::ptrdiff_t high_stride;
+    const double* low;
+    std::ptrdiff_t low_stride;
+    const double* close;
+    std::ptrdiff_t close_stride;
+    const double* volume;
+    std::ptrdiff_t volume_stride;
+    const std::int64_t* trades;
+    std::ptrdiff_t trades_stride;
+};
+
+// Aggregate n rows with ascending timestamps (seconds) into bars of every interval in one
+// pass: out[k] gets one bar per non-empty bucket [t, t + intervals[k]), stamped with the
+// bucket start. Throws std::invalid_argument for unsorted timestamps or intervals <= 0.
+void resample_ohlcvt(const OHLCVTView& input, std::ptrdiff_t n, const std::vector<std::int64_t>& intervals,
+                     std::vector<OHLCVTColumns>& out);
@@ -2,6 +2,9 @@ import numpy as np
 #implement a simple moving average indicator
 #import function from loadata.py (create_close_price_numpy_array)
 
+import data_cache
+import indicator_cache
+import instrument
 import load_data
 
 
@@ -22,14 +25,132 @@ def exponential_moving_average(data, window_size):
         ema[i] = alpha * data[i] + (1 - alpha) * ema[i - 1]
     return ema
 
-#import close prices here to have them returned
-def import_close_prices(file_path):
+#reference versions of the C++ rolling_min / rolling_max / donchian_channels.
+#O(n*w), so only for checking the native kernels; zero-padded like the C++ SMA
+def rolling_min(data, window_size):
+    data = np.asarray(data, dtype=float)
+    out = np.zeros_like(data)
+    if window_size <= len(data):
+        out[window_size - 1:] = np.lib.stride_tricks.sliding_window_view(data, window_size).min(axis=1)
+    return out
+
+def rolling_max(data, window_size):
+    data = np.asarray(data, dtype=float)
+    out = np.zeros_like(data)
+    if window_size <= len(data):
+        out[window_size - 1:] = np.lib.stride_tricks.sliding_window_view(data, window_size).max(axis=1)
+    return out
+
+def donchian_channels(high, low, window_size):
+    upper = rolling_max(high, window_size)
+    lower = rolling_min(low, window_size)
+    return upper, (upper + lower) / 2, lower
+
+#reference versions of the C++ rolling_variance / rolling_std / rolling_zscore / bollinger_bands,
+#built from np.var on sliding windows (O(n*w)); zero-padded like the C++ SMA
+def rolling_variance(data, window_size, ddof=0):
+    data = np.asarray(data, dtype=float)
+    out = np.zeros_like(data)
+    if window_size <= len(data):
+        out[window_size - 1:] = np.lib.stride_tricks.sliding_window_view(data, window_size).var(axis=1, ddof=ddof)
+    return out
+
+def rolling_std(data, window_size, ddof=0):
+    return np.sqrt(rolling_variance(data, window_size, ddof))
+
+def rolling_zscore(data, window_size, ddof=0):
+    data = np.asarray(data, dtype=float)
+    std = rolling_std(data, window_size, ddof)
+    out = np.zeros_like(data)
+    if window_size <= len(data):
+        mean = np.convolve(data, np.ones(window_size) / window_size, mode='valid')
+        tail = std[window_size - 1:]
+        np.divide(data[window_size - 1:] - mean, tail, out=out[window_size - 1:], where=tail > 0)
+    return out
+
+def bollinger_bands(data, window_size, num_std=2.0, ddof=0):
+    data = np.asarray(data, dtype=float)
+    middle = np.zeros_like(data)
+    if window_size <= len(data):
+        middle[window_size - 1:] = simple_moving_average(data, window_size)
+    width = num_std * rolling_std(data, window_size, ddof)
+    upper = middle + width
+    lower = middle - width
+    upper[:window_size - 1] = lower[:window_size - 1] = 0.0
+    return upper, middle, lower
+
+#reference versions of the C++ OHLCV indicators (relative_strength_index, macd,
+#average_true_range, volume_weighted_average_price, on_balance_volume)
+def relative_strength_index(close, window_size=14):
+    close = np.asarray(close, dtype=float)
+    rsi = np.zeros_like(close)
+    changes = np.diff(close)
+    if len(changes) < window_size:
+        return rsi
+    gains = np.maximum(changes, 0.0)
+    losses = np.maximum(-changes, 0.0)
+    avg_gain = gains[:window_size].mean()
+    avg_loss = losses[:window_size].mean()
+    for i in range(window_size, len(close)):
+        if i > window_size:
+            # Wilder smoothing
+            avg_gain = (avg_gain * (window_size - 1) + gains[i - 1]) / window_size
+            avg_loss = (avg_loss * (window_size - 1) + losses[i - 1]) / window_size
+        if avg_loss == 0:
+            rsi[i] = 50.0 if avg_gain == 0 else 100.0
+        else:
+            rsi[i] = 100 - 100 / (1 + avg_gain / avg_loss)
+    return rsi
+
+def macd(close, fast=12, slow=26, signal=9):
+    line = exponential_moving_average(close, fast) - exponential_moving_average(close, slow)
+    signal_line = exponential_moving_average(line, signal)
+    return line, signal_line, line - signal_line
+
+def average_true_range(high, low, close, window_size=14):
+    high, low, close = (np.asarray(a, dtype=float) for a in (high, low, close))
+    true_range = high - low
+    prev_close = close[:-1]
+    true_range[1:] = np.maximum(true_range[1:], np.maximum(np.abs(high[1:] - prev_close), np.abs(low[1:] - prev_close)))
+    atr = np.zeros_like(close)
+    if len(close) < window_size:
+        return atr
+    atr[window_size - 1] = true_range[:window_size].mean()
+    for i in range(window_size, len(close)):
+        atr[i] = (atr[i - 1] * (window_size - 1) + true_range[i]) / window_size
+    return atr
+
+def volume_weighted_average_price(high, low, close, volume, window_size=0):
+    typical = (np.asarray(high, dtype=float) + low + close) / 3
+    volume = np.asarray(volume, dtype=float)
+    price_volume = np.cumsum(typical * volume)
+    total_volume = np.cumsum(volume)
+    if window_size > 0:
+        price_volume[window_size:] -= price_volume[:-window_size].copy()
+        total_volume[window_size:] -= total_volume[:-window_size].copy()
+    vwap = np.zeros_like(typical)
+    np.divide(price_volume, total_volume, out=vwap, where=total_volume > 0)
+    if window_size > 0:
+        vwap[:window_size - 1] = 0.0
+    return vwap
+
+def on_balance_volume(close, volume):
+    direction = np.sign(np.diff(np.asarray(close, dtype=float)))
+    obv = np.zeros(len(close))
+    obv[1:] = np.cumsum(direction * np.asarray(volume, dtype=float)[1:])
+    return obv
 
-    load_data.create_close_price_array(file_path)
-    
-    #read numpy array from npy file
-    close_prices = np.load('./close_prices.npy')
+#import close prices here to have them returned
+def import_close_prices(file_path, timeframe=None):
+    #parsed once per source file and memory-mapped from the shared cache (see data_cache.py),
+    #so concurrent jobs no longer race on a single ./close_prices.npy
+    #timeframe ('1h', '1d', ...) resamples the bars first, e.g. 1-minute data to hourly
+    close_prices = data_cache.load_columns(file_path, timeframe=timeframe)['close']
     return close_prices
+
+def import_ohlcv(file_path, timeframe=None):
+    #all OHLCVT columns (timestamp, open, high, low, close, volume, trades) for the OHLCV indicators
+    return data_cache.load_columns(file_path, timeframe=timeframe)
    
 
 
@@ -53,13 +174,40 @@ def plot_close_prices_vs_ema(close_prices, ema):
 fast = 10
 slow = 100
 
-def run_indicators(file_path, fast, slow):
-    close_prices = import_close_prices(file_path) #needs to be chnaged to variable path for cli tool
-    sma_fast= simple_moving_average(close_prices, fast) #sma_fast/slow, ema_fast/slow functions need to be imported into strategy.py
-    sma_slow= simple_moving_average(close_prices, slow)
-    ema_fast= exponential_moving_average(close_prices, fast)
-    ema_slow= exponential_moving_average(close_prices, slow)
-
+#an EMA started this many windows before a range has forgotten its seed: the seed's
+#weight (1 - alpha)^bars is below e^-20 by then
+EMA_WARMUP_WINDOWS = 10
+
+def warmup_bars(ma_type, window):
+    #bars before a range start that the moving average needs to match its full-history value
+    if ma_type == 'sma':
+        return window - 1
+    return EMA_WARMUP_WINDOWS * window
+
+def run_indicators(file_path, fast, slow, timeframe=None, start=None, end=None):
+    #start/end ('2024-01-01', epoch seconds, '-180d' for the last 180 days, ...) limit the run to
+    #start <= timestamp < end; the bars are binary-searched views of the cached columns, and the
+    #moving averages are computed from enough earlier bars to be warmed up at the range start
+    with instrument.stage('load') as stage:
+        columns = import_ohlcv(file_path, timeframe)
+        warmup = max(warmup_bars(ma_type, window) for ma_type in ('sma', 'ema') for window in (fast, slow))
+        columns, first = load_data.select_range(columns, start, end, warmup)
+        close_prices = columns['close']
+        stage.add(*instrument.array_counts(close_prices))
+    with instrument.stage('indicators', *instrument.array_counts(close_prices)):
+        #same series and window as an earlier call -> served from the indicator cache (read-only arrays)
+        key = indicator_cache.fingerprint(close_prices)
+        sma_fast= indicator_cache.cached_call(simple_moving_average, close_prices, fast, key=key) #sma_fast/slow, ema_fast/slow functions need to be imported into strategy.py
+        sma_slow= indicator_cache.cached_call(simple_moving_average, close_prices, slow, key=key)
+        ema_fast= indicator_cache.cached_call(exponential_moving_average, close_prices, fast, key=key)
+        ema_slow= indicator_cache.cached_call(exponential_moving_average, close_prices, slow, key=key)
+
+    #drop the warm-up bars (the SMA has no value for its first window-1 bars); without any,
+    #the cached arrays are returned as they are
+    if first:
+        sma_fast = sma_fast[max(first - (fast - 1), 0):]
+        sma_slow = sma_slow[max(first - (slow - 1), 0):]
+        close_prices, ema_fast, ema_slow = close_prices[first:], ema_fast[first:], ema_slow[first:]
     return close_prices, sma_fast, sma_slow, ema_fast, ema_slow
 
 if __name__ == "__main__":
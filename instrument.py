@@ -0,0 +1,169 @@
+import functools
+import json
+import os
+import threading
+import time
+
+#per-stage timers and counters for the backtest pipeline.
+#  with instrument.stage('signals', rows=len(prices)) as s: ...   time a block
+#  @instrument.timed('load')                                      time every call
+#stages are recorded only while instrumentation is enabled (enable() or
+#INDICATOR_INSTRUMENT=1); otherwise stage() hands back a shared no-op object, so
+#instrumented code pays one flag check per stage. enable() also switches on the
+#C++ kernel timers, which are reported next to the Python stages.
+
+_enabled = os.environ.get('INDICATOR_INSTRUMENT', '') not in ('', '0')
+_lock = threading.Lock()
+_events = []
+_origin = time.perf_counter()
+
+class _NullStage:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def add(self, rows=0, nbytes=0):
+        pass
+
+_NULL_STAGE = _NullStage()
+
+class Stage:
+    """One timed block; `add` accumulates rows/bytes processed inside it"""
+
+    def __init__(self, name, rows=0, nbytes=0):
+        self.name = name
+        self.rows = rows
+        self.nbytes = nbytes
+        self.start = None
+        self.seconds = None
+
+    def add(self, rows=0, nbytes=0):
+        self.rows += rows
+        self.nbytes += nbytes
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.seconds = time.perf_counter() - self.start
+        with _lock:
+            _events.append((self.name, self.start - _origin, self.seconds, self.rows, self.nbytes,
+                            threading.get_ident()))
+        return False
+
+def _engine():
+    try:
+        import indicator_engine
+    except ImportError:
+        return None
+    return indicator_engine
+
+def enable(kernels=True):
+    global _enabled
+    _enabled = True
+    engine = _engine() if kernels else None
+    if engine is not None:
+        engine.set_kernel_timing(True)
+
+def disable():
+    global _enabled
+    _enabled = False
+    engine = _engine()
+    if engine is not None:
+        engine.set_kernel_timing(False)
+
+def is_enabled():
+    return _enabled
+
+def reset():
+    """Forget recorded stages and kernel totals"""
+    global _origin
+    with _lock:
+        del _events[:]
+        _origin = time.perf_counter()
+    engine = _engine()
+    if engine is not None:
+        engine.reset_kernel_timers()
+
+def stage(name, rows=0, nbytes=0):
+    """Context manager timing a pipeline stage; rows/nbytes can also be added inside it"""
+    if not _enabled:
+        return _NULL_STAGE
+    return Stage(name, rows, nbytes)
+
+def timed(name=None):
+    """Decorator form of stage(); the stage is named after the function by default"""
+    def decorate(func):
+        stage_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with Stage(stage_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+def array_counts(*arrays):
+    """(rows, bytes) of the given arrays, for stage(..., rows=, nbytes=)"""
+    return max((len(a) for a in arrays), default=0), sum(getattr(a, 'nbytes', 0) for a in arrays)
+
+def summary():
+    """{'stages': {name: totals}, 'kernels': {name: totals}} in first-seen order"""
+    with _lock:
+        events = list(_events)
+    stages = {}
+    for name, _, seconds, rows, nbytes, _ in events:
+        totals = stages.setdefault(name, {'calls': 0, 'seconds': 0.0, 'rows': 0, 'bytes': 0})
+        totals['calls'] += 1
+        totals['seconds'] += seconds
+        totals['rows'] += rows
+        totals['bytes'] += nbytes
+    engine = _engine()
+    kernels = engine.kernel_timers() if engine is not None else {}
+    return {'stages': stages, 'kernels': kernels}
+
+def _format_rows(title, totals, count_field):
+    lines = [f"{title:<36} {'Calls':>7} {'Total (ms)':>12} {'Mean (ms)':>11} {count_field.title():>12} {'MB/s':>10}"]
+    lines.append('-' * len(lines[0]))
+    for name, t in totals.items():
+        mb_per_s = t['bytes'] / t['seconds'] / 1e6 if t['seconds'] > 0 and t['bytes'] else 0.0
+        lines.append(f"{name:<36} {t['calls']:>7} {t['seconds']*1000:>12.3f} {t['seconds']*1000/t['calls']:>11.3f} "
+                     f"{t[count_field]:>12,} {mb_per_s:>10.1f}")
+    return lines
+
+def report():
+    """Text table of the stage and kernel totals"""
+    totals = summary()
+    lines = _format_rows('Stage', totals['stages'], 'rows')
+    if totals['kernels']:
+        lines.append("")
+        lines.extend(_format_rows('C++ kernel', totals['kernels'], 'items'))
+    return "\n".join(lines)
+
+def dump_report(path):
+    with open(path, 'w') as file:
+        json.dump(summary(), file, indent=2)
+
+def dump_trace(path):
+    """
+    Write the recorded stages as a Chrome trace (chrome://tracing, Perfetto).
+    Kernel timers are totals rather than individual calls, so they go into otherData.
+    """
+    with _lock:
+        events = list(_events)
+    pid = os.getpid()
+    trace_events = [{
+        'name': name, 'ph': 'X', 'pid': pid, 'tid': tid,
+        'ts': start * 1e6, 'dur': seconds * 1e6,
+        'args': {'rows': rows, 'bytes': nbytes},
+    } for name, start, seconds, rows, nbytes, tid in events]
+    with open(path, 'w') as file:
+        json.dump({'traceEvents': trace_events, 'otherData': {'kernels': summary()['kernels']}}, file)
+
+if _enabled:
+    enable()
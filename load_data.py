@@ -1,6 +1,36 @@
-import csv
 import numpy as np
 import os
+import warnings
+
+OHLCVT_COLUMNS = ('timestamp', 'open', 'high', 'low', 'close', 'volume', 'trades')
+
+def load_ohlcvt(file_path, strict=False):
+    """
+    Parse a timestamp,open,high,low,close,volume[,trades] CSV with the native loader.
+
+    Returns (columns, malformed): a dict of contiguous arrays keyed by OHLCVT_COLUMNS
+    (int64 timestamp/trades, float64 prices/volume) and a list of (line_number, reason)
+    for rows that could not be parsed. A header line and blank lines are skipped.
+    With strict=True any malformed row raises ValueError instead.
+    """
+    import indicator_engine
+
+    if not os.path.isfile(file_path):
+        raise FileNotFoundError(f"No such file: {file_path}")
+    columns, malformed = indicator_engine.load_ohlcvt_csv(os.fspath(file_path))
+    if malformed and strict:
+        line, reason = malformed[0]
+        raise ValueError(f"{file_path}: {len(malformed)} malformed rows (first at line {line}: {reason})")
+    return columns, malformed
+
+def warn_malformed_rows(file_path, malformed, limit=5, total=None):
+    total = len(malformed) if total is None else total
+    if not total:
+        return
+    shown = malformed[:limit]
+    details = ", ".join(f"line {line}: {reason}" for line, reason in shown)
+    more = f" (+{total - len(shown)} more)" if total > len(shown) else ""
+    warnings.warn(f"{file_path}: skipped {total} malformed rows - {details}{more}", stacklevel=3)
 
 def create_close_price_array(file_path):
     """
@@ -8,27 +38,132 @@ def create_close_price_array(file_path):
     save './close_prices.npy' and return the numpy array.
 
     This version does NOT append to an existing CSV file; it builds the array in memory
-    and overwrites the .npy file each time so runs are deterministic.
-    """
-    close_prices = []
-    with open(file_path, 'r', newline='') as file:
-        reader = csv.reader(file)
-        for row in reader:
-            if not row:
-                continue
-            # guard against short rows or headers
-            try:
-                val = float(row[4])
-            except (IndexError, ValueError):
-                # skip headers or malformed rows
-                continue
-            close_prices.append(val)
-
-    close_prices = np.array(close_prices, dtype=float)
+    and overwrites the .npy file each time so runs are deterministic. Rows that cannot
+    be parsed are reported with a warning (see load_ohlcvt).
+    """
+    columns, malformed = load_ohlcvt(file_path)
+    warn_malformed_rows(file_path, malformed)
+    close_prices = columns['close']
     # Save the array to .npy so other parts of the code that expect the file still work
     np.save('./close_prices.npy', close_prices)
     return close_prices
 
+# a bare number is minutes, as in Kraken's <PAIR>_<minutes>.csv file names
+TIMEFRAME_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 7 * 86400}
+
+def parse_timeframe(timeframe):
+    """'15m', '1h', '1d', '30s' or '1440' (minutes) -> seconds"""
+    text = str(timeframe).strip().lower()
+    unit = text[-1:] if text[-1:] in TIMEFRAME_UNITS else 'm'
+    number = text[:-1] if text[-1:] in TIMEFRAME_UNITS else text
+    try:
+        seconds = int(number) * TIMEFRAME_UNITS[unit]
+    except ValueError:
+        seconds = 0
+    if seconds <= 0:
+        raise ValueError(f"Invalid timeframe: {timeframe!r} (use e.g. 15m, 1h, 1d or minutes)")
+    return seconds
+
+def parse_time(value, timestamps=None):
+    """
+    Epoch seconds of a range bound: a number (epoch seconds), an ISO date or datetime
+    ('2024-01-31', '2024-01-31T12:00', UTC), a datetime / np.datetime64, or a duration
+    before the last bar of `timestamps` ('-180d', '-26w', units as in parse_timeframe).
+    """
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        return int(value)
+    text = str(value).strip()
+    # epoch seconds given as text (e.g. from the command line), not an ISO year
+    digits = text[1:] if text.startswith('+') else text
+    if digits.isdigit():
+        return int(digits)
+    if text.startswith('-'):
+        if timestamps is None or not len(timestamps):
+            raise ValueError(f"Relative time {value!r} needs the bar timestamps")
+        return int(timestamps[-1]) - parse_timeframe(text[1:])
+    try:
+        return int(np.datetime64(text if isinstance(value, str) else value, 's').astype(np.int64))
+    except ValueError:
+        raise ValueError(f"Invalid time: {value!r} (use epoch seconds, YYYY-MM-DD[THH:MM[:SS]] or e.g. -180d)")
+
+def time_range(timestamps, start=None, end=None):
+    """
+    (lo, hi) indices of the bars with start <= timestamp < end, found by binary search
+    over the ascending timestamps. Either bound may be None (open) or anything parse_time
+    accepts.
+    """
+    lo = 0 if start is None else int(np.searchsorted(timestamps, parse_time(start, timestamps), side='left'))
+    hi = len(timestamps) if end is None else int(np.searchsorted(timestamps, parse_time(end, timestamps), side='left'))
+    return lo, max(lo, hi)
+
+def select_range(columns, start=None, end=None, warmup=0):
+    """
+    Zero-copy views of OHLCVT columns (as returned by load_ohlcvt or data_cache.load_columns)
+    limited to [start, end), extended by up to `warmup` earlier bars so that indicators
+    can be primed before the range begins.
+
+    Returns (views, first): the column views and the index of the first in-range bar in
+    them (the number of warm-up bars that were available). A range without any bars
+    raises ValueError.
+    """
+    lo, hi = time_range(columns['timestamp'], start, end)
+    if lo == hi and (start is not None or end is not None):
+        raise ValueError(f"No bars between start={start!r} and end={end!r}")
+    begin = max(lo - warmup, 0)
+    return {name: values[begin:hi] for name, values in columns.items()}, lo - begin
+
+def resample_columns(columns, timeframes):
+    """
+    Resample OHLCVT columns (as returned by load_ohlcvt) to every timeframe in one
+    native pass. Returns {timeframe: columns} keyed by the timeframes as given.
+    """
+    import indicator_engine
+
+    seconds = [parse_timeframe(timeframe) for timeframe in timeframes]
+    bars = indicator_engine.resample_ohlcvt(columns['timestamp'], columns['open'], columns['high'],
+                                            columns['low'], columns['close'], columns['volume'],
+                                            sorted(set(seconds)), trades=columns['trades'])
+    return {timeframe: bars[interval] for timeframe, interval in zip(timeframes, seconds)}
+
+def iter_ohlcvt_chunks(file_path, chunk_bytes=1 << 26, malformed=None):
+    """
+    Parse a CSV in pieces of about `chunk_bytes`, yielding one columns dict (as in
+    load_ohlcvt) per piece, so files larger than memory can be processed in order.
+    Only whole lines are parsed: the partial line at the end of each read is
+    carried into the next one. Malformed rows are appended to `malformed` if given.
+    """
+    import indicator_engine
+
+    if chunk_bytes <= 0:
+        raise ValueError("chunk_bytes must be positive")
+    line_number = 1
+    tail = b''
+    with open(file_path, 'rb') as file:
+        while True:
+            block = file.read(chunk_bytes)
+            data = tail + block if tail else block
+            if block:
+                cut = data.rfind(b'\n') + 1
+                data, tail = data[:cut], data[cut:]
+            if data:
+                columns, bad_rows = indicator_engine.parse_ohlcvt_csv(data, line_number)
+                line_number += data.count(b'\n')
+                if malformed is not None:
+                    malformed.extend(bad_rows)
+                if len(columns['close']):
+                    yield columns
+            if not block:
+                return
+
+def iter_npy_chunks(file_path, chunk_rows=1 << 23):
+    """Yield a 1-D .npy array (e.g. ./close_prices.npy) in float64 pieces of `chunk_rows` values"""
+    values = np.load(file_path, mmap_mode='r')
+    if values.ndim != 1:
+        raise ValueError(f"{file_path}: expected a 1-D array, got shape {values.shape}")
+    for start in range(0, len(values), chunk_rows):
+        # copied out of the memory map so only one piece is resident at a time
+        yield np.array(values[start:start + chunk_rows], dtype=np.float64)
+
 # keep this helper if you need to create a numpy array directly from a csv file
 def create_close_price_numpy_array(file_path):
     close_prices = np.loadtxt(file_path, delimiter=',')
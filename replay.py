@@ -0,0 +1,338 @@
+import asyncio
+import os
+import time
+
+import numpy as np
+
+import data_cache
+import instrument
+import strategy
+import streaming
+
+#bar replay through the live signal path: every symbol stream feeds its bars one at a time
+#into stateful SMA/EMA updates (IncrementalSMA / IncrementalEMA) and crossover detection,
+#the way a live feed would, and position changes are emitted as they happen.
+#two transports, both on one asyncio event loop:
+#  direct   one feed task per symbol puts bars on a shared queue drained by the strategy task
+#  socket   a local TCP server stands in for the market feed and multiplexes every symbol
+#           over one connection as fixed-size binary frames
+#each bar is stamped when the feed releases it and its latency is taken once its position
+#change (if any) has been emitted, so queueing behind other symbols' bars is included; the
+#service time is the signal path alone (indicator updates, crossover, emit) for the bar.
+#with speed=None the feeds run flat out and the latency shows the saturated queue; pass a
+#bar rate to measure the per-bar budget under a realistic arrival pattern
+
+# columns of the report returned by run_replay
+REPLAY_FIELDS = ['transport', 'streams', 'bars', 'position_changes', 'seconds', 'bars_per_second',
+                 'latency_mean_us', 'latency_p50_us', 'latency_p90_us', 'latency_p99_us',
+                 'latency_p999_us', 'latency_max_us', 'service_p50_us', 'service_p99_us', 'service_max_us',
+                 'budget_us', 'over_budget']
+
+# wire format of the socket stand-in: symbol index, feed send time (perf_counter_ns), close
+FRAME = np.dtype([('symbol', '<u4'), ('sent_ns', '<i8'), ('close', '<f8')])
+
+class LatencyHistogram:
+    """
+    Log-linear histogram of nanosecond latencies: exact below 32 ns, then 16 buckets
+    per power of two, so percentiles are within 6.25% at constant memory
+    """
+
+    def __init__(self):
+        self.counts = [0] * (60 * 16)
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def record(self, ns):
+        ns = max(int(ns), 0)
+        shift = max(ns.bit_length() - 5, 0)
+        self.counts[(shift << 4) + (ns >> shift)] += 1
+        self.count += 1
+        self.total += ns
+        if ns > self.max:
+            self.max = ns
+
+    @staticmethod
+    def bucket_upper(index):
+        # inverse of record's index: mantissa m in [16, 32) scaled by 2**shift
+        if index < 32:
+            return index
+        shift = index // 16 - 1
+        return ((index - shift * 16 + 1) << shift) - 1
+
+    def percentile(self, q):
+        """Upper edge of the bucket holding the q-th percentile, in nanoseconds (0 if empty)"""
+        if not self.count:
+            return 0
+        rank = max(int(np.ceil(q / 100.0 * self.count)), 1)
+        index = int(np.searchsorted(np.cumsum(self.counts), rank))
+        return min(self.bucket_upper(index), self.max)
+
+    def fraction_above(self, ns):
+        """Share of latencies that may exceed `ns` (every bucket reaching above it counts)"""
+        if not self.count or ns >= self.max:
+            return 0.0
+        return sum(c for k, c in enumerate(self.counts) if c and self.bucket_upper(k) > ns) / self.count
+
+    def summary(self, prefix='latency'):
+        """Mean, p50/p90/p99/p99.9 and max in microseconds"""
+        return {
+            f'{prefix}_mean_us': self.total / self.count / 1e3 if self.count else 0.0,
+            f'{prefix}_p50_us': self.percentile(50) / 1e3,
+            f'{prefix}_p90_us': self.percentile(90) / 1e3,
+            f'{prefix}_p99_us': self.percentile(99) / 1e3,
+            f'{prefix}_p999_us': self.percentile(99.9) / 1e3,
+            f'{prefix}_max_us': self.max / 1e3,
+        }
+
+class CrossoverState:
+    """Per-bar form of strategy.crossover_signals + backtest.compute_positions_array"""
+
+    __slots__ = ('fast_ma', 'slow_ma', 'warmup', 'bars', 'above', 'below', 'position', 'signals')
+
+    def __init__(self, ma_type, fast, slow):
+        if ma_type not in streaming.INCREMENTAL_INDICATORS:
+            raise ValueError("Invalid moving average type. Use 'sma' or 'ema'.")
+        self.fast_ma = streaming.INCREMENTAL_INDICATORS[ma_type](fast)
+        self.slow_ma = streaming.INCREMENTAL_INDICATORS[ma_type](slow)
+        self.warmup = strategy.crossover_warmup(ma_type, slow)
+        self.bars = 0
+        self.above = self.below = False
+        self.position = 0
+        self.signals = 0
+
+    def update(self, close):
+        """Feed one close; returns the new position if this bar changed it, else None"""
+        fast = self.fast_ma.update(close)
+        slow = self.slow_ma.update(close)
+        above, below = fast > slow, fast < slow
+        signal = 0
+        if self.bars >= self.warmup:
+            if above and not self.above:
+                signal = 1
+            elif below and not self.below:
+                signal = -1
+        self.above, self.below = above, below
+        self.bars += 1
+        if signal:
+            self.signals += 1
+            if signal != self.position:
+                self.position = signal
+                return signal
+        return None
+
+class ReplayEngine:
+    """
+    Crossover state of every symbol stream and the shared latency and service time histograms.
+
+    on_change(symbol, ma_type, bar, position, close) is called for every position
+    change, inside the measured latency.
+    """
+
+    def __init__(self, fast, slow, ma_types=('sma', 'ema'), on_change=None):
+        if fast >= slow:
+            raise ValueError("fast window must be smaller than slow window")
+        self.fast, self.slow, self.ma_types = fast, slow, tuple(ma_types)
+        self.on_change = on_change
+        self.symbols = {}
+        self.latency = LatencyHistogram()
+        self.service = LatencyHistogram()
+        self.bars = 0
+        self.position_changes = 0
+
+    def add_symbol(self, symbol):
+        states = [(ma_type, CrossoverState(ma_type, self.fast, self.slow)) for ma_type in self.ma_types]
+        self.symbols[symbol] = states
+        return symbol, states
+
+    def on_bar(self, stream, close, sent_ns):
+        """Run one bar of one stream (as returned by add_symbol) and record its latency"""
+        started = time.perf_counter_ns()
+        symbol, states = stream
+        for ma_type, state in states:
+            position = state.update(close)
+            if position is not None:
+                self.position_changes += 1
+                if self.on_change is not None:
+                    self.on_change(symbol, ma_type, state.bars - 1, position, close)
+        self.bars += 1
+        done = time.perf_counter_ns()
+        self.service.record(done - started)
+        self.latency.record(done - sent_ns)
+
+    def positions(self):
+        """{symbol: {ma_type: current position}}"""
+        return {symbol: {ma_type: state.position for ma_type, state in states}
+                for symbol, states in self.symbols.items()}
+
+def load_close(file_path, max_bars=None):
+    """Close prices of a CSV (through the data cache) or a memory-mapped 1-D .npy file"""
+    if os.path.splitext(os.fspath(file_path))[1].lower() == '.npy':
+        close = np.load(file_path, mmap_mode='r')
+    else:
+        close = data_cache.load_columns(file_path)['close']
+    return close[:max_bars] if max_bars is not None else close
+
+def replicate(file_path, streams):
+    """{symbol: path} replaying one file as `streams` independent symbol streams"""
+    stem = os.path.splitext(os.path.basename(os.fspath(file_path)))[0]
+    return {f"{stem}#{k}": file_path for k in range(streams)}
+
+def _resolve_sources(sources, max_bars):
+    # every distinct file is loaded once, however many streams replay it
+    loaded = {}
+    for path in set(sources.values()):
+        loaded[path] = np.asarray(load_close(path, max_bars), dtype=np.float64)
+    return [(symbol, loaded[path]) for symbol, path in sources.items()]
+
+async def _pace(loop, start, k, speed):
+    if speed:
+        delay = start + k / speed - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+    else:
+        await asyncio.sleep(0)
+
+async def _feed(queue, stream, close, speed, start):
+    loop = asyncio.get_running_loop()
+    for k, price in enumerate(close.tolist()):
+        await _pace(loop, start, k, speed)
+        queue.put_nowait((stream, price, time.perf_counter_ns()))
+
+async def _drain(queue, engine):
+    # bars already queued are handled without going back to the event loop
+    on_bar = engine.on_bar
+    while True:
+        item = await queue.get()
+        while item is not None:
+            on_bar(*item)
+            try:
+                item = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                break
+        if item is None:
+            return
+
+async def replay_direct(engine, series, speed=None, stagger=False):
+    """
+    One feed task per (symbol, close array) in `series`, all drained by one strategy task.
+    Every stream releases bar k at the same moment unless `stagger` spreads the streams
+    evenly over one bar interval.
+    """
+    queue = asyncio.Queue()
+    start = asyncio.get_running_loop().time()
+    phase = 1.0 / (speed * len(series)) if stagger and speed and series else 0.0
+    consumer = asyncio.ensure_future(_drain(queue, engine))
+    await asyncio.gather(*(_feed(queue, engine.add_symbol(symbol), close, speed, start + s * phase)
+                           for s, (symbol, close) in enumerate(series)))
+    queue.put_nowait(None)
+    await consumer
+
+async def serve_bars(series, speed=None, host='127.0.0.1', port=0):
+    """
+    Local stand-in for a market feed: every connection gets all symbols' bars as FRAME
+    records, bar k of every symbol together, at `speed` bars per second (None: flat out).
+    Symbols are numbered in the order of `series`.
+    """
+    lengths = [len(close) for _, close in series]
+    order = np.argsort(lengths, kind='stable')[::-1]
+    # symbols sorted by length, so the ones still running at bar k are a prefix
+    matrix = np.zeros((len(series), max(lengths, default=0)))
+    for row, s in enumerate(order):
+        matrix[row, :lengths[s]] = series[s][1]
+    remaining = np.sort(lengths)[::-1]
+
+    async def stream_bars(reader, writer):
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        frames = np.empty(len(series), dtype=FRAME)
+        frames['symbol'] = order
+        try:
+            for k in range(matrix.shape[1]):
+                await _pace(loop, start, k, speed)
+                active = int(np.count_nonzero(remaining > k))
+                frames['close'][:active] = matrix[:active, k]
+                frames['sent_ns'][:active] = time.perf_counter_ns()
+                writer.write(frames[:active].tobytes())
+                await writer.drain()
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(stream_bars, host, port)
+
+async def replay_socket(engine, series, speed=None, stagger=False):
+    """Replay `series` through serve_bars and a client reading the frames back (no stagger)"""
+    streams = [engine.add_symbol(symbol) for symbol, _ in series]
+    server = await serve_bars(series, speed)
+    host, port = server.sockets[0].getsockname()[:2]
+    async with server:
+        reader, writer = await asyncio.open_connection(host, port)
+        on_bar, pending = engine.on_bar, b''
+        while True:
+            data = await reader.read(1 << 16)
+            if not data:
+                break
+            pending += data
+            usable = len(pending) - len(pending) % FRAME.itemsize
+            for symbol, sent_ns, close in np.frombuffer(pending[:usable], dtype=FRAME).tolist():
+                on_bar(streams[symbol], close, sent_ns)
+            pending = pending[usable:]
+        writer.close()
+
+TRANSPORTS = {'direct': replay_direct, 'socket': replay_socket}
+
+def run_replay(sources, fast, slow, ma_types=('sma', 'ema'), speed=None, transport='direct',
+               stagger=False, max_bars=None, budget_us=1000.0, on_change=None, engine=None):
+    """
+    Replay every {symbol: CSV or .npy path} in `sources` concurrently and return a report
+    dict (keys in REPLAY_FIELDS) with throughput and per-bar latency percentiles.
+    `speed` is in bars per second per stream; pass an engine to keep the final positions.
+    over_budget is the share of bars whose end-to-end latency may exceed budget_us.
+    """
+    if transport not in TRANSPORTS:
+        raise ValueError("transport must be 'direct' or 'socket'")
+    series = _resolve_sources(sources, max_bars)
+    engine = engine or ReplayEngine(fast, slow, ma_types, on_change)
+    with instrument.stage('replay', sum(len(close) for _, close in series)):
+        started = time.perf_counter()
+        asyncio.run(TRANSPORTS[transport](engine, series, speed, stagger))
+        seconds = time.perf_counter() - started
+    report = {'transport': transport, 'streams': len(series), 'bars': engine.bars,
+              'position_changes': engine.position_changes, 'seconds': seconds,
+              'bars_per_second': engine.bars / seconds if seconds > 0 else 0.0}
+    report.update(engine.latency.summary())
+    report.update(engine.service.summary('service'))
+    report['budget_us'] = budget_us
+    report['over_budget'] = engine.latency.fraction_above(budget_us * 1e3)
+    return report
+
+def format_replay_report(report):
+    lines = [f"Replayed {report['bars']} bars from {report['streams']} streams ({report['transport']}) "
+             f"in {report['seconds']:.3f} s: {report['bars_per_second']:,.0f} bars/s, "
+             f"{report['position_changes']} position changes",
+             f"Per-bar latency (us): mean {report['latency_mean_us']:.1f}, p50 {report['latency_p50_us']:.1f}, "
+             f"p90 {report['latency_p90_us']:.1f}, p99 {report['latency_p99_us']:.1f}, "
+             f"p99.9 {report['latency_p999_us']:.1f}, max {report['latency_max_us']:.1f}",
+             f"Signal path service time (us): p50 {report['service_p50_us']:.1f}, "
+             f"p99 {report['service_p99_us']:.1f}, max {report['service_max_us']:.1f}",
+             f"Over the {report['budget_us']:.0f} us budget: {report['over_budget']:.3%} of bars"]
+    return "\n".join(lines)
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description='Replay bars through the incremental crossover signal path.')
+    parser.add_argument('path', help='CSV or 1-D close price .npy file to replay')
+    parser.add_argument('fast', type=int, help='Fast moving average window')
+    parser.add_argument('slow', type=int, help='Slow moving average window')
+    parser.add_argument('--streams', type=int, default=1, help='Concurrent symbol streams replaying the file')
+    parser.add_argument('--speed', type=float, default=None, help='Bars per second per stream (default: flat out)')
+    parser.add_argument('--transport', choices=sorted(TRANSPORTS), default='direct')
+    parser.add_argument('--stagger', action='store_true', help='Spread the streams over each bar interval (direct)')
+    parser.add_argument('--max-bars', type=int, default=None, help='Replay only the first bars of the file')
+    parser.add_argument('--budget-us', type=float, default=1000.0, help='Per-bar latency budget in microseconds')
+    args = parser.parse_args()
+
+    print(format_replay_report(run_replay(replicate(args.path, args.streams), args.fast, args.slow,
+                                          speed=args.speed, transport=args.transport, stagger=args.stagger,
+                                          max_bars=args.max_bars,
+                                          budget_us=args.budget_us)))
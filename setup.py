@@ -12,11 +12,13 @@ ext_modules = [
     Extension(
         'indicator_engine',
         ['bindings.cpp', 'indicator_engine.cpp'],
+        depends=['indicator_engine.h'],
         include_dirs=[
             get_pybind_include(),
         ],
         language='c++',
-        extra_compile_args=['-std=c++11'],
+        extra_compile_args=['-std=c++11', '-pthread'],
+        extra_link_args=['-pthread'],
     ),
 ]
 
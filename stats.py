@@ -1,24 +1,32 @@
+import os
 import strategy
 import backtest
 import load_data
 import numpy as np
-import matplotlib.pyplot as plt
 import indicators
+import indicator_engine
+import instrument
 
 #this file will run the full backtest when executed and compute some stats
 
 def compute_total_returns(prices, signals, return_type):
     if return_type == "simple":
-        returns = backtest.compute_simple_returns(prices)
-        total_return = backtest.addup_simmple_returns(returns)
+        total_return = backtest.compute_simple_returns_array(prices).sum()
     elif return_type == "log":
-        returns = backtest.compute_log_returns(prices)
-        total_return = backtest.addup_log_returns(returns)
+        total_return = backtest.compute_log_returns_array(prices).sum()
     else:
         raise ValueError("Invalid return type. Use 'simple' or 'log'.")
     
     return total_return
 
+def compute_maximum_drawdown_array(equity):
+    """Vectorized compute_maximum_drawdown: running peak via maximum.accumulate"""
+    equity = np.asarray(equity, dtype=float)
+    if len(equity) == 0:
+        return 0.0
+    peak = np.maximum.accumulate(equity)
+    return float(np.max((peak - equity) / peak))
+
 def compute_maximum_drawdown(prices):
     max_drawdown = 0
     peak = prices[0]
@@ -46,89 +54,183 @@ def compute_sharpe_ratio(returns, risk_free_rate=0.0):
     sharpe_ratio = avg_excess_return / std_dev
     return sharpe_ratio
 
-def run_full_strategy(file_path, fast, slow):
-    close_prices, sma_fast, sma_slow, ema_fast, ema_slow = strategy.run_strategy(file_path, fast, slow)
+def compute_performance_stats(equity, periods_per_year=252.0, risk_free_rate=0.0):
+    """
+    NumPy version of indicator_engine.performance_stats(equity): total returns, annualized
+    volatility/Sharpe/Sortino (population std), hit rate and the largest drawdown with the
+    index of its peak, trough and recovery (-1 if the peak is never regained)
+    """
+    equity = np.asarray(equity, dtype=float)
+    returns = np.empty(0)
+    if len(equity) > 1:
+        # no return after the equity has hit zero, as in PerformanceAccumulator.add_equity
+        returns = np.divide(equity[1:], equity[:-1], out=np.ones(len(equity) - 1), where=equity[:-1] != 0) - 1.0
+    annualize = np.sqrt(periods_per_year)
+    excess = returns.mean() - risk_free_rate if len(returns) else 0.0
+    std = returns.std() if len(returns) else 0.0
+    downside = np.sqrt(np.mean(np.minimum(returns - risk_free_rate, 0.0) ** 2)) if len(returns) else 0.0
+    moved = np.count_nonzero(returns)
+    stats = {
+        'periods': len(returns),
+        'total_return': equity[-1] / equity[0] - 1.0 if len(equity) else 0.0,
+        'total_simple_return': float(returns.sum()),
+        'total_log_return': float(np.log(equity[-1] / equity[0])) if len(equity) else 0.0,
+        'mean_return': float(returns.mean()) if len(returns) else 0.0,
+        'volatility': float(std * annualize),
+        'sharpe': float(excess / std * annualize) if std > 0 else 0.0,
+        'sortino': float(excess / downside * annualize) if downside > 0 else 0.0,
+        'hit_rate': np.count_nonzero(returns > 0) / moved if moved else 0.0,
+        'max_drawdown': 0.0, 'max_drawdown_peak': 0, 'max_drawdown_trough': 0,
+        'max_drawdown_recovery': -1, 'max_drawdown_duration': 0,
+    }
+    if len(equity) == 0:
+        return stats
+    peak = np.maximum.accumulate(equity)
+    drawdown = (peak - equity) / peak
+    trough = int(np.argmax(drawdown))
+    if drawdown[trough] > 0:
+        # the latest bar at the running peak before the trough, and the first one back at it
+        peak_index = int(np.flatnonzero(equity[:trough] == peak[trough])[-1])
+        recovered = np.flatnonzero(equity[trough:] >= peak[trough])
+        recovery = trough + int(recovered[0]) if len(recovered) else -1
+        stats.update({
+            'max_drawdown': float(drawdown[trough]), 'max_drawdown_peak': peak_index,
+            'max_drawdown_trough': trough, 'max_drawdown_recovery': recovery,
+            'max_drawdown_duration': (recovery if recovery >= 0 else len(equity) - 1) - peak_index,
+        })
+    return stats
 
-    sma_signals = strategy.moving_average_crossover_strategy(sma_fast, sma_slow)
-    ema_signals = strategy.moving_average_crossover_strategy(ema_fast, ema_slow)
-    
-    #Plot SMA crossover with signals
-    plt.figure(figsize=(12, 6))
-    plt.plot(sma_fast, label='SMA Fast')
-    plt.plot(sma_slow, label='SMA Slow')
-    for i, sig in enumerate(sma_signals):
-        if sig == "BUY":
-            plt.scatter(i, sma_fast[i], marker='^', color='green')
-        elif sig == "SELL":
-            plt.scatter(i, sma_fast[i], marker='v', color='red')
-    plt.legend()
-    plt.title('SMA Crossover with Buy/Sell Signals')
-    plt.show()
-    
-    # Plot EMA crossover with signals
-    plt.figure(figsize=(12, 6))
-    plt.plot(ema_fast, label='EMA Fast')
-    plt.plot(ema_slow, label='EMA Slow')
-    for i, sig in enumerate(ema_signals):
-        if sig == "BUY":
-            plt.scatter(i, ema_fast[i], marker='^', color='green')
-        elif sig == "SELL":
-            plt.scatter(i, ema_fast[i], marker='v', color='red')
-    plt.legend()
-    plt.title('EMA Crossover with Buy/Sell Signals')
-    plt.show()
-    
-    # 
-    # Compute positions
-    sma_positions = backtest.compute_positions(sma_signals)
-    ema_positions = backtest.compute_positions(ema_signals)
+# columns of the per-strategy records returned by compute_full_strategy
+STATS_FIELDS = ['ma_type', 'fast', 'slow', 'total_simple_return', 'total_log_return', 'max_drawdown', 'sharpe']
+
+@instrument.timed()
+def compute_full_strategy(file_path, fast, slow, timeframe=None, start=None, end=None):
+    """
+    The computation half of run_full_strategy: no printing, no plotting and no
+    matplotlib import. Returns (records, series) where records holds one stats
+    dict per moving average type (keys in STATS_FIELDS) and series holds the
+    arrays the plotting stage needs. `start`/`end` limit the run to a time range
+    (see indicators.run_indicators).
+    """
+    close_prices, sma_fast, sma_slow, ema_fast, ema_slow = strategy.run_strategy(file_path, fast, slow, timeframe,
+                                                                                 start, end)
+    counts = instrument.array_counts(close_prices)
+
+    with instrument.stage('signals', *counts):
+        sma_signals = strategy.crossover_signals(sma_fast, sma_slow)
+        ema_signals = strategy.crossover_signals(ema_fast, ema_slow)
+
+    # Compute positions (held from one crossover to the next)
+    with instrument.stage('positions', *counts):
+        sma_positions = backtest.compute_positions_array(sma_signals)
+        ema_positions = backtest.compute_positions_array(ema_signals)
     
     # Compute equity curves
-    equity_sma = backtest.compute_equity_curve(close_prices, sma_positions)
-    equity_ema = backtest.compute_equity_curve(close_prices, ema_positions)
-    
-    # Compute returns
-    sma_simple_returns = backtest.compute_simple_returns(close_prices)
-    sma_log_returns = backtest.compute_log_returns(close_prices)
-    ema_simple_returns = backtest.compute_simple_returns(close_prices)
-    ema_log_returns = backtest.compute_log_returns(close_prices)
-    
-    # Total returns
-    total_sma_simple = backtest.addup_simmple_returns(sma_simple_returns)
-    total_sma_log = backtest.addup_log_returns(sma_log_returns)
-    total_ema_simple = backtest.addup_simmple_returns(ema_simple_returns)
-    total_ema_log = backtest.addup_log_returns(ema_log_returns)
-    
-    # Max drawdown
-    max_dd_sma = compute_maximum_drawdown(equity_sma)
-    max_dd_ema = compute_maximum_drawdown(equity_ema)
-    
-    # Sharpe ratio (assuming daily returns, risk-free rate 0)
-    sharpe_sma = compute_sharpe_ratio(sma_simple_returns)
-    sharpe_ema = compute_sharpe_ratio(ema_simple_returns)
-    
-    # Print stats
-    print(f"SMA Total Simple Return: {total_sma_simple:.4f}")
-    print(f"SMA Total Log Return: {total_sma_log:.4f}")
-    print(f"SMA Max Drawdown: {max_dd_sma:.4f}")
-    print(f"SMA Sharpe Ratio: {sharpe_sma:.4f}")
-    print()
-    print(f"EMA Total Simple Return: {total_ema_simple:.4f}")
-    print(f"EMA Total Log Return: {total_ema_log:.4f}")
-    print(f"EMA Max Drawdown: {max_dd_ema:.4f}")
-    print(f"EMA Sharpe Ratio: {sharpe_ema:.4f}")
+    with instrument.stage('equity', *counts):
+        equity_sma = backtest.compute_equity_curve_array(close_prices, sma_positions)
+        equity_ema = backtest.compute_equity_curve_array(close_prices, ema_positions)
     
+    # Buy-and-hold totals and Sharpe of the prices, drawdown of each equity curve: one native
+    # pass per series (daily returns, risk-free rate 0, Sharpe not annualized)
+    with instrument.stage('stats', *counts):
+        price_stats = indicator_engine.performance_stats(close_prices, periods_per_year=1.0)
+        total_simple = price_stats['total_simple_return']
+        total_log = price_stats['total_log_return']
+        sharpe = price_stats['sharpe']
+        max_dd_sma = indicator_engine.performance_stats(equity_sma, periods_per_year=1.0)['max_drawdown']
+        max_dd_ema = indicator_engine.performance_stats(equity_ema, periods_per_year=1.0)['max_drawdown']
+
+    records = []
+    for ma_type, max_drawdown in (('sma', max_dd_sma), ('ema', max_dd_ema)):
+        records.append({
+            'ma_type': ma_type,
+            'fast': fast,
+            'slow': slow,
+            'total_simple_return': total_simple,
+            'total_log_return': total_log,
+            'max_drawdown': max_drawdown,
+            'sharpe': sharpe,
+        })
+
+    series = {
+        'close_prices': close_prices,
+        'sma_fast': sma_fast, 'sma_slow': sma_slow, 'sma_signals': sma_signals,
+        'sma_positions': sma_positions, 'sma_equity': equity_sma,
+        'ema_fast': ema_fast, 'ema_slow': ema_slow, 'ema_signals': ema_signals,
+        'ema_positions': ema_positions, 'ema_equity': equity_ema,
+    }
+    return records, series
+
+def format_stats(records):
+    lines = []
+    for record in records:
+        name = record['ma_type'].upper()
+        if lines:
+            lines.append("")
+        lines.append(f"{name} Total Simple Return: {record['total_simple_return']:.4f}")
+        lines.append(f"{name} Total Log Return: {record['total_log_return']:.4f}")
+        lines.append(f"{name} Max Drawdown: {record['max_drawdown']:.4f}")
+        lines.append(f"{name} Sharpe Ratio: {record['sharpe']:.4f}")
+    return "\n".join(lines)
+
+def plot_full_strategy(series, plot_dir=None):
+    """
+    Plot the crossovers, equity curves and positions. With `plot_dir` every
+    figure is written there as a PNG using the non-interactive Agg backend;
+    without it the figures are shown one after another as before.
+    """
+    import matplotlib
+    if plot_dir is not None:
+        matplotlib.use('Agg')
+        os.makedirs(plot_dir, exist_ok=True)
+    import matplotlib.pyplot as plt
+
+    def path_for(name):
+        return None if plot_dir is None else os.path.join(plot_dir, name + '.png')
+
+    with instrument.stage('plot'):
+        _plot_figures(plt, series, path_for)
+
+def _plot_figures(plt, series, path_for):
+    for ma_type in ('sma', 'ema'):
+        name = ma_type.upper()
+        fast_ma = series[ma_type + '_fast']
+        signals = series[ma_type + '_signals']
+
+        #Plot crossover with signals
+        fig = plt.figure(figsize=(12, 6))
+        plt.plot(fast_ma, label=f'{name} Fast')
+        plt.plot(series[ma_type + '_slow'], label=f'{name} Slow')
+        buys = np.flatnonzero(signals == strategy.BUY)
+        sells = np.flatnonzero(signals == strategy.SELL)
+        plt.scatter(buys, fast_ma[buys], marker='^', color='green')
+        plt.scatter(sells, fast_ma[sells], marker='v', color='red')
+        plt.legend()
+        plt.title(f'{name} Crossover with Buy/Sell Signals')
+        backtest.finish_plot(fig, path_for(ma_type + '_crossover'))
+
     # Plot equity curves
-    backtest.plot_equity_curve(equity_sma, title="SMA Strategy Equity Curve")
-    backtest.plot_equity_curve(equity_ema, title="EMA Strategy Equity Curve")
-    
+    for ma_type in ('sma', 'ema'):
+        backtest.plot_equity_curve(series[ma_type + '_equity'], title=f"{ma_type.upper()} Strategy Equity Curve",
+                                   path=path_for(ma_type + '_equity'))
+
     # Plot positions over time
-    backtest.plot_positions_over_time(sma_positions, title="SMA Positions Over Time")
-    backtest.plot_positions_over_time(ema_positions, title="EMA Positions Over Time")
+    for ma_type in ('sma', 'ema'):
+        backtest.plot_positions_over_time(series[ma_type + '_positions'], title=f"{ma_type.upper()} Positions Over Time",
+                                          path=path_for(ma_type + '_positions'))
+
+def run_full_strategy(file_path, fast, slow, show=False, plot_dir=None, timeframe=None, start=None, end=None):
+    """
+    Backtest both crossovers and print their stats. Plotting is opt-in:
+    `plot_dir` renders the figures to files, `show` opens them interactively.
+    """
+    records, series = compute_full_strategy(file_path, fast, slow, timeframe, start, end)
+    print(format_stats(records))
 
-    #plot 
+    if show or plot_dir is not None:
+        plot_full_strategy(series, plot_dir)
 
-    return close_prices, sma_fast, sma_slow, ema_fast, ema_slow 
+    return series['close_prices'], series['sma_fast'], series['sma_slow'], series['ema_fast'], series['ema_slow']
 
 
 if __name__ == "__main__":   
@@ -139,6 +241,6 @@ if __name__ == "__main__":
     file_path = sys.argv[1]
     fast = int(sys.argv[2])
     slow = int(sys.argv[3])
-    run_full_strategy(file_path, fast, slow)
+    run_full_strategy(file_path, fast, slow, show=True)
     
     
@@ -1,5 +1,4 @@
 import numpy as np
-import matplotlib.pyplot as plt
 
 def moving_average_crossover_strategy(fast_ma, slow_ma):
     # Ensure same length
@@ -19,13 +18,56 @@ def moving_average_crossover_strategy(fast_ma, slow_ma):
 
     return signals
 
-def run_strategy(file_path, fast, slow):
-    close_prices, sma_fast, sma_slow, ema_fast, ema_slow =indicators.run_indicators(file_path, fast, slow)
+# int8 signal codes used by crossover_signals and the array backtest functions
+HOLD = 0
+BUY = 1
+SELL = -1
+
+def crossover_warmup(ma_type, slow, offset=0):
+    """
+    The `warmup` for crossover_signals of a crossover whose series start `offset` bars
+    into the data: the zero-padded head of the slow SMA is not a real crossover, and the
+    first bar never is (it has no previous bar).
+    """
+    if ma_type == 'sma':
+        return max(slow - offset, 1)
+    return 1
+
+def crossover_signals(fast_ma, slow_ma, warmup=0):
+    """
+    Vectorized moving_average_crossover_strategy: returns an int8 array of
+    BUY (1), SELL (-1) and HOLD (0) instead of a list of strings.
+    Crossovers before index `warmup` (e.g. zero-padded SMA values) are ignored.
+    (strategies x time) matrices give one row of signals per strategy, with a
+    scalar warmup or one per row.
+    """
+    fast_ma = np.asarray(fast_ma)
+    slow_ma = np.asarray(slow_ma)
+    n = min(fast_ma.shape[-1], slow_ma.shape[-1])
+    fast_ma = fast_ma[..., :n]
+    slow_ma = slow_ma[..., :n]
+
+    above = fast_ma > slow_ma
+    below = fast_ma < slow_ma
+    signals = np.zeros(above.shape, dtype=np.int8)
+    # BUY: fast > slow now and fast <= slow before; SELL: fast < slow now and fast >= slow before
+    signals[..., 1:] = (above[..., 1:] & ~above[..., :-1]).astype(np.int8) - (below[..., 1:] & ~below[..., :-1])
+    if np.ndim(warmup) == 0:
+        signals[..., :warmup] = HOLD
+    else:
+        signals[np.arange(n) < np.asarray(warmup)[..., None]] = HOLD
+    return signals
+
+def run_strategy(file_path, fast, slow, timeframe=None, start=None, end=None):
+    close_prices, sma_fast, sma_slow, ema_fast, ema_slow =indicators.run_indicators(file_path, fast, slow, timeframe,
+                                                                                    start, end)
     return close_prices, sma_fast, sma_slow, ema_fast, ema_slow
 
 import indicators
 
 if __name__ == "__main__":
+    import matplotlib.pyplot as plt
+
     #close_prices, sma_fast, sma_slow, ema_fast, ema_slow = indicators.run_indicators('/home/destiny/Programming/Kraken_OHLCVT/1INCHEUR_1440.csv')  
     close_prices, sma_fast, sma_slow, ema_fast, ema_slow = run_strategy('/home/destiny/Programming/Kraken_OHLCVT/1INCHEUR_1440.csv')  
     sma_signals = moving_average_crossover_strategy(sma_fast, sma_slow)
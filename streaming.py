@@ -0,0 +1,145 @@
+import os
+
+import numpy as np
+
+import backtest
+import indicator_engine
+import instrument
+import load_data
+import strategy
+
+#out-of-core crossover backtest: the CSV (or a 1-D close price .npy) is read in fixed-size
+#chunks and every stage carries its state across chunk boundaries instead of holding the
+#full series - the SMA ring buffer / EMA value in the incremental indicators, the previous
+#bar's moving averages for crossover detection, the held position, the previous close and
+#the equity / statistics accumulator. Memory stays at a few chunks whatever the file size,
+#and the results are identical to the in-memory path (batch.evaluate_symbol)
+
+DEFAULT_CHUNK_BYTES = 1 << 26
+
+INCREMENTAL_INDICATORS = {
+    'sma': indicator_engine.IncrementalSMA,
+    'ema': indicator_engine.IncrementalEMA,
+}
+
+class CrossoverStream:
+    """One fast/slow crossover backtest fed a chunk of close prices at a time"""
+
+    def __init__(self, ma_type, fast, slow, initial_capital=1000.0):
+        if ma_type not in INCREMENTAL_INDICATORS:
+            raise ValueError("Invalid moving average type. Use 'sma' or 'ema'.")
+        self.ma_type = ma_type
+        self.fast = fast
+        self.slow = slow
+        self.fast_ma = INCREMENTAL_INDICATORS[ma_type](fast)
+        self.slow_ma = INCREMENTAL_INDICATORS[ma_type](slow)
+        self.warmup = strategy.crossover_warmup(ma_type, slow)
+        self.bars = 0
+        self.last_close = self.last_fast = self.last_slow = None
+        self.position = 0
+        self.equity = initial_capital
+        self.trades = 0
+        self.performance = indicator_engine.PerformanceAccumulator()
+
+    def update(self, close):
+        """Process the next chunk; returns its fast/slow/signals/positions/equity arrays"""
+        fast = self.fast_ma.update_many(close)
+        slow = self.slow_ma.update_many(close)
+        if self.bars == 0:
+            signals = strategy.crossover_signals(fast, slow, self.warmup)
+            prices = close
+        else:
+            # the previous bar's averages decide whether the first bar of the chunk crosses
+            signals = strategy.crossover_signals(np.concatenate(([self.last_fast], fast)),
+                                                 np.concatenate(([self.last_slow], slow)),
+                                                 max(self.warmup - self.bars + 1, 0))[1:]
+            prices = np.concatenate(([self.last_close], close))
+        # the position carried in from the previous chunk leads the forward fill
+        positions = backtest.compute_positions_array(np.concatenate((np.array([self.position], dtype=np.int8),
+                                                                     signals)))[1:]
+        # the position held at bar i-1 earns the return into bar i
+        held = positions[:-1] if self.bars == 0 else np.concatenate(([self.position], positions[:-1]))
+        strategy_returns = (prices[1:] - prices[:-1]) / prices[:-1] * held
+        equity = np.cumprod(np.concatenate(([self.equity], 1.0 + strategy_returns)))[1:]
+        self.performance.add_returns(strategy_returns)
+
+        self.trades += int(np.count_nonzero(signals))
+        self.bars += len(close)
+        self.last_close, self.last_fast, self.last_slow = close[-1], fast[-1], slow[-1]
+        self.position = int(positions[-1])
+        if len(equity):
+            self.equity = equity[-1]
+        return {'fast': fast, 'slow': slow, 'signals': signals, 'positions': positions, 'equity': equity}
+
+    def result(self):
+        """Stats of everything seen so far, in the form of sweep.evaluate_crossover"""
+        stats = self.performance.stats(periods_per_year=1.0)
+        return {
+            'total_return': stats['total_return'],
+            'max_drawdown': stats['max_drawdown'],
+            'sharpe': stats['sharpe'],
+            'trades': self.trades,
+        }
+
+def iter_close_chunks(file_path, chunk_bytes=DEFAULT_CHUNK_BYTES, malformed=None):
+    """Close prices of a CSV or a 1-D .npy file, one chunk of about `chunk_bytes` at a time"""
+    if os.path.splitext(os.fspath(file_path))[1].lower() == '.npy':
+        yield from load_data.iter_npy_chunks(file_path, max(chunk_bytes // 8, 1))
+        return
+    for columns in load_data.iter_ohlcvt_chunks(file_path, chunk_bytes, malformed):
+        yield columns['close']
+
+def iter_strategy_chunks(file_path, fast, slow, ma_types=('sma', 'ema'), chunk_bytes=DEFAULT_CHUNK_BYTES,
+                         initial_capital=1000.0, streams=None, malformed=None):
+    """
+    Run the crossover backtests chunk by chunk, yielding (start, close, {ma_type: arrays})
+    for each chunk (arrays as returned by CrossoverStream.update) so callers can write the
+    series out as they go. Pass a dict as `streams` to get the CrossoverStream objects.
+    """
+    if fast >= slow:
+        raise ValueError("fast window must be smaller than slow window")
+    streams = {} if streams is None else streams
+    for ma_type in ma_types:
+        streams[ma_type] = CrossoverStream(ma_type, fast, slow, initial_capital)
+    start = 0
+    chunks = iter_close_chunks(file_path, chunk_bytes, malformed)
+    while True:
+        with instrument.stage('stream read') as stage:
+            close = next(chunks, None)
+            if close is None:
+                return
+            stage.add(*instrument.array_counts(close))
+        with instrument.stage('stream strategies', *instrument.array_counts(close)):
+            series = {ma_type: stream.update(close) for ma_type, stream in streams.items()}
+        yield start, close, series
+        start += len(close)
+
+def run_streaming(file_path, fast, slow, ma_types=('sma', 'ema'), chunk_bytes=DEFAULT_CHUNK_BYTES,
+                  initial_capital=1000.0, warn=True):
+    """
+    Out-of-core version of the single-pair backtest: returns one result dict per MA type
+    with the keys of sweep.SWEEP_FIELDS, equal to sweep.evaluate_crossover on the
+    full series, while holding only about one chunk of data at a time.
+    """
+    streams, malformed = {}, []
+    for _ in iter_strategy_chunks(file_path, fast, slow, ma_types, chunk_bytes, initial_capital,
+                                  streams, malformed):
+        pass
+    if warn:
+        load_data.warn_malformed_rows(file_path, malformed)
+    records = []
+    for ma_type, stream in streams.items():
+        record = {'ma_type': ma_type, 'fast': fast, 'slow': slow}
+        record.update(stream.result())
+        records.append(record)
+    return records
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) not in (4, 5):
+        print("Usage: python streaming.py <csv_or_npy_path> <fast> <slow> [chunk_mb]")
+        sys.exit(1)
+    import sweep
+    chunk_bytes = int(float(sys.argv[4]) * 1024**2) if len(sys.argv) == 5 else DEFAULT_CHUNK_BYTES
+    print(sweep.format_sweep_table(run_streaming(sys.argv[1], int(sys.argv[2]), int(sys.argv[3]),
+                                                 chunk_bytes=chunk_bytes)))
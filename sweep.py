@@ -0,0 +1,165 @@
+import numpy as np
+
+import backtest
+import data_cache
+import indicator_engine
+import instrument
+import strategy
+
+#parameter sweep over (fast, slow) moving average crossover pairs:
+#every distinct window is computed once, then each valid pair is backtested from those rows
+
+MULTI_WINDOW_KERNELS = {
+    'sma': indicator_engine.simple_moving_average_multi,
+    'ema': indicator_engine.exponential_moving_average_multi,
+}
+
+# pairs per block of crossover_position_matrix, bounding its (pairs x time) temporaries
+POSITION_BLOCK_ROWS = 64
+
+# columns of the result dicts returned by run_parameter_sweep
+SWEEP_FIELDS = ['ma_type', 'fast', 'slow', 'total_return', 'max_drawdown', 'sharpe', 'trades']
+
+def parse_window_range(text):
+    """
+    Parse a window specification into a sorted list of ints.
+
+    Accepts a single window ("20"), a comma separated list ("10,20,50") or an
+    inclusive range "start:stop[:step]" ("5:50:5" -> 5, 10, ..., 50).
+    """
+    windows = set()
+    for part in str(text).split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if ':' in part:
+            fields = [int(f) for f in part.split(':')]
+            if len(fields) not in (2, 3):
+                raise ValueError(f"Invalid window range: {part!r}")
+            start, stop = fields[0], fields[1]
+            step = fields[2] if len(fields) == 3 else 1
+            if step <= 0:
+                raise ValueError(f"Window range step must be positive: {part!r}")
+            windows.update(range(start, stop + 1, step))
+        else:
+            windows.add(int(part))
+    if not windows or min(windows) <= 0:
+        raise ValueError(f"Windows must be positive integers: {text!r}")
+    return sorted(windows)
+
+def as_price_array(close_prices):
+    """
+    Contiguous prices for the multi-window kernels: float32 stays float32 (tables of half
+    the size, one float rounding per value), anything else becomes float64
+    """
+    close_prices = np.asarray(close_prices)
+    dtype = np.float32 if close_prices.dtype == np.float32 else np.float64
+    return np.ascontiguousarray(close_prices, dtype=dtype)
+
+def price_returns_of(close_prices):
+    """Bar-to-bar simple returns, always in float64"""
+    return np.subtract(close_prices[1:], close_prices[:-1], dtype=np.float64) / close_prices[:-1]
+
+def compute_moving_average_table(close_prices, windows, ma_type):
+    """Compute each distinct window once; returns ({window: row index}, (windows x time) array)"""
+    if ma_type not in MULTI_WINDOW_KERNELS:
+        raise ValueError("Invalid moving average type. Use 'sma' or 'ema'.")
+    windows = sorted(set(windows))
+    table = MULTI_WINDOW_KERNELS[ma_type](close_prices, windows)
+    return {w: k for k, w in enumerate(windows)}, table
+
+def crossover_returns(price_returns, fast_ma, slow_ma, warmup=1):
+    """
+    Signals and per-bar strategy returns of one fast/slow crossover.
+
+    Signals follow strategy.moving_average_crossover_strategy; the position
+    is held from one crossover to the next and applied to the next bar's return
+    (same alignment as backtest.compute_equity_curve), so returns[i] is earned
+    going into bar i+1. Crossovers before `warmup` (e.g. the zero-padded part
+    of an SMA) are ignored.
+    """
+    signals = strategy.crossover_signals(fast_ma, slow_ma, warmup)
+    positions = backtest.compute_positions_array(signals)
+    return signals, price_returns * positions[:-1]
+
+def crossover_position_matrix(table, row_of, pairs, ma_type):
+    """
+    (pairs x time) int8 positions of every (fast, slow) pair from a moving average table
+    (compute_moving_average_table), ready for backtest.compute_portfolio_equity_array
+    """
+    positions = np.empty((len(pairs), table.shape[1]), dtype=np.int8)
+    for start in range(0, len(pairs), POSITION_BLOCK_ROWS):
+        block = pairs[start:start + POSITION_BLOCK_ROWS]
+        fast = table[[row_of[f] for f, _ in block]]
+        slow = table[[row_of[s] for _, s in block]]
+        warmup = [strategy.crossover_warmup(ma_type, s) for _, s in block]
+        positions[start:start + len(block)] = backtest.compute_positions_array(
+            strategy.crossover_signals(fast, slow, warmup))
+    return positions
+
+def evaluate_crossover(price_returns, fast_ma, slow_ma, warmup=1, initial_capital=1000.0):
+    """Backtest one fast/slow crossover from precomputed moving averages (see crossover_returns)"""
+    signals, strategy_returns = crossover_returns(price_returns, fast_ma, slow_ma, warmup)
+
+    # one native pass over the returns; no equity array is built. The ratios do not
+    # depend on initial_capital, and periods_per_year=1 keeps the Sharpe per bar
+    stats = indicator_engine.performance_stats(strategy_returns, kind='returns', periods_per_year=1.0)
+    return {
+        'total_return': stats['total_return'],
+        'max_drawdown': stats['max_drawdown'],
+        'sharpe': stats['sharpe'],
+        'trades': int(np.count_nonzero(signals)),
+    }
+
+def run_parameter_sweep(close_prices, fast_windows, slow_windows, ma_types=('sma', 'ema'),
+                        rank_by='sharpe', initial_capital=1000.0):
+    """
+    Evaluate every valid (fast < slow) pair and return a list of result dicts
+    ranked best first by `rank_by` ('sharpe', 'total_return' or 'max_drawdown').
+    """
+    if rank_by not in ('sharpe', 'total_return', 'max_drawdown'):
+        raise ValueError("rank_by must be 'sharpe', 'total_return' or 'max_drawdown'")
+    close_prices = as_price_array(close_prices)
+    pairs = [(f, s) for f in sorted(set(fast_windows)) for s in sorted(set(slow_windows)) if f < s]
+    if not pairs:
+        return []
+
+    price_returns = price_returns_of(close_prices)
+    windows = sorted({w for pair in pairs for w in pair})
+    results = []
+    for ma_type in ma_types:
+        with instrument.stage(f'{ma_type} table', len(close_prices) * len(windows), close_prices.nbytes):
+            row_of, table = compute_moving_average_table(close_prices, windows, ma_type)
+        with instrument.stage(f'{ma_type} crossovers', len(close_prices) * len(pairs)):
+            for fast, slow in pairs:
+                stats = evaluate_crossover(price_returns, table[row_of[fast]], table[row_of[slow]],
+                                           strategy.crossover_warmup(ma_type, slow), initial_capital)
+                stats.update({'ma_type': ma_type, 'fast': fast, 'slow': slow})
+                results.append(stats)
+
+    # drawdown is ranked smallest first, everything else largest first
+    descending = rank_by != 'max_drawdown'
+    results.sort(key=lambda row: row[rank_by], reverse=descending)
+    return results
+
+def run_sweep(file_path, fast_windows, slow_windows, timeframe=None, **kwargs):
+    """Load the CSV once (resampled to `timeframe` if given) and sweep every pair over it"""
+    close_prices = data_cache.load_columns(file_path, timeframe=timeframe)['close']
+    return run_parameter_sweep(close_prices, fast_windows, slow_windows, **kwargs)
+
+def format_sweep_table(results, top=20):
+    lines = [f"{'Rank':<6} {'MA':<5} {'Fast':>6} {'Slow':>6} {'Total Return':>14} {'Max Drawdown':>14} {'Sharpe':>10} {'Trades':>8}"]
+    lines.append('-' * len(lines[0]))
+    for rank, row in enumerate(results[:top], start=1):
+        lines.append(f"{rank:<6} {row['ma_type'].upper():<5} {row['fast']:>6} {row['slow']:>6} "
+                     f"{row['total_return']:>14.4f} {row['max_drawdown']:>14.4f} {row['sharpe']:>10.4f} {row['trades']:>8}")
+    return "\n".join(lines)
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) != 4:
+        print("Usage: python sweep.py <csv_path> <fast_windows> <slow_windows>")
+        print("Example: python sweep.py data/1INCHEUR_1440.csv 5:50:5 20:200:10")
+        sys.exit(1)
+    results = run_sweep(sys.argv[1], parse_window_range(sys.argv[2]), parse_window_range(sys.argv[3]))
+    print(format_sweep_table(results))
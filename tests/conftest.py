@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+
+# Shared helpers for the test modules. pytest loads this file before collecting them, so the
+# repository root is put on the import path once here; helpers are imported with
+# `from conftest import synthetic_prices, write_bars`.
+
+import sys
+import os
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+def synthetic_prices(n=2000, seed=0):
+    """Geometric random walk used by the pytest checks (no data file needed)"""
+    rng = np.random.default_rng(seed)
+    return 100.0 * np.exp(np.cumsum(rng.normal(0.0, 0.01, n)))
+
+def write_bars(path, n, seed=0, header=False, bad_line=None):
+    """
+    Write synthetic_prices(n, seed) as a one-minute OHLCVT CSV (optionally with a header
+    line, and a malformed line before bar `bad_line`). Returns the close prices as written
+    to the file.
+    """
+    close = np.array([float(f"{price:.6f}") for price in synthetic_prices(n, seed)])
+    with open(path, 'w') as file:
+        if header:
+            file.write("timestamp,open,high,low,close,volume,trades\n")
+        for i, price in enumerate(close):
+            if i == bad_line:
+                file.write("garbage\n")
+            file.write(f"{1600000000 + 60 * i},{price:.6f},{price:.6f},{price:.6f},{price:.6f},1.0,1\n")
+    return close
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+
+import numpy as np
+import pytest
+
+import backtest
+import stats
+import strategy
+from conftest import synthetic_prices
+
+CODES = {"BUY": strategy.BUY, "SELL": strategy.SELL, "HOLD": strategy.HOLD}
+
+def moving_averages(prices):
+    fast = np.convolve(prices, np.ones(5) / 5, mode='same')
+    slow = np.convolve(prices, np.ones(30) / 30, mode='same')
+    return fast, slow
+
+def test_int8_signals_match_string_signals():
+    fast, slow = moving_averages(synthetic_prices(seed=2))
+    signals = strategy.crossover_signals(fast, slow)
+    assert signals.dtype == np.int8
+    expected = [CODES[s] for s in strategy.moving_average_crossover_strategy(fast, slow)]
+    np.testing.assert_array_equal(signals, expected)
+
+def test_crossover_warmup_skips_the_zero_padded_sma():
+    assert strategy.crossover_warmup('sma', 30) == 30
+    assert strategy.crossover_warmup('sma', 30, offset=20) == 10
+    assert strategy.crossover_warmup('sma', 30, offset=500) == 1
+    assert strategy.crossover_warmup('ema', 30) == 1
+
+def test_array_returns_match_reference():
+    prices = synthetic_prices(seed=2)
+    np.testing.assert_allclose(backtest.compute_simple_returns_array(prices), backtest.compute_simple_returns(prices), rtol=1e-12)
+    np.testing.assert_allclose(backtest.compute_log_returns_array(prices), backtest.compute_log_returns(prices), rtol=1e-12)
+
+def test_positions_and_equity():
+    prices = synthetic_prices(seed=2)
+    fast, slow = moving_averages(prices)
+    signals = strategy.crossover_signals(fast, slow)
+    string_signals = strategy.moving_average_crossover_strategy(fast, slow)
+
+    # carry=False is the reference behaviour: only signal bars hold a position
+    unheld = backtest.compute_positions_array(signals, carry=False)
+    np.testing.assert_array_equal(unheld, backtest.compute_positions(string_signals))
+    np.testing.assert_allclose(backtest.compute_equity_curve_array(prices, unheld),
+                               backtest.compute_equity_curve(prices, backtest.compute_positions(string_signals)), rtol=1e-9)
+
+    held = backtest.compute_positions_array(signals)
+    last = 0
+    for i, signal in enumerate(signals):
+        last = signal if signal != 0 else last
+        assert held[i] == last
+    np.testing.assert_allclose(backtest.compute_equity_curve_array(prices, held),
+                               backtest.compute_equity_curve(prices, held), rtol=1e-9)
+
+def test_maximum_drawdown_array_matches_loop():
+    equity = 1000.0 * np.cumprod(1.0 + synthetic_prices(500, seed=2) / 1e4 - 0.01)
+    assert np.isclose(stats.compute_maximum_drawdown_array(equity), stats.compute_maximum_drawdown(list(equity)), rtol=1e-12)
+
+def reference_portfolio_row(prices, positions, sizing, cost, initial_capital=1000.0):
+    """Loop version of one compute_portfolio_equity_array row"""
+    equity, level, held = [], initial_capital, 0.0
+    for i in range(len(prices)):
+        if i:
+            level *= 1 + held * (prices[i] - prices[i-1]) / prices[i-1]
+        exposure = positions[i] * sizing[i]
+        level *= 1 - cost * abs(exposure - held)
+        held = exposure
+        equity.append(level)
+    return np.array(equity)
+
+def test_portfolio_equity_matches_single_curves():
+    prices = synthetic_prices(seed=2)
+    positions = np.random.default_rng(3).integers(-1, 2, (7, len(prices))).astype(np.int8)
+    equity, portfolio = backtest.compute_portfolio_equity_array(prices, positions)
+    for row, pos in zip(equity, positions):
+        np.testing.assert_allclose(row, backtest.compute_equity_curve_array(prices, pos), rtol=1e-12)
+    np.testing.assert_allclose(portfolio, equity.mean(axis=0), rtol=1e-12)
+
+def test_portfolio_costs_sizing_and_per_row_prices():
+    rng = np.random.default_rng(5)
+    prices = np.stack([synthetic_prices(500, seed) for seed in range(3)])
+    positions = rng.integers(-1, 2, (3, 500))
+    sizing = rng.uniform(0.2, 1.5, (3, 500))
+    weights = np.array([0.5, 0.3, 0.2])
+    out = np.empty((3, 500))
+    equity, portfolio = backtest.compute_portfolio_equity_array(prices, positions, initial_capital=50.0, fee=1e-3,
+                                                               slippage=5e-4, sizing=sizing, weights=weights, out=out)
+    assert equity is out
+    for k in range(3):
+        expected = reference_portfolio_row(prices[k], positions[k], sizing[k], 1.5e-3, 50.0)
+        np.testing.assert_allclose(equity[k], expected, rtol=1e-12)
+    np.testing.assert_allclose(portfolio, weights @ equity, rtol=1e-12)
+
+    # per-strategy sizing on a shared price series
+    equity, _ = backtest.compute_portfolio_equity_array(prices[0], positions, fee=1e-3, sizing=[0.5, 1.0, 2.0])
+    expected = reference_portfolio_row(prices[0], positions[2], np.full(500, 2.0), 1e-3)
+    np.testing.assert_allclose(equity[2], expected, rtol=1e-12)
+
+    for bad in [dict(positions=positions[0]), dict(prices=prices[:, :-1]), dict(weights=[1.0]),
+                dict(out=np.empty((3, 499)))]:
+        args = dict(prices=prices, positions=positions)
+        args.update(bad)
+        with pytest.raises(ValueError):
+            backtest.compute_portfolio_equity_array(**args)
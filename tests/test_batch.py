@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+
+import csv
+import numpy as np
+
+import batch
+from conftest import write_bars
+
+def test_batch_matches_single_symbol_evaluation(tmp_path):
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    closes = {f"SYM{i}_60": write_bars(data_dir / f"SYM{i}_60.csv", 1500, seed=i) for i in range(3)}
+    (data_dir / "EMPTY_60.csv").write_text("timestamp,open,high,low,close,volume,trades\n")
+
+    rows = batch.run_batch(str(data_dir), 10, 40, workers=2, cache_dir=str(tmp_path / "cache"))
+    assert [row['symbol'] for row in rows] == ["EMPTY_60", "SYM0_60", "SYM1_60", "SYM2_60"]
+    assert rows[0]['error']
+    for row in rows[1:]:
+        close = np.round(closes[row['symbol']], 6)
+        expected = batch.evaluate_symbol(close, 10, 40)
+        for key, value in expected.items():
+            assert np.isclose(row[key], value, rtol=1e-6), key
+
+    out_path = tmp_path / "results.csv"
+    batch.write_results_csv(rows, out_path)
+    with open(out_path) as file:
+        assert len(list(csv.DictReader(file))) == 4
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+
+import copy
+
+import bench_suite
+
+def test_run_suite_measures_each_case_in_isolation(tmp_path):
+    suite = bench_suite.run_suite(sizes=[1000, 5000], cases=['ingest_csv', 'sma', 'pipeline'],
+                                  data_dir=str(tmp_path), repeat=2, min_time=0.0, max_csv_rows=1000)
+    results = suite['results']
+    # ingestion is skipped above max_csv_rows
+    assert [(r['case'], r['size']) for r in results] == [
+        ('ingest_csv', 1000), ('sma', 1000), ('pipeline', 1000), ('sma', 5000), ('pipeline', 5000)]
+    for result in results:
+        assert 'error' not in result, result
+        assert result['repeats'] >= 2
+        assert 0 < result['wall_min'] <= result['wall_median']
+        assert result['peak_rss_bytes'] > 0
+        assert result['alloc_peak_bytes'] >= 0
+    assert suite['environment']['numpy']
+
+def test_compare_flags_time_and_memory_regressions():
+    result = {'case': 'sma', 'size': 10**6, 'wall_median': 0.010,
+              'peak_rss_delta_bytes': 8 * 2**20, 'alloc_peak_bytes': 8 * 2**20}
+    baseline = {'results': [result]}
+
+    same = bench_suite.compare_results(baseline, copy.deepcopy(baseline))
+    assert same[0]['regressions'] == []
+
+    slower = copy.deepcopy(baseline)
+    slower['results'][0]['wall_median'] = 0.012
+    assert bench_suite.compare_results(baseline, slower, threshold=0.10)[0]['regressions'] == ['time']
+    assert bench_suite.compare_results(baseline, slower, threshold=0.25)[0]['regressions'] == []
+
+    bigger = copy.deepcopy(baseline)
+    bigger['results'][0]['alloc_peak_bytes'] = 16 * 2**20
+    assert bench_suite.compare_results(baseline, bigger)[0]['regressions'] == ['alloc_peak']
+
+def test_compare_exit_status(tmp_path):
+    import json
+    base = {'results': [{'case': 'ema', 'size': 1000, 'wall_median': 1.0,
+                         'peak_rss_delta_bytes': 0, 'alloc_peak_bytes': 0}]}
+    slow = copy.deepcopy(base)
+    slow['results'][0]['wall_median'] = 2.0
+    (tmp_path / "base.json").write_text(json.dumps(base))
+    (tmp_path / "slow.json").write_text(json.dumps(slow))
+    assert bench_suite.main(['compare', str(tmp_path / "base.json"), str(tmp_path / "base.json")]) == 0
+    assert bench_suite.main(['compare', str(tmp_path / "base.json"), str(tmp_path / "slow.json")]) == 1
+
+def test_compare_flags_failed_and_missing_cases(tmp_path):
+    import json
+    ok = {'case': 'sma', 'size': 1000, 'wall_median': 1.0, 'peak_rss_delta_bytes': 0, 'alloc_peak_bytes': 0}
+    base = {'results': [ok, dict(ok, case='ema')]}
+    current = {'results': [{'case': 'sma', 'size': 1000, 'error': 'timed out'}]}
+    rows = bench_suite.compare_results(base, current)
+    assert sorted((row['case'], row['regressions']) for row in rows) == [('ema', ['missing']), ('sma', ['error'])]
+    assert 'REGRESSION (error)' in bench_suite.format_comparison(rows)
+    (tmp_path / "base.json").write_text(json.dumps(base))
+    (tmp_path / "current.json").write_text(json.dumps(current))
+    assert bench_suite.main(['compare', str(tmp_path / "base.json"), str(tmp_path / "current.json")]) == 1
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+import json
+import subprocess
+from conftest import ROOT, write_bars
+
+def run_cli(tmp_path, *args):
+    # report which plotting modules the run imported after the CLI returns
+    code = ("import sys, cli; cli.main(sys.argv[1:]); "
+            "print(sorted(m for m in ('matplotlib', 'scipy') if m in sys.modules), file=sys.stderr)")
+    env = dict(os.environ, INDICATOR_CACHE_DIR=str(tmp_path / "cache"))
+    proc = subprocess.run([sys.executable, "-c", code] + [str(a) for a in args],
+                          cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    return proc.stdout, proc.stderr.strip().splitlines()[-1]
+
+def test_headless_json_output_never_imports_plotting(tmp_path):
+    csv_path = tmp_path / "bars.csv"
+    write_bars(csv_path, 400)
+    stdout, imported = run_cli(tmp_path, csv_path, 10, 40, "--no-plot", "--output", "json")
+    assert imported == "[]"
+    records = json.loads(stdout)
+    assert [r['ma_type'] for r in records] == ['sma', 'ema']
+    assert all(r['fast'] == 10 and r['slow'] == 40 for r in records)
+
+    stdout, imported = run_cli(tmp_path, csv_path, "5:10", "20,40", "--output", "csv", "--top", "3")
+    assert imported == "[]"
+    lines = stdout.strip().splitlines()
+    assert lines[0].startswith("ma_type,fast,slow") and len(lines) == 4
+
+    stdout, imported = run_cli(tmp_path, csv_path, "5:10", "20,40", "--walk-forward", "200:100", "--output", "json")
+    assert imported == "[]"
+    rows = json.loads(stdout)
+    assert [(r['segment'], r['ma_type']) for r in rows] == [(0, 'sma'), (0, 'ema'), (1, 'sma'), (1, 'ema')]
+
+    stdout, imported = run_cli(tmp_path, csv_path, 10, 40, "--replay", 4, "--transport", "socket", "--output", "json")
+    assert imported == "[]"
+    report, = json.loads(stdout)
+    assert report['streams'] == 4 and report['bars'] == 4 * 400
+
+def test_plot_dir_renders_files(tmp_path):
+    csv_path = tmp_path / "bars.csv"
+    write_bars(csv_path, 200)
+    plot_dir = tmp_path / "plots"
+    run_cli(tmp_path, csv_path, 5, 20, "--plot-dir", plot_dir)
+    assert sorted(os.listdir(plot_dir)) == sorted(f"{ma}_{kind}.png" for ma in ('sma', 'ema')
+                                                  for kind in ('crossover', 'equity', 'positions'))
+
+def test_single_run_time_range(tmp_path):
+    csv_path = tmp_path / "bars.csv"
+    write_bars(csv_path, 600)
+    # the first 400 bars need no warm-up, so the range run equals a run over just those bars
+    head_path = tmp_path / "head.csv"
+    write_bars(head_path, 400)
+    expected, _ = run_cli(tmp_path, head_path, 10, 40, "--output", "json")
+    ranged, _ = run_cli(tmp_path, csv_path, 10, 40, "--start", 1600000000, "--end", 1600000000 + 60 * 400,
+                        "--output", "json")
+    assert json.loads(ranged) == json.loads(expected)
+
+    ranged, _ = run_cli(tmp_path, csv_path, 10, 40, "--start", 1600000000 + 60 * 300, "--end=-60m", "--output", "json")
+    assert [r['ma_type'] for r in json.loads(ranged)] == ['sma', 'ema']
+    assert all(r['total_simple_return'] != 0.0 for r in json.loads(ranged))
+    for args in (["10", "40", "--start", "2030-01-01"], ["5:10", "40", "--start=-1d"]):
+        proc = subprocess.run([sys.executable, "cli.py", str(csv_path)] + args, cwd=ROOT,
+                              env=dict(os.environ, INDICATOR_CACHE_DIR=str(tmp_path / "cache")),
+                              capture_output=True, text=True)
+        assert proc.returncode != 0
+    assert "--start/--end" in proc.stderr
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+
+import os
+import threading
+import numpy as np
+
+import data_cache
+import load_data
+from conftest import write_bars
+
+def counting_loader(monkeypatch):
+    calls = []
+    original = load_data.load_ohlcvt
+    def wrapper(*args, **kwargs):
+        calls.append(args)
+        return original(*args, **kwargs)
+    monkeypatch.setattr(load_data, 'load_ohlcvt', wrapper)
+    return calls
+
+def test_cache_hit_is_memory_mapped(tmp_path, monkeypatch):
+    calls = counting_loader(monkeypatch)
+    csv_path = str(tmp_path / "bars.csv")
+    write_bars(csv_path, 500)
+    cache_dir = str(tmp_path / "cache")
+
+    first = data_cache.load_columns(csv_path, cache_dir=cache_dir)
+    second = data_cache.load_columns(csv_path, cache_dir=cache_dir)
+    assert len(calls) == 1
+    assert isinstance(second['close'], np.memmap) and not second['close'].flags.writeable
+    np.testing.assert_array_equal(first['close'], load_data.load_ohlcvt(csv_path)[0]['close'])
+
+    # a modified source gets a new key and is parsed again
+    write_bars(csv_path, 600, seed=1)
+    os.utime(csv_path, ns=(0, 10**18))
+    assert len(data_cache.load_columns(csv_path, cache_dir=cache_dir)['close']) == 600
+    assert len(calls) == 3
+
+def test_concurrent_loads_parse_once(tmp_path, monkeypatch):
+    calls = counting_loader(monkeypatch)
+    csv_path = str(tmp_path / "bars.csv")
+    write_bars(csv_path, 2000)
+    cache_dir = str(tmp_path / "cache")
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(data_cache.load_columns(csv_path, cache_dir=cache_dir)))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert len(results) == 8
+
+def test_lru_eviction_by_size(tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    paths = [str(tmp_path / f"bars{i}.csv") for i in range(3)]
+    for i, path in enumerate(paths):
+        write_bars(path, 1000, seed=i)
+    data_cache.load_columns(paths[0], cache_dir=cache_dir)
+    entry_bytes = data_cache.entry_size(os.path.join(cache_dir, 'entries', os.listdir(os.path.join(cache_dir, 'entries'))[0]))
+    for path in paths[1:]:
+        data_cache.load_columns(path, cache_dir=cache_dir, max_bytes=2 * entry_bytes)
+    assert len(os.listdir(os.path.join(cache_dir, 'entries'))) == 2
+    # the evicted source is transparently rebuilt
+    assert len(data_cache.load_columns(paths[0], cache_dir=cache_dir, max_bytes=2 * entry_bytes)['close']) == 1000
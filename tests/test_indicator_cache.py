@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+
+import os
+import numpy as np
+import pytest
+
+import data_cache
+import indicator_cache
+import indicator_engine
+import indicators
+
+def test_hits_misses_and_read_only_results():
+    cache = indicator_cache.IndicatorCache(max_bytes=1 << 20)
+    prices = np.linspace(1.0, 2.0, 500)
+    first = indicator_cache.cached_call(indicator_engine.simple_moving_average, prices, 20, cache=cache)
+    again = indicator_cache.cached_call(indicator_engine.simple_moving_average, prices, 20, cache=cache)
+    other = indicator_cache.cached_call(indicator_engine.simple_moving_average, prices, 30, cache=cache)
+    assert again is first and other is not first
+    np.testing.assert_array_equal(first, indicator_engine.simple_moving_average(prices, 20))
+    with pytest.raises(ValueError):
+        first[0] = 1.0
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['entries']) == (1, 2, 2)
+
+    # a writeable input is re-hashed on every call, so changing it is a new key
+    prices[-1] = 5.0
+    changed = indicator_cache.cached_call(indicator_engine.simple_moving_average, prices, 20, cache=cache)
+    assert changed[-1] != first[-1]
+
+def test_memory_tier_evicts_least_recently_used():
+    cache = indicator_cache.IndicatorCache(max_bytes=3 * 800)
+    arrays = {k: np.full(100, float(k)) for k in range(4)}
+    for k in range(3):
+        cache.put(str(k), arrays[k])
+    cache.get('0')  # 1 is now the least recently used
+    cache.put('3', arrays[3])
+    assert cache.get('1') is None
+    assert all(cache.get(str(k)) is not None for k in (0, 2, 3))
+    assert cache.stats()['evictions'] == 1 and cache.stats()['bytes'] == 3 * 800
+    cache.put('big', np.zeros(1000))
+    assert cache.get('big') is None
+
+def test_disk_tier_survives_new_cache_and_evicts(tmp_path):
+    disk_dir = str(tmp_path / "results")
+    prices = np.linspace(1.0, 2.0, 1000)
+    cache = indicator_cache.IndicatorCache(max_bytes=1 << 20, disk_dir=disk_dir)
+    expected = indicator_cache.cached_call(indicator_engine.exponential_moving_average, prices, 10, cache=cache)
+
+    reopened = indicator_cache.IndicatorCache(max_bytes=1 << 20, disk_dir=disk_dir)
+    calls = []
+    key = indicator_cache.fingerprint(prices)
+    result = reopened.get_or_compute(key, 'indicator_engine.exponential_moving_average', (10,),
+                                     lambda: calls.append(1))
+    assert calls == [] and isinstance(result, np.memmap)
+    np.testing.assert_array_equal(result, expected)
+    assert reopened.stats()['disk_hits'] == 1
+
+    small = indicator_cache.IndicatorCache(max_bytes=0, disk_dir=disk_dir, disk_max_bytes=6000)
+    for k in range(3):
+        small.put(f"k{k}", np.zeros(500))
+    assert sorted(os.listdir(disk_dir)) == ["k2.npy"]
+
+def test_run_indicators_reuses_results(tmp_path, monkeypatch):
+    monkeypatch.setattr(data_cache, 'DEFAULT_CACHE_DIR', str(tmp_path / "cache"))
+    rng = np.random.default_rng(6)
+    close = 100.0 * np.exp(np.cumsum(rng.normal(0.0, 0.01, 600)))
+    path = tmp_path / "bars.csv"
+    path.write_text("".join(f"{1600000000 + 60 * i},{p},{p},{p},{p},1.0,1\n" for i, p in enumerate(close)))
+    cache = indicator_cache.configure(max_bytes=1 << 20)
+
+    first = indicators.run_indicators(str(path), 10, 50)
+    second = indicators.run_indicators(str(path), 10, 50)
+    assert all(a is b for a, b in zip(first[1:], second[1:]))
+    assert cache.stats()['hits'] == 4 and cache.stats()['misses'] == 4
+    np.testing.assert_array_equal(second[3], indicators.exponential_moving_average(close, 10))
+
+def test_run_indicators_time_range_is_warmed_up(tmp_path, monkeypatch):
+    monkeypatch.setattr(data_cache, 'DEFAULT_CACHE_DIR', str(tmp_path / "cache"))
+    rng = np.random.default_rng(7)
+    close = 100.0 * np.exp(np.cumsum(rng.normal(0.0, 0.01, 3000)))
+    path = tmp_path / "bars.csv"
+    path.write_text("".join(f"{1600000000 + 60 * i},{p},{p},{p},{p},1.0,1\n" for i, p in enumerate(close)))
+    indicator_cache.configure(max_bytes=1 << 20)
+
+    full = indicators.run_indicators(str(path), 10, 50)
+    ranged = indicators.run_indicators(str(path), 10, 50, start=1600000000 + 60 * 2000, end=1600000000 + 60 * 2500)
+    np.testing.assert_array_equal(ranged[0], close[2000:2500])
+    # SMA value k belongs to bar k + window - 1
+    np.testing.assert_allclose(ranged[1], full[1][2000 - 9:2500 - 9], rtol=1e-12)
+    np.testing.assert_allclose(ranged[2], full[2][2000 - 49:2500 - 49], rtol=1e-12)
+    np.testing.assert_allclose(ranged[3], full[3][2000:2500], rtol=1e-8)
+    np.testing.assert_allclose(ranged[4], full[4][2000:2500], rtol=1e-8)
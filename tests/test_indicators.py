@@ -2,13 +2,16 @@
 
 import sys
 import os
+import pickle
 import numpy as np
+import pytest
 
 # Add parent directory to path to import modules
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import indicators
 import indicator_engine
+from conftest import synthetic_prices
 
 def load_test_data(filepath):
     """Load test data from .npy file"""
@@ -101,6 +104,265 @@ def compare_arrays(python_result, cpp_result, name, tolerance=1e-9, allow_shape_
         print(f"\n✗ FAIL: {non_zero_diffs} values exceed tolerance")
         return False
 
+def test_sma_ema_match_python_reference():
+    prices = synthetic_prices()
+    for window in [1, 5, 20, 100]:
+        cpp_sma = indicator_engine.simple_moving_average(prices, window)
+        np.testing.assert_allclose(cpp_sma[window - 1:], indicators.simple_moving_average(prices, window), rtol=1e-10)
+        assert np.all(cpp_sma[:window - 1] == 0.0)
+        cpp_ema = indicator_engine.exponential_moving_average(prices, window)
+        np.testing.assert_allclose(cpp_ema, indicators.exponential_moving_average(prices, window), rtol=1e-12)
+
+def test_out_buffer_and_strided_input():
+    prices = synthetic_prices()
+    out = np.empty_like(prices)
+    assert indicator_engine.simple_moving_average(prices, 10, out=out) is out
+    np.testing.assert_array_equal(out, indicator_engine.simple_moving_average(prices, 10))
+
+    view = prices[::3]
+    np.testing.assert_array_equal(indicator_engine.exponential_moving_average(view, 7),
+                                  indicator_engine.exponential_moving_average(view.copy(), 7))
+
+    in_place = prices.copy()
+    indicator_engine.exponential_moving_average(in_place, 7, out=in_place)
+    np.testing.assert_array_equal(in_place, indicator_engine.exponential_moving_average(prices, 7))
+
+def test_invalid_arguments_raise():
+    prices = synthetic_prices(50)
+    with pytest.raises(ValueError):
+        indicator_engine.simple_moving_average(prices, 0)
+    with pytest.raises(ValueError):
+        indicator_engine.simple_moving_average(prices, 5, out=np.empty(10))
+    with pytest.raises(ValueError):
+        indicator_engine.simple_moving_average(prices, 5, out=prices)
+    with pytest.raises(ValueError):
+        indicator_engine.exponential_moving_average(prices[1:], 5, out=prices[:-1])
+
+def test_multi_window_matches_single_window():
+    prices = synthetic_prices(10000)
+    windows = [3, 10, 25, 50, 120, 7]
+    sma = indicator_engine.simple_moving_average_multi(prices, windows)
+    ema = indicator_engine.exponential_moving_average_multi(prices, windows)
+    assert sma.shape == ema.shape == (len(windows), len(prices))
+    for k, window in enumerate(windows):
+        np.testing.assert_allclose(sma[k], indicator_engine.simple_moving_average(prices, window), rtol=1e-10, atol=1e-10)
+        np.testing.assert_array_equal(ema[k], indicator_engine.exponential_moving_average(prices, window))
+
+    out = np.empty((len(windows), len(prices)))
+    assert indicator_engine.exponential_moving_average_multi(prices, windows, out=out) is out
+
+def test_incremental_indicators_match_batch_kernels():
+    prices = synthetic_prices(3000)
+    for cls, batch in [(indicator_engine.IncrementalSMA, indicator_engine.simple_moving_average),
+                       (indicator_engine.IncrementalEMA, indicator_engine.exponential_moving_average)]:
+        indicator = cls(25)
+        head = indicator.update_many(prices[:1000])
+        tail = np.array([indicator.update(p) for p in prices[1000:]])
+        np.testing.assert_array_equal(np.concatenate([head, tail]), batch(prices, 25))
+
+def test_incremental_state_roundtrip():
+    prices = synthetic_prices(500)
+    for cls in [indicator_engine.IncrementalSMA, indicator_engine.IncrementalEMA]:
+        for split in [10, 300]:
+            indicator = cls(40)
+            indicator.update_many(prices[:split])
+            restored = pickle.loads(pickle.dumps(indicator))
+            from_dict = cls(40)
+            from_dict.set_state(indicator.get_state())
+            expected = indicator.update_many(prices[split:])
+            np.testing.assert_array_equal(restored.update_many(prices[split:]), expected)
+            np.testing.assert_array_equal(from_dict.update_many(prices[split:]), expected)
+
+def test_parallel_kernels_within_tolerance():
+    prices = synthetic_prices(400000)
+    for threads in [1, 3, 8]:
+        for window in [2, 50, 5000]:
+            serial = indicator_engine.exponential_moving_average(prices, window)
+            parallel = indicator_engine.exponential_moving_average_parallel(prices, window, threads=threads)
+            np.testing.assert_allclose(parallel, serial, rtol=1e-13, atol=0)
+            serial = indicator_engine.simple_moving_average(prices, window)
+            parallel = indicator_engine.simple_moving_average_parallel(prices, window, threads=threads)
+            np.testing.assert_allclose(parallel, serial, rtol=0, atol=1e-12 * prices.max())
+            assert np.all(parallel[:window - 1] == 0.0)
+
+    # one thread or a short series is exactly the serial kernel
+    np.testing.assert_array_equal(indicator_engine.exponential_moving_average_parallel(prices, 20, threads=1),
+                                  indicator_engine.exponential_moving_average(prices, 20))
+    short = prices[:1000]
+    np.testing.assert_array_equal(indicator_engine.simple_moving_average_parallel(short, 20, threads=8),
+                                  indicator_engine.simple_moving_average(short, 20))
+
+    in_place = prices.copy()
+    indicator_engine.exponential_moving_average_parallel(in_place, 30, threads=4, out=in_place)
+    np.testing.assert_allclose(in_place, indicator_engine.exponential_moving_average(prices, 30), rtol=1e-13)
+    with pytest.raises(ValueError):
+        indicator_engine.simple_moving_average_parallel(prices, 30, out=prices)
+
+def test_float32_kernels_round_the_float64_results():
+    prices = synthetic_prices(300000).astype(np.float32)
+    upcast = prices.astype(np.float64)
+    windows = [3, 20, 250]
+    # float64 accumulators: the float32 result is the float64 result rounded once
+    for name, args in [('simple_moving_average', (20,)), ('exponential_moving_average', (20,)),
+                       ('simple_moving_average_multi', (windows,)), ('exponential_moving_average_multi', (windows,)),
+                       ('simple_moving_average_parallel', (20, 4)), ('rolling_variance', (20, 1)),
+                       ('rolling_std', (20,)), ('rolling_zscore', (20,)), ('rolling_min', (20,)), ('rolling_max', (20,))]:
+        kernel = getattr(indicator_engine, name)
+        result = kernel(prices, *args)
+        assert result.dtype == np.float32
+        np.testing.assert_array_equal(result, kernel(upcast, *args).astype(np.float32))
+    low = prices[::-1].copy()
+    for bands, expected in [(indicator_engine.bollinger_bands(prices, 20), indicator_engine.bollinger_bands(upcast, 20)),
+                            (indicator_engine.donchian_channels(prices, low, 20),
+                             indicator_engine.donchian_channels(upcast, low.astype(np.float64), 20))]:
+        for band, band64 in zip(bands, expected):
+            assert band.dtype == np.float32
+            np.testing.assert_array_equal(band, band64.astype(np.float32))
+    parallel = indicator_engine.exponential_moving_average_parallel(prices, 20, threads=4)
+    assert parallel.dtype == np.float32
+    np.testing.assert_allclose(parallel, indicator_engine.exponential_moving_average(upcast, 20), rtol=3e-7)
+
+    view = prices[::2]
+    out = np.empty(len(view), dtype=np.float32)
+    assert indicator_engine.exponential_moving_average(view, 7, out=out) is out
+    np.testing.assert_array_equal(out, indicator_engine.exponential_moving_average(view.copy(), 7))
+    # a float64 out still gets the float64 result of the converted input
+    for name, args, shape in [('simple_moving_average', (5,), len(prices)),
+                              ('exponential_moving_average_parallel', (5, 2), len(prices)),
+                              ('simple_moving_average_multi', ([5, 9],), (2, len(prices))),
+                              ('rolling_zscore', (5,), len(prices)), ('rolling_max', (5,), len(prices))]:
+        kernel = getattr(indicator_engine, name)
+        out64 = np.empty(shape)
+        assert kernel(prices, *args, out=out64) is out64
+        np.testing.assert_array_equal(out64, kernel(upcast, *args))
+    # other dtypes are still converted to float64
+    assert indicator_engine.simple_moving_average(np.arange(10, dtype=np.int32), 3).dtype == np.float64
+    assert indicator_engine.exponential_moving_average([1.0, 2.0, 3.0], 2).dtype == np.float64
+
+def test_rolling_extremes_match_reference():
+    prices = synthetic_prices(5000)
+    # rounded prices have many ties, which exercise the deque's equal-value handling
+    for data in [prices, np.round(prices, 0)]:
+        for window in [1, 2, 17, 250, 1000, 6000]:
+            np.testing.assert_array_equal(indicator_engine.rolling_min(data, window), indicators.rolling_min(data, window))
+            np.testing.assert_array_equal(indicator_engine.rolling_max(data, window), indicators.rolling_max(data, window))
+
+    view = prices[::2]
+    out = np.empty_like(view)
+    assert indicator_engine.rolling_max(view, 30, out=out) is out
+    np.testing.assert_array_equal(out, indicators.rolling_max(view, 30))
+    with pytest.raises(ValueError):
+        indicator_engine.rolling_min(prices, 5, out=prices)
+    with pytest.raises(ValueError):
+        indicator_engine.rolling_max(prices, 0)
+
+def test_donchian_channels_match_reference():
+    close = synthetic_prices(3000)
+    rng = np.random.default_rng(1)
+    high = close * (1 + rng.uniform(0, 0.01, len(close)))
+    low = close * (1 - rng.uniform(0, 0.01, len(close)))
+    for got, expected in zip(indicator_engine.donchian_channels(high, low, 200),
+                             indicators.donchian_channels(high, low, 200)):
+        np.testing.assert_array_equal(got, expected)
+    with pytest.raises(ValueError):
+        indicator_engine.donchian_channels(high, low[1:], 20)
+
+def test_rolling_dispersion_matches_reference():
+    prices = synthetic_prices(20000)
+    # the mean is the SMA's running sum, so errors are relative to the price level (~1e-10
+    # of it here), not to the variance of nearly flat windows
+    atol = 1e-10 * prices.max()
+    for window in [2, 20, 200]:
+        for ddof in [0, 1]:
+            np.testing.assert_allclose(indicator_engine.rolling_variance(prices, window, ddof),
+                                       indicators.rolling_variance(prices, window, ddof), rtol=1e-7, atol=atol)
+            np.testing.assert_allclose(indicator_engine.rolling_std(prices, window, ddof),
+                                       indicators.rolling_std(prices, window, ddof), rtol=1e-7, atol=atol)
+    for window in [20, 200]:
+        np.testing.assert_allclose(indicator_engine.rolling_zscore(prices, window),
+                                   indicators.rolling_zscore(prices, window), rtol=1e-6, atol=1e-7)
+
+    # a constant stretch has zero variance and a zero z-score
+    flat = np.concatenate([prices[:100], np.full(100, 42.0)])
+    assert np.all(indicator_engine.rolling_std(flat, 50)[150:] == 0.0)
+    assert np.all(indicator_engine.rolling_zscore(flat, 50)[150:] == 0.0)
+
+    with pytest.raises(ValueError):
+        indicator_engine.rolling_variance(prices, 1, ddof=1)
+    with pytest.raises(ValueError):
+        indicator_engine.rolling_std(prices, 10, out=prices)
+
+def test_bollinger_middle_band_is_the_sma():
+    prices = synthetic_prices(5000)
+    upper, middle, lower = indicator_engine.bollinger_bands(prices, 20, num_std=2.5)
+    np.testing.assert_array_equal(middle, indicator_engine.simple_moving_average(prices, 20))
+    for got, expected in zip((upper, middle, lower), indicators.bollinger_bands(prices, 20, num_std=2.5)):
+        np.testing.assert_allclose(got, expected, rtol=1e-9)
+    assert np.all(upper[:19] == 0.0) and np.all(lower[:19] == 0.0)
+
+def synthetic_ohlcv(n=3000, seed=0):
+    close = synthetic_prices(n, seed)
+    rng = np.random.default_rng(seed + 1)
+    high = close * (1 + rng.uniform(0, 0.01, n))
+    low = close * (1 - rng.uniform(0, 0.01, n))
+    volume = rng.uniform(0, 100, n)
+    volume[100:120] = 0.0
+    return high, low, close, volume
+
+def test_ohlcv_indicators_match_reference():
+    high, low, close, volume = synthetic_ohlcv()
+    for window in [1, 14, 50]:
+        np.testing.assert_allclose(indicator_engine.relative_strength_index(close, window),
+                                   indicators.relative_strength_index(close, window), rtol=1e-9, atol=1e-9)
+        np.testing.assert_allclose(indicator_engine.average_true_range(high, low, close, window),
+                                   indicators.average_true_range(high, low, close, window), rtol=1e-9)
+    for window in [0, 1, 30]:
+        np.testing.assert_allclose(indicator_engine.volume_weighted_average_price(high, low, close, volume, window),
+                                   indicators.volume_weighted_average_price(high, low, close, volume, window),
+                                   rtol=1e-8, atol=1e-8)
+    np.testing.assert_array_equal(indicator_engine.on_balance_volume(close, volume),
+                                  indicators.on_balance_volume(close, volume))
+
+    # a zero-volume run longer than the window after heavy volume: the sums must not keep residue
+    heavy = volume.copy()
+    heavy[200:260] = 1e7
+    heavy[260:290] = 0.0
+    typical = (high + low + close) / 3
+    for window in [1, 5, 10]:
+        vwap = indicator_engine.volume_weighted_average_price(high, low, close, heavy, window)
+        np.testing.assert_array_equal(vwap[260 + window - 1:290], 0.0)
+        # per-window sums (the cumsum reference loses digits after the heavy bars)
+        windows = np.lib.stride_tricks.sliding_window_view
+        price_volume = windows(typical * heavy, window).sum(axis=1)
+        total_volume = windows(heavy, window).sum(axis=1)
+        expected = np.divide(price_volume, total_volume, out=np.zeros_like(total_volume), where=total_volume > 0)
+        np.testing.assert_allclose(vwap[window - 1:], expected, rtol=1e-9)
+
+    # the MACD lines are exactly the EMA kernel applied to the close and to the MACD line
+    line, signal, histogram = indicator_engine.macd(close, 12, 26, 9)
+    np.testing.assert_array_equal(line, indicator_engine.exponential_moving_average(close, 12)
+                                  - indicator_engine.exponential_moving_average(close, 26))
+    np.testing.assert_array_equal(signal, indicator_engine.exponential_moving_average(line, 9))
+    np.testing.assert_array_equal(histogram, line - signal)
+    for got, expected in zip((line, signal, histogram), indicators.macd(close)):
+        np.testing.assert_allclose(got, expected, rtol=1e-9, atol=1e-9)
+
+def test_ohlcv_indicator_edge_cases():
+    high, low, close, volume = synthetic_ohlcv(200)
+    flat = np.full(50, 10.0)
+    assert np.all(indicator_engine.relative_strength_index(flat, 14)[14:] == 50.0)
+    assert np.all(indicator_engine.relative_strength_index(np.arange(1.0, 51.0), 14)[14:] == 100.0)
+    assert np.all(indicator_engine.relative_strength_index(close[:10], 14) == 0.0)
+
+    out = np.empty(len(close))
+    assert indicator_engine.on_balance_volume(close[::-1], volume, out=out) is out
+    with pytest.raises(ValueError):
+        indicator_engine.average_true_range(high, low[1:], close)
+    with pytest.raises(ValueError):
+        indicator_engine.relative_strength_index(close, 14, out=close)
+    with pytest.raises(ValueError):
+        indicator_engine.volume_weighted_average_price(high, low, close, volume, -1)
+
 def main():
     print("\n" + "="*60)
     print("INDICATOR ENGINE TEST: Python vs C++ Implementation")
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+
+import json
+import numpy as np
+import pytest
+
+import indicator_engine
+import instrument
+
+@pytest.fixture
+def enabled():
+    instrument.reset()
+    instrument.enable()
+    yield
+    instrument.disable()
+    instrument.reset()
+
+def test_disabled_records_nothing():
+    instrument.disable()
+    instrument.reset()
+    with instrument.stage('load', rows=10) as stage:
+        stage.add(rows=5)
+    indicator_engine.simple_moving_average(np.arange(100.0), 5)
+    assert instrument.summary() == {'stages': {}, 'kernels': {}}
+
+def test_stages_and_kernel_timers(enabled, tmp_path):
+    prices = np.arange(1.0, 1001.0)
+
+    @instrument.timed('ema')
+    def ema(values):
+        return indicator_engine.exponential_moving_average(values, 10)
+
+    with instrument.stage('indicators', *instrument.array_counts(prices)) as stage:
+        indicator_engine.simple_moving_average(prices, 10)
+        indicator_engine.simple_moving_average_multi(prices, [5, 10, 20])
+        stage.add(rows=1)
+    ema(prices)
+    ema(prices)
+
+    totals = instrument.summary()
+    assert list(totals['stages']) == ['indicators', 'ema']
+    assert totals['stages']['indicators']['rows'] == 1001
+    assert totals['stages']['indicators']['bytes'] == prices.nbytes
+    assert totals['stages']['ema']['calls'] == 2
+
+    kernels = totals['kernels']
+    assert kernels['simple_moving_average']['calls'] == 1
+    assert kernels['simple_moving_average_multi']['items'] == 3000
+    assert kernels['exponential_moving_average']['calls'] == 2
+    assert 'C++ kernel' in instrument.report()
+
+    trace_path = tmp_path / "trace.json"
+    instrument.dump_trace(str(trace_path))
+    trace = json.loads(trace_path.read_text())
+    assert [event['name'] for event in trace['traceEvents']] == ['indicators', 'ema', 'ema']
+    assert all(event['ph'] == 'X' and event['dur'] >= 0 for event in trace['traceEvents'])
+    assert trace['otherData']['kernels']['simple_moving_average']['calls'] == 1
+
+def test_csv_parser_counts_rows(enabled, tmp_path):
+    csv_path = tmp_path / "bars.csv"
+    csv_path.write_text("timestamp,open,high,low,close,volume,trades\n"
+                        "1,1,1,1,1,1,1\n2,2,2,2,2,2,2\nbad\n")
+    indicator_engine.load_ohlcvt_csv(str(csv_path))
+    parser = instrument.summary()['kernels']['parse_ohlcvt_csv']
+    assert parser['items'] == 2
+    assert parser['bytes'] == csv_path.stat().st_size
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+
+import os
+import numpy as np
+import pytest
+
+import load_data
+
+def write_csv(path, lines):
+    path.write_text("\n".join(lines) + "\n")
+    return str(path)
+
+def test_load_ohlcvt_parses_all_columns(tmp_path):
+    path = write_csv(tmp_path / "bars.csv", [
+        "timestamp,open,high,low,close,volume,trades",
+        "1609459200,1.25,1.5,1.0,1.4,1000.5,12",
+        "1609459260,1.4,1.6,1.3,1.55,250.25,7",
+        "1609459320,1.55,1.55,1.2,1.3,10,1",
+    ])
+    columns, malformed = load_data.load_ohlcvt(path)
+    assert malformed == []
+    assert columns['timestamp'].dtype == np.int64 and columns['trades'].dtype == np.int64
+    np.testing.assert_array_equal(columns['timestamp'], [1609459200, 1609459260, 1609459320])
+    np.testing.assert_array_equal(columns['close'], [1.4, 1.55, 1.3])
+    np.testing.assert_array_equal(columns['volume'], [1000.5, 250.25, 10.0])
+    np.testing.assert_array_equal(columns['trades'], [12, 7, 1])
+    for name in load_data.OHLCVT_COLUMNS:
+        assert columns[name].flags['C_CONTIGUOUS']
+
+def test_malformed_rows_are_reported(tmp_path):
+    path = write_csv(tmp_path / "bad.csv", [
+        "1,1,1,1,1,1,1",
+        "2,1,1,oops,1,1,1",
+        "",
+        "3,1,1",
+        "4,2,2,2,2,2",
+    ])
+    columns, malformed = load_data.load_ohlcvt(path)
+    np.testing.assert_array_equal(columns['timestamp'], [1, 4])
+    assert [line for line, _ in malformed] == [2, 4]
+    with pytest.raises(ValueError):
+        load_data.load_ohlcvt(path, strict=True)
+
+def test_create_close_price_array_warns_on_malformed(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    path = write_csv(tmp_path / "bars.csv", ["1,1,1,1,10.5,1,1", "2,1,1,1,x,1,1", "3,1,1,1,11.0,1,1"])
+    with pytest.warns(UserWarning, match="1 malformed rows"):
+        close_prices = load_data.create_close_price_array(path)
+    np.testing.assert_array_equal(close_prices, [10.5, 11.0])
+    np.testing.assert_array_equal(np.load(tmp_path / "close_prices.npy"), close_prices)
+
+def reference_resample(columns, interval):
+    """NumPy version of indicator_engine.resample_ohlcvt for one interval"""
+    bucket = columns['timestamp'] // interval * interval
+    starts = np.concatenate([[0], np.flatnonzero(np.diff(bucket)) + 1])
+    ends = np.append(starts[1:], len(bucket))
+    return {
+        'timestamp': bucket[starts], 'open': columns['open'][starts],
+        'high': np.maximum.reduceat(columns['high'], starts), 'low': np.minimum.reduceat(columns['low'], starts),
+        'close': columns['close'][ends - 1], 'volume': np.add.reduceat(columns['volume'], starts),
+        'trades': np.add.reduceat(columns['trades'], starts),
+    }
+
+def synthetic_trades(n=20000, seed=5):
+    rng = np.random.default_rng(seed)
+    timestamp = 1609459200 + np.sort(rng.integers(0, 14 * 86400, n))
+    price = 100.0 * np.exp(np.cumsum(rng.normal(0.0, 1e-3, n)))
+    return timestamp, price, rng.random(n)
+
+def assert_bars_equal(bars, expected):
+    for name, values in expected.items():
+        if name == 'volume':
+            np.testing.assert_allclose(bars[name], values, rtol=1e-12)
+        else:
+            np.testing.assert_array_equal(bars[name], values)
+
+def test_parse_timeframe():
+    assert load_data.parse_timeframe('15m') == 900
+    assert load_data.parse_timeframe('1H') == 3600
+    assert load_data.parse_timeframe('1440') == 86400
+    assert load_data.parse_timeframe(30) == 1800
+    for bad in ('0m', 'abc', '-5', ''):
+        with pytest.raises(ValueError):
+            load_data.parse_timeframe(bad)
+
+def test_resample_trades_to_several_timeframes():
+    import indicator_engine
+    timestamp, price, volume = synthetic_trades()
+    bars = indicator_engine.resample_trades(timestamp, price, volume, [60, 900, 86400])
+    trades = {'timestamp': timestamp, 'open': price, 'high': price, 'low': price, 'close': price,
+              'volume': volume, 'trades': np.ones(len(price), dtype=np.int64)}
+    for interval in (60, 900, 86400):
+        assert_bars_equal(bars[interval], reference_resample(trades, interval))
+
+    # minute bars resample to the same hourly bars as the trades themselves
+    minutes = bars[60]
+    hourly = load_data.resample_columns(minutes, ['1h'])['1h']
+    assert_bars_equal(hourly, indicator_engine.resample_trades(timestamp, price, volume, [3600])[3600])
+
+def test_resample_edge_cases():
+    import indicator_engine
+    bars = indicator_engine.resample_trades(np.array([-61, -60, -1, 0, 59]), np.arange(5.0), np.ones(5), [60])[60]
+    np.testing.assert_array_equal(bars['timestamp'], [-120, -60, 0])
+    np.testing.assert_array_equal(bars['trades'], [1, 2, 2])
+    empty = indicator_engine.resample_trades(np.empty(0, dtype=np.int64), np.empty(0), np.empty(0), [60])
+    assert len(empty[60]['close']) == 0
+    with pytest.raises(ValueError):
+        indicator_engine.resample_trades(np.array([60, 0]), np.ones(2), np.ones(2), [60])
+    with pytest.raises(ValueError):
+        indicator_engine.resample_trades(np.array([0, 60]), np.ones(2), np.ones(2), [0])
+    with pytest.raises(ValueError):
+        indicator_engine.resample_trades(np.array([0, 60]), np.ones(3), np.ones(2), [60])
+
+def test_load_columns_with_timeframe(tmp_path):
+    import data_cache
+    timestamp, price, volume = synthetic_trades(3000)
+    path = write_csv(tmp_path / "bars.csv", [f"{t},{p},{p},{p},{p},{v},1" for t, p, v in zip(timestamp, price, volume)])
+    columns = data_cache.load_columns(path, cache_dir=str(tmp_path / "cache"))
+    daily = data_cache.load_columns(path, cache_dir=str(tmp_path / "cache"), timeframe='1d')
+    assert_bars_equal(daily, reference_resample({k: np.asarray(v) for k, v in columns.items()}, 86400))
+
+def test_select_range_returns_views_with_warmup():
+    timestamps = 1700000000 + 3600 * np.arange(1000, dtype=np.int64)
+    columns = {'timestamp': timestamps, 'close': np.linspace(1.0, 2.0, 1000)}
+    assert load_data.time_range(timestamps, timestamps[100], timestamps[200]) == (100, 200)
+    assert load_data.time_range(timestamps, timestamps[100] - 1, timestamps[200] + 1) == (100, 201)
+    assert load_data.time_range(timestamps, None, '-10h') == (0, 989)
+    assert load_data.time_range(timestamps, '-10h') == (989, 1000)
+    assert load_data.time_range(timestamps, '2000-01-01', '1999-01-01') == (0, 0)
+    assert load_data.parse_time('2023-11-14T22:13:20') == 1700000000
+    assert load_data.parse_time('1700000000') == load_data.parse_time('+1700000000') == 1700000000
+    assert load_data.parse_time(np.datetime64('2023-11-14')) == 1699920000
+
+    views, first = load_data.select_range(columns, timestamps[300], timestamps[400], warmup=50)
+    assert first == 50 and len(views['close']) == 150
+    assert views['timestamp'][first] == timestamps[300]
+    assert all(np.shares_memory(views[name], columns[name]) for name in columns)
+    views, first = load_data.select_range(columns, timestamps[20], warmup=50)
+    assert first == 20 and len(views['close']) == 1000
+    with pytest.raises(ValueError):
+        load_data.parse_time('yesterday')
+    with pytest.raises(ValueError):
+        load_data.select_range(columns, '2030-01-01')
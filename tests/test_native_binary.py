@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+
+import os
+import shutil
+import subprocess
+import numpy as np
+import numpy.lib.format as npy_format
+import pytest
+
+import indicator_engine
+from conftest import ROOT
+
+@pytest.fixture(scope="module")
+def engine_binary(tmp_path_factory):
+    compiler = shutil.which("g++") or shutil.which("c++")
+    if compiler is None:
+        pytest.skip("no C++ compiler available")
+    binary = str(tmp_path_factory.mktemp("bin") / "indicator_engine")
+    subprocess.run([compiler, "-O2", "-std=c++11", "-pthread", "-o", binary, os.path.join(ROOT, "indicator_engine.cpp")], check=True)
+    return binary
+
+@pytest.mark.parametrize("version", [(1, 0), (2, 0), (3, 0)])
+def test_binary_reads_npy_versions_and_writes_loadable_output(engine_binary, tmp_path, version):
+    prices = 100.0 + np.cumsum(np.random.default_rng(0).normal(0.0, 1.0, 5000))
+    input_path = tmp_path / "close_prices.npy"
+    with open(input_path, "wb") as file:
+        npy_format.write_array(file, prices, version=version)
+
+    subprocess.run([engine_binary, "20", str(input_path), str(tmp_path / "result")], check=True, capture_output=True)
+    np.testing.assert_array_equal(np.load(tmp_path / "result_sma.npy"), indicator_engine.simple_moving_average(prices, 20))
+    np.testing.assert_array_equal(np.load(tmp_path / "result_ema.npy"), indicator_engine.exponential_moving_average(prices, 20))
+
+def test_binary_rejects_unsupported_input(engine_binary, tmp_path):
+    np.save(tmp_path / "ints.npy", np.arange(10))
+    result = subprocess.run([engine_binary, "5", str(tmp_path / "ints.npy"), str(tmp_path / "out")], capture_output=True, text=True)
+    assert result.returncode == 1
+    assert "Unsupported NPY dtype" in result.stderr
+
+def test_binary_removes_outputs_of_a_failed_run(engine_binary, tmp_path):
+    np.save(tmp_path / "close_prices.npy", np.linspace(1.0, 2.0, 100))
+    # the EMA output cannot be created, so the SMA file written first must not be left behind
+    (tmp_path / "out_ema.npy").mkdir()
+    result = subprocess.run([engine_binary, "5", str(tmp_path / "close_prices.npy"), str(tmp_path / "out")], capture_output=True, text=True)
+    assert result.returncode == 1
+    assert "Cannot create file" in result.stderr
+    assert not (tmp_path / "out_sma.npy").exists()
+
+def write_raw_npy(path, header, data):
+    header = header.ljust(117) + "\n"
+    with open(path, "wb") as file:
+        file.write(b"\x93NUMPY\x01\x00" + len(header).to_bytes(2, "little") + header.encode("latin1") + data.tobytes())
+
+def test_binary_rejects_unquoted_descr(engine_binary, tmp_path):
+    # 'descr' is the last key, so no quote follows it anywhere in the header
+    write_raw_npy(tmp_path / "bad.npy", "{'fortran_order': False, 'shape': (10,), 'descr': f8}", np.zeros(10))
+    result = subprocess.run([engine_binary, "5", str(tmp_path / "bad.npy"), str(tmp_path / "out")], capture_output=True, text=True)
+    assert result.returncode == 1
+    assert "Malformed NPY descr" in result.stderr
+
+@pytest.mark.parametrize("prices", [np.zeros((4, 5)), np.zeros((4, 5), order='F'), np.zeros((20, 1))])
+def test_binary_rejects_non_1d_layouts(engine_binary, tmp_path, prices):
+    np.save(tmp_path / "prices.npy", prices)
+    result = subprocess.run([engine_binary, "5", str(tmp_path / "prices.npy"), str(tmp_path / "out")], capture_output=True, text=True)
+    assert result.returncode == 1
+    assert "Expected a 1-D C-ordered array" in result.stderr
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+
+import numpy as np
+import pytest
+
+import backtest
+import indicator_engine
+import replay
+import strategy
+from conftest import synthetic_prices
+
+def batch_changes(prices, ma_type, fast, slow):
+    """(bar, position) of every position change on the batch path"""
+    kernel = {'sma': indicator_engine.simple_moving_average, 'ema': indicator_engine.exponential_moving_average}[ma_type]
+    warmup = strategy.crossover_warmup(ma_type, slow)
+    positions = backtest.compute_positions_array(strategy.crossover_signals(kernel(prices, fast), kernel(prices, slow),
+                                                                            warmup))
+    bars = np.flatnonzero(np.diff(np.concatenate(([0], positions))))
+    return [(int(bar), int(positions[bar])) for bar in bars]
+
+def test_histogram_percentiles_within_bucket_error():
+    values = np.random.default_rng(0).lognormal(10.0, 1.0, 20000).astype(np.int64)
+    histogram = replay.LatencyHistogram()
+    for value in values:
+        histogram.record(value)
+    for q in [50, 90, 99]:
+        exact = np.percentile(values, q)
+        assert exact * 0.99 <= histogram.percentile(q) <= exact * 1.07
+    assert histogram.percentile(100) == histogram.max == values.max()
+    assert histogram.fraction_above(values.max()) == 0.0
+    assert histogram.fraction_above(0) == 1.0
+    assert replay.LatencyHistogram().percentile(50) == 0
+
+@pytest.mark.parametrize('transport', ['direct', 'socket'])
+def test_replay_emits_the_batch_position_changes(tmp_path, transport):
+    prices = synthetic_prices(3000, seed=4)
+    path = tmp_path / 'prices.npy'
+    np.save(path, prices)
+    events = []
+    engine = replay.ReplayEngine(10, 30, on_change=lambda *event: events.append(event))
+    report = replay.run_replay(replay.replicate(path, 3), 10, 30, transport=transport, engine=engine)
+
+    assert report['bars'] == 3 * len(prices) and report['streams'] == 3
+    assert report['position_changes'] == len(events)
+    assert 0 < report['latency_p50_us'] <= report['latency_p99_us'] <= report['latency_max_us']
+    for symbol in engine.symbols:
+        for ma_type in ('sma', 'ema'):
+            changes = [(bar, position) for sym, kind, bar, position, _ in events if sym == symbol and kind == ma_type]
+            assert changes == batch_changes(prices, ma_type, 10, 30)
+            assert engine.positions()[symbol][ma_type] == changes[-1][1]
+
+def test_paced_replay_and_bad_arguments(tmp_path):
+    path = tmp_path / 'prices.npy'
+    np.save(path, synthetic_prices(200, seed=4))
+    report = replay.run_replay({'a': path, 'b': path}, 5, 20, speed=2000, stagger=True, max_bars=50)
+    assert report['bars'] == 100
+    assert report['seconds'] >= 49 / 2000
+    assert report['service_p99_us'] <= report['service_max_us']
+    with pytest.raises(ValueError):
+        replay.run_replay({'a': path}, 5, 20, transport='udp')
+    with pytest.raises(ValueError):
+        replay.ReplayEngine(20, 5)
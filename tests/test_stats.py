@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+
+import numpy as np
+import pytest
+
+import indicator_engine
+import stats
+
+def synthetic_equity(n=5000, seed=3):
+    rng = np.random.default_rng(seed)
+    returns = rng.normal(0.0002, 0.01, n)
+    returns[::9] = 0.0
+    return 1000.0 * np.concatenate([[1.0], np.cumprod(1.0 + returns)]), returns
+
+def assert_stats_match(result, expected):
+    assert result.keys() == expected.keys()
+    for name, value in expected.items():
+        if isinstance(value, int):
+            assert result[name] == value, name
+        else:
+            assert result[name] == pytest.approx(value, rel=1e-9, abs=1e-12), name
+
+@pytest.mark.parametrize("periods_per_year, risk_free_rate", [(1.0, 0.0), (252.0, 0.0001)])
+def test_performance_stats_matches_numpy_reference(periods_per_year, risk_free_rate):
+    equity, _ = synthetic_equity()
+    result = indicator_engine.performance_stats(equity, periods_per_year=periods_per_year,
+                                                risk_free_rate=risk_free_rate)
+    assert_stats_match(result, stats.compute_performance_stats(equity, periods_per_year, risk_free_rate))
+    assert result['sharpe'] == pytest.approx(
+        stats.compute_sharpe_ratio(equity[1:] / equity[:-1] - 1.0, risk_free_rate) * np.sqrt(periods_per_year))
+
+def test_performance_stats_from_returns_and_in_chunks():
+    equity, returns = synthetic_equity()
+    from_equity = indicator_engine.performance_stats(equity / equity[0])
+    from_returns = indicator_engine.performance_stats(returns, kind='returns')
+    assert_stats_match(from_returns, from_equity)
+
+    acc = indicator_engine.PerformanceAccumulator()
+    for chunk in np.array_split(returns, 7):
+        acc.add_returns(chunk)
+    assert acc.count == len(returns) + 1
+    assert acc.stats() == from_returns
+
+def test_performance_stats_drawdown_indices():
+    equity = np.array([100.0, 110.0, 99.0, 88.0, 105.0, 110.0, 120.0, 90.0, 100.0])
+    result = indicator_engine.performance_stats(equity)
+    assert result['max_drawdown'] == pytest.approx(0.25)
+    assert (result['max_drawdown_peak'], result['max_drawdown_trough']) == (6, 7)
+    assert result['max_drawdown_recovery'] == -1
+    assert result['max_drawdown_duration'] == 2
+
+    equity = equity[:7]
+    result = indicator_engine.performance_stats(equity)
+    assert result['max_drawdown'] == pytest.approx(0.2)
+    assert (result['max_drawdown_peak'], result['max_drawdown_trough'], result['max_drawdown_recovery']) == (1, 3, 5)
+    assert result['max_drawdown_duration'] == 4
+    assert result['hit_rate'] == pytest.approx(4 / 6)
+    assert_stats_match(result, stats.compute_performance_stats(equity))
+
+def test_performance_stats_edge_cases():
+    flat = indicator_engine.performance_stats(np.full(10, 5.0))
+    assert flat['sharpe'] == flat['sortino'] == flat['max_drawdown'] == flat['hit_rate'] == 0.0
+    empty = indicator_engine.performance_stats(np.empty(0))
+    assert empty['periods'] == 0 and empty['total_return'] == 0.0
+    strided = np.linspace(1.0, 2.0, 20)[::2]
+    assert indicator_engine.performance_stats(strided) == indicator_engine.performance_stats(strided.copy())
+    with pytest.raises(ValueError):
+        indicator_engine.performance_stats(np.ones(5), kind='prices')
+    with pytest.raises(ValueError):
+        indicator_engine.performance_stats(np.ones(5), periods_per_year=0.0)
+
+def test_performance_stats_after_equity_hits_zero():
+    equity = np.array([100.0, 110.0, 0.0, 0.0, 0.0])
+    result = indicator_engine.performance_stats(equity)
+    # -1 on the bar the account is wiped out, 0 (not nan) for every bar after it
+    assert result['total_simple_return'] == pytest.approx(0.1 - 1.0)
+    assert result['mean_return'] == pytest.approx((0.1 - 1.0) / 4)
+    assert result['max_drawdown'] == 1.0
+    assert np.isfinite(result['sharpe']) and np.isfinite(result['volatility'])
+    assert result['total_log_return'] == -np.inf
+    with np.errstate(divide='ignore'):
+        assert_stats_match(result, stats.compute_performance_stats(equity))
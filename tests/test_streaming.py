@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+
+import numpy as np
+import pytest
+
+import backtest
+import batch
+import indicator_engine
+import load_data
+import streaming
+import strategy
+from conftest import write_bars
+
+@pytest.mark.parametrize("chunk_bytes", [64, 1000, 1 << 20])
+def test_csv_chunks_match_full_parse(tmp_path, chunk_bytes):
+    path = tmp_path / "bars.csv"
+    write_bars(path, 2000, seed=4, header=True, bad_line=700)
+    columns, malformed = load_data.load_ohlcvt(path)
+    bad_rows = []
+    chunks = list(load_data.iter_ohlcvt_chunks(path, chunk_bytes, bad_rows))
+    for name in ('timestamp', 'close', 'trades'):
+        np.testing.assert_array_equal(np.concatenate([c[name] for c in chunks]), columns[name])
+    assert bad_rows == malformed == [(702, 'expected 6 or 7 fields, got 1')]
+
+@pytest.mark.parametrize("chunk_bytes", [100, 4096, 1 << 20])
+def test_streaming_matches_in_memory_path(tmp_path, chunk_bytes):
+    path = tmp_path / "bars.csv"
+    close = write_bars(path, 3000, seed=4, header=True)
+    expected = batch.evaluate_symbol(close, 10, 60)
+    for record in streaming.run_streaming(path, 10, 60, chunk_bytes=chunk_bytes):
+        for name in ('total_return', 'max_drawdown', 'sharpe', 'trades'):
+            assert record[name] == expected[f"{record['ma_type']}_{name}"]
+
+    np.save(tmp_path / "close.npy", close)
+    from_npy = streaming.run_streaming(tmp_path / "close.npy", 10, 60, chunk_bytes=chunk_bytes)
+    assert from_npy == streaming.run_streaming(path, 10, 60)
+
+def test_streamed_series_match_full_arrays(tmp_path):
+    path = tmp_path / "bars.csv"
+    close = write_bars(path, 1500, seed=4, header=True)
+    parts = {'fast': [], 'slow': [], 'signals': [], 'positions': [], 'equity': []}
+    for start, chunk, series in streaming.iter_strategy_chunks(path, 8, 40, ma_types=('sma',), chunk_bytes=2000):
+        for name in parts:
+            parts[name].append(series['sma'][name])
+    fast = indicator_engine.simple_moving_average(close, 8)
+    slow = indicator_engine.simple_moving_average(close, 40)
+    signals = strategy.crossover_signals(fast, slow, 40)
+    positions = backtest.compute_positions_array(signals)
+    np.testing.assert_array_equal(np.concatenate(parts['fast']), fast)
+    np.testing.assert_array_equal(np.concatenate(parts['slow']), slow)
+    np.testing.assert_array_equal(np.concatenate(parts['signals']), signals)
+    np.testing.assert_array_equal(np.concatenate(parts['positions']), positions)
+    np.testing.assert_allclose(np.concatenate(parts['equity']),
+                               backtest.compute_equity_curve_array(close, positions)[1:], rtol=1e-12)
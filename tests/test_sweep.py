@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+
+import numpy as np
+import pytest
+
+import backtest
+import indicator_engine
+import strategy
+import sweep
+from conftest import synthetic_prices
+
+def reference_equity(prices, fast_ma, slow_ma, warmup, initial_capital=1000.0):
+    """Loop version: string signals, held position, equity as in backtest.compute_equity_curve"""
+    signals = strategy.moving_average_crossover_strategy(fast_ma, slow_ma)
+    position = 0
+    positions = []
+    for i, signal in enumerate(signals):
+        if i >= warmup and signal == "BUY":
+            position = 1
+        elif i >= warmup and signal == "SELL":
+            position = -1
+        positions.append(position)
+    equity = [initial_capital]
+    for i in range(1, len(prices)):
+        ret = (prices[i] - prices[i-1]) / prices[i-1]
+        equity.append(equity[-1] * (1 + ret * positions[i-1]))
+    return np.array(equity)
+
+def test_parse_window_range():
+    assert sweep.parse_window_range("5:20:5") == [5, 10, 15, 20]
+    assert sweep.parse_window_range("50,10,20") == [10, 20, 50]
+    assert sweep.parse_window_range("7") == [7]
+    with pytest.raises(ValueError):
+        sweep.parse_window_range("0:10")
+
+def test_evaluate_crossover_matches_loop_reference():
+    prices = synthetic_prices(3000, seed=1)
+    fast = indicator_engine.simple_moving_average(prices, 8)
+    slow = indicator_engine.simple_moving_average(prices, 30)
+    price_returns = np.diff(prices) / prices[:-1]
+    result = sweep.evaluate_crossover(price_returns, fast, slow, warmup=30)
+
+    equity = reference_equity(prices, fast, slow, warmup=30)
+    assert result['total_return'] == pytest.approx(equity[-1] / 1000.0 - 1.0, rel=1e-9)
+    peak = np.maximum.accumulate(equity)
+    assert result['max_drawdown'] == pytest.approx(np.max((peak - equity) / peak), rel=1e-9)
+
+def test_sweep_covers_valid_pairs_ranked():
+    prices = synthetic_prices(3000, seed=1)
+    results = sweep.run_parameter_sweep(prices, [5, 10, 40], [10, 40, 80], rank_by='total_return')
+    pairs = {(r['ma_type'], r['fast'], r['slow']) for r in results}
+    expected = {(m, f, s) for m in ('sma', 'ema') for f in [5, 10, 40] for s in [10, 40, 80] if f < s}
+    assert pairs == expected
+    returns = [r['total_return'] for r in results]
+    assert returns == sorted(returns, reverse=True)
+
+def test_crossover_position_matrix_matches_single_pairs():
+    prices = synthetic_prices(3000, seed=1)
+    pairs = [(f, s) for f in [5, 10, 40] for s in [10, 40, 80] if f < s]
+    for ma_type, kernel in [('sma', indicator_engine.simple_moving_average),
+                            ('ema', indicator_engine.exponential_moving_average)]:
+        row_of, table = sweep.compute_moving_average_table(prices, [w for pair in pairs for w in pair], ma_type)
+        positions = sweep.crossover_position_matrix(table, row_of, pairs, ma_type)
+        assert positions.dtype == np.int8 and positions.shape == (len(pairs), len(prices))
+        for row, (f, s) in zip(positions, pairs):
+            warmup = strategy.crossover_warmup(ma_type, s)
+            signals = strategy.crossover_signals(kernel(prices, f), kernel(prices, s), warmup)
+            np.testing.assert_array_equal(row, backtest.compute_positions_array(signals))
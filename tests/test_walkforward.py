@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+
+import numpy as np
+import pytest
+
+import sweep
+import walkforward
+from conftest import synthetic_prices
+
+FAST = [5, 10, 20]
+SLOW = [20, 40, 80]
+
+def test_walk_forward_segments():
+    assert walkforward.walk_forward_segments(10, 4, 2) == [(0, 4, 6), (2, 6, 8), (4, 8, 10)]
+    assert walkforward.walk_forward_segments(10, 4, 2, step=3, anchored=True) == [(0, 4, 6), (0, 7, 9)]
+    assert walkforward.walk_forward_segments(5, 4, 2) == []
+    with pytest.raises(ValueError):
+        walkforward.walk_forward_segments(10, 4, 0)
+
+def test_first_segment_picks_the_sweep_winner():
+    prices = synthetic_prices(4000, seed=2)
+    rows, _ = walkforward.run_walk_forward(prices, FAST, SLOW, 1000, 500, workers=1)
+    ranked = sweep.run_parameter_sweep(prices[:1000], FAST, SLOW)
+    for ma_type in ('sma', 'ema'):
+        row = next(r for r in rows if r['segment'] == 0 and r['ma_type'] == ma_type)
+        best = next(r for r in ranked if r['ma_type'] == ma_type)
+        assert (row['fast'], row['slow']) == (best['fast'], best['slow'])
+        assert row['train_score'] == pytest.approx(best['sharpe'], rel=1e-9)
+
+def test_segments_do_not_see_later_bars():
+    prices = synthetic_prices(4000, seed=2)
+    rows, _ = walkforward.run_walk_forward(prices, FAST, SLOW, 1000, 500, workers=1)
+    changed = prices.copy()
+    changed[1500:] *= np.linspace(1.0, 3.0, len(prices) - 1500)
+    changed_rows, _ = walkforward.run_walk_forward(changed, FAST, SLOW, 1000, 500, workers=1)
+    first = [r for r in rows if r['segment'] == 0]
+    assert first == [r for r in changed_rows if r['segment'] == 0]
+    assert rows != changed_rows
+
+def test_process_pool_matches_inline_and_stitches_test_segments():
+    prices = synthetic_prices(4000, seed=2)
+    inline = walkforward.run_walk_forward(prices, FAST, SLOW, 1000, 500, rank_by='total_return', workers=1)
+    pooled = walkforward.run_walk_forward(prices, FAST, SLOW, 1000, 500, rank_by='total_return', workers=2)
+    assert pooled == inline
+
+    rows, summary = inline
+    assert len(rows) == 2 * 6
+    growth = np.prod([1.0 + r['test_total_return'] for r in rows if r['ma_type'] == 'ema'])
+    assert summary['ema']['total_return'] == pytest.approx(growth - 1.0, rel=1e-9)
+    assert summary['ema']['periods'] == len(prices) - 1000
+
+def test_shared_block_is_unlinked_when_filling_fails(monkeypatch):
+    from multiprocessing import shared_memory
+    created = []
+    create_shared = walkforward._create_shared
+    def record(shapes):
+        shm, layout = create_shared(shapes)
+        created.append(shm.name)
+        return shm, layout
+    def fail(*args):
+        raise KeyboardInterrupt
+    monkeypatch.setattr(walkforward, '_create_shared', record)
+    monkeypatch.setattr(walkforward, 'fill_tables', fail)
+    with pytest.raises(KeyboardInterrupt):
+        walkforward.run_walk_forward(synthetic_prices(4000, seed=2), FAST, SLOW, 1000, 500, workers=2)
+    assert len(created) == 1
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=created[0])
+
+def test_float32_prices_keep_float32_tables():
+    prices = synthetic_prices(4000, seed=2).astype(np.float32)
+    inline = walkforward.run_walk_forward(prices, FAST, SLOW, 1000, 500, workers=1)
+    assert walkforward.run_walk_forward(prices, FAST, SLOW, 1000, 500, workers=2) == inline
+    ranked = sweep.run_parameter_sweep(prices[:1000], FAST, SLOW)
+    row = next(r for r in inline[0] if r['segment'] == 0 and r['ma_type'] == 'ema')
+    best = next(r for r in ranked if r['ma_type'] == 'ema')
+    assert (row['fast'], row['slow']) == (best['fast'], best['slow'])
@@ -0,0 +1,234 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+import data_cache
+import indicator_engine
+import instrument
+import strategy
+import sweep
+
+#walk-forward optimization of the (fast, slow) crossover pair: the series is split into
+#rolling train/test segments, the best pair on each train segment is picked and then
+#scored on the test segment right after it.
+#moving averages only look back, so the value at bar t is the same whichever segment
+#reads it: every window is computed once over the full series (sweep's multi-window table)
+#and segments work on views of it. With several workers the tables are written straight
+#into one shared memory block that the worker processes map, so nothing is recomputed
+#or pickled per segment
+
+# columns of the per-segment rows returned by run_walk_forward; the test_* metrics are
+# out-of-sample, train_score is the rank_by metric the pair won its train segment with
+WALK_FORWARD_FIELDS = ['segment', 'ma_type', 'train_start', 'test_start', 'test_end', 'fast', 'slow',
+                       'train_score', 'test_total_return', 'test_max_drawdown', 'test_sharpe', 'test_trades']
+
+def walk_forward_segments(n, train_size, test_size, step=None, anchored=False):
+    """
+    (train_start, test_start, test_end) bar indices of every segment that fits in n bars.
+
+    Segments advance by `step` bars (default test_size, i.e. back-to-back test
+    segments). With anchored=True every train segment starts at bar 0 and grows.
+    """
+    step = step or test_size
+    if train_size < 2 or test_size < 1 or step < 1:
+        raise ValueError("train_size must be at least 2, test_size and step positive")
+    segments = []
+    test_start = train_size
+    while test_start + test_size <= n:
+        train_start = 0 if anchored else test_start - train_size
+        segments.append((train_start, test_start, test_start + test_size))
+        test_start += step
+    return segments
+
+def is_better(score, best, rank_by):
+    # drawdown is ranked smallest first, everything else largest first
+    if best is None:
+        return True
+    return score < best if rank_by == 'max_drawdown' else score > best
+
+def segment_returns(tables, row_of, price_returns, ma_type, fast, slow, start, end):
+    """Crossover signals and strategy returns of one pair over bars [start, end), starting flat"""
+    table = tables[ma_type]
+    return sweep.crossover_returns(price_returns[start:end - 1], table[row_of[fast]][start:end],
+                                   table[row_of[slow]][start:end], strategy.crossover_warmup(ma_type, slow, start))
+
+def evaluate_segment(tables, row_of, pairs, ma_types, rank_by, segment):
+    """
+    Pick the best pair per MA type on the train part of one segment and score it on the
+    test part; returns (rows, {ma_type: out-of-sample strategy returns}).
+
+    The chosen pair is run on from the train part, so it enters the test part
+    holding whatever position its last crossover left it in.
+    """
+    train_start, test_start, test_end = segment
+    price_returns = tables['returns']
+    rows, test_returns = [], {}
+    for ma_type in ma_types:
+        best, best_score = None, None
+        for fast, slow in pairs:
+            _, train_returns = segment_returns(tables, row_of, price_returns, ma_type, fast, slow,
+                                               train_start, test_start)
+            stats = indicator_engine.performance_stats(train_returns, kind='returns', periods_per_year=1.0)
+            if is_better(stats[rank_by], best_score, rank_by):
+                best, best_score = (fast, slow), stats[rank_by]
+
+        fast, slow = best
+        signals, returns = segment_returns(tables, row_of, price_returns, ma_type, fast, slow,
+                                           train_start, test_end)
+        # returns[k] is earned going into bar train_start + k + 1
+        returns = returns[test_start - train_start - 1:]
+        stats = indicator_engine.performance_stats(returns, kind='returns', periods_per_year=1.0)
+        rows.append({
+            'ma_type': ma_type, 'train_start': train_start, 'test_start': test_start, 'test_end': test_end,
+            'fast': fast, 'slow': slow, 'train_score': best_score,
+            'test_total_return': stats['total_return'], 'test_max_drawdown': stats['max_drawdown'],
+            'test_sharpe': stats['sharpe'],
+            'test_trades': int(np.count_nonzero(signals[test_start - train_start:])),
+        })
+        test_returns[ma_type] = returns
+    return rows, test_returns
+
+def _create_shared(shapes):
+    """One shared memory block with room for an array per (name, shape, dtype)"""
+    layout, offset = [], 0
+    for name, shape, dtype in shapes:
+        layout.append((name, shape, np.dtype(dtype).str, offset))
+        # keep every array aligned to 8 bytes
+        offset += -(-int(np.prod(shape)) * np.dtype(dtype).itemsize // 8) * 8
+    return shared_memory.SharedMemory(create=True, size=max(offset, 1)), layout
+
+def _map_shared(shm, layout):
+    return {name: np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset)
+            for name, shape, dtype, offset in layout}
+
+# per-worker state, set once by _init_worker
+_worker = {}
+
+def _init_worker(shm_name, layout, row_of, pairs, ma_types, rank_by):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    _worker.update(shm=shm, args=(_map_shared(shm, layout), row_of, pairs, ma_types, rank_by))
+
+def _evaluate_shared_segment(segment):
+    return evaluate_segment(*_worker['args'], segment)
+
+def fill_tables(tables, close_prices, windows, ma_types):
+    """Write the price returns and one (windows x time) MA table per type into `tables`"""
+    np.subtract(close_prices[1:], close_prices[:-1], out=tables['returns'], dtype=np.float64)
+    tables['returns'] /= close_prices[:-1]
+    for ma_type in ma_types:
+        sweep.MULTI_WINDOW_KERNELS[ma_type](close_prices, windows, out=tables[ma_type])
+
+def run_walk_forward(close_prices, fast_windows, slow_windows, train_size, test_size, step=None,
+                     anchored=False, ma_types=('sma', 'ema'), rank_by='sharpe', workers=None):
+    """
+    Walk-forward optimization over every valid (fast < slow) pair.
+
+    Returns (rows, summary): one row per segment and MA type (keys in
+    WALK_FORWARD_FIELDS), and per MA type the performance_stats of the
+    stitched out-of-sample returns (bars covered by several test segments
+    are counted once, from the earlier segment). Segments run in a process
+    pool of `workers` processes (default: one per CPU; 1 runs inline).
+    """
+    if rank_by not in ('sharpe', 'total_return', 'max_drawdown'):
+        raise ValueError("rank_by must be 'sharpe', 'total_return' or 'max_drawdown'")
+    if any(ma_type not in sweep.MULTI_WINDOW_KERNELS for ma_type in ma_types):
+        raise ValueError("Invalid moving average type. Use 'sma' or 'ema'.")
+    # float32 prices keep the MA tables (most of the memory) in float32
+    close_prices = sweep.as_price_array(close_prices)
+    n = len(close_prices)
+    segments = walk_forward_segments(n, train_size, test_size, step, anchored)
+    pairs = [(f, s) for f in sorted(set(fast_windows)) for s in sorted(set(slow_windows)) if f < s]
+    if not pairs or not segments:
+        return [], {}
+
+    windows = sorted({w for pair in pairs for w in pair})
+    row_of = {w: k for k, w in enumerate(windows)}
+    shapes = [('returns', (n - 1,), np.float64)] + [(ma_type, (len(windows), n), close_prices.dtype)
+                                                    for ma_type in ma_types]
+    workers = min(workers or os.cpu_count() or 1, len(segments))
+
+    shm, layout = _create_shared(shapes) if workers > 1 else (None, None)
+    tables = None
+    # from here on the shared block is unlinked on any error or interrupt, including while
+    # the tables are filled
+    try:
+        with instrument.stage('walk-forward tables', n * len(windows) * len(ma_types), close_prices.nbytes):
+            if shm is not None:
+                tables = _map_shared(shm, layout)
+            else:
+                tables = {name: np.empty(shape, dtype) for name, shape, dtype in shapes}
+            fill_tables(tables, close_prices, windows, ma_types)
+
+        with instrument.stage('walk-forward segments', sum(end - start for start, _, end in segments) * len(pairs)):
+            if shm is None:
+                results = [evaluate_segment(tables, row_of, pairs, ma_types, rank_by, segment)
+                           for segment in segments]
+            else:
+                initargs = (shm.name, layout, row_of, pairs, tuple(ma_types), rank_by)
+                with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                         initargs=initargs) as executor:
+                    results = list(executor.map(_evaluate_shared_segment, segments))
+    finally:
+        if shm is not None:
+            # the views must go before the block can be closed
+            del tables
+            shm.close()
+            shm.unlink()
+
+    rows, summary = [], {}
+    for ma_type in ma_types:
+        stitched, covered = [], segments[0][1]
+        for segment, (_, test_returns) in zip(segments, results):
+            _, test_start, test_end = segment
+            if test_end > covered:
+                stitched.append(test_returns[ma_type][max(covered - test_start, 0):])
+                covered = test_end
+        summary[ma_type] = indicator_engine.performance_stats(np.concatenate(stitched), kind='returns',
+                                                              periods_per_year=1.0)
+    for k, (segment_rows, _) in enumerate(results):
+        for row in segment_rows:
+            row['segment'] = k
+            rows.append(row)
+    return rows, summary
+
+def run_walk_forward_file(file_path, fast_windows, slow_windows, train_size, test_size, timeframe=None, **kwargs):
+    """Load the CSV once (through the data cache, resampled to `timeframe` if given) and walk it forward"""
+    close_prices = data_cache.load_columns(file_path, timeframe=timeframe)['close']
+    return run_walk_forward(close_prices, fast_windows, slow_windows, train_size, test_size, **kwargs)
+
+def format_walk_forward_table(rows, summary):
+    lines = [f"{'Seg':<5} {'MA':<5} {'Test bars':>17} {'Fast':>6} {'Slow':>6} {'Train Score':>12} "
+             f"{'Test Return':>12} {'Test MaxDD':>11} {'Test Sharpe':>12} {'Trades':>7}"]
+    lines.append('-' * len(lines[0]))
+    for row in rows:
+        bars = f"{row['test_start']}-{row['test_end']}"
+        lines.append(f"{row['segment']:<5} {row['ma_type'].upper():<5} {bars:>17} {row['fast']:>6} {row['slow']:>6} "
+                     f"{row['train_score']:>12.4f} {row['test_total_return']:>12.4f} {row['test_max_drawdown']:>11.4f} "
+                     f"{row['test_sharpe']:>12.4f} {row['test_trades']:>7}")
+    for ma_type, stats in summary.items():
+        lines.append(f"{ma_type.upper()} out-of-sample: return {stats['total_return']:.4f}, "
+                     f"max drawdown {stats['max_drawdown']:.4f}, sharpe {stats['sharpe']:.4f} "
+                     f"over {stats['periods']} bars")
+    return "\n".join(lines)
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description='Walk-forward optimization of the moving average crossover.')
+    parser.add_argument('csv_path', help='Path to the CSV file containing price data')
+    parser.add_argument('fast', help='Fast windows to choose from, e.g. 5:50:5')
+    parser.add_argument('slow', help='Slow windows to choose from, e.g. 20:200:10')
+    parser.add_argument('train', type=int, help='Bars per train segment')
+    parser.add_argument('test', type=int, help='Bars per test segment')
+    parser.add_argument('--step', type=int, default=None, help='Bars between segments (default: test)')
+    parser.add_argument('--anchored', action='store_true', help='Grow every train segment from the first bar')
+    parser.add_argument('--rank-by', choices=['sharpe', 'total_return', 'max_drawdown'], default='sharpe')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: one per CPU)')
+    args = parser.parse_args()
+
+    rows, summary = run_walk_forward_file(args.csv_path, sweep.parse_window_range(args.fast),
+                                          sweep.parse_window_range(args.slow), args.train, args.test,
+                                          step=args.step, anchored=args.anchored, rank_by=args.rank_by,
+                                          workers=args.workers)
+    print(format_walk_forward_table(rows, summary))